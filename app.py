@@ -120,6 +120,7 @@ event_source_mapping_stack = EventSourceMappingStack(
     stream_processor_lambda=websocket_lambda_stack.stream_processor_lambda,
     fraud_detector_lambda=websocket_lambda_stack.fraud_detector_lambda,
     transaction_updater_lambda=websocket_lambda_stack.transaction_updater_lambda,
+    client_state_aggregator_lambda=websocket_lambda_stack.client_state_aggregator_lambda,
     transactions_table=storage_dynamodb_stack.transactions_table,
     input_queue=sqs_stack.transactions_input_queue,
     output_queue=sqs_stack.transactions_output_queue,
@@ -151,7 +152,9 @@ api_integration_stack = ApiIntegrationStack(
     post_client_lambda=lambda_stack.post_client_lambda,
     get_clients_lambda=lambda_stack.get_clients_lambda,
     post_transaction_lambda=lambda_stack.post_transaction_lambda,
+    post_transactions_batch_lambda=lambda_stack.post_transactions_batch_lambda,
     get_transactions_lambda=lambda_stack.get_transactions_lambda,
+    fraud_explanation_lambda=websocket_lambda_stack.fraud_explanation_lambda,
     post_counterparty_lambda=lambda_stack.post_counterparty_lambda,
     get_counterparties_lambda=lambda_stack.get_counterparties_lambda,
     post_client_tx_state_lambda=lambda_stack.post_client_tx_state_lambda,
@@ -0,0 +1,400 @@
+import os
+import math
+import boto3
+from datetime import datetime, timezone, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+from boto3.dynamodb.conditions import Key
+from structured_logging import configure_logging, log_message
+
+dynamodb = boto3.resource("dynamodb")
+tx_state_table = dynamodb.Table(os.environ["CLIENT_TX_STATE_TABLE_NAME"])
+recent_activity_table = dynamodb.Table(os.environ["CLIENT_RECENT_ACTIVITY_TABLE_NAME"])
+tx_state_index_name = os.environ.get(
+    "CLIENT_TX_STATE_INDEX_NAME", "client_account_id-index"
+)
+bucket_minutes = int(os.environ.get("ACTIVITY_BUCKET_MINUTES", "5"))
+# Reintentos de una escritura que perdió la carrera con otro batch del mismo cliente
+MAX_WRITE_ATTEMPTS = int(os.environ.get("AGGREGATOR_MAX_WRITE_ATTEMPTS", "5"))
+# Los INSERT de un cliente caen en shards distintos (la llave es transaction_id) y sus
+# sequence numbers no se pueden comparar: lo aplicado se registra por transaction_id.
+# El tx state guarda los ids aplicados durante la retención del stream (24 h), hasta
+# un máximo para no acercarse al límite de 400 KB del item
+APPLIED_TX_RETENTION_HOURS = int(
+    os.environ.get("AGGREGATOR_APPLIED_TX_RETENTION_HOURS", "24")
+)
+MAX_APPLIED_TX_IDS = int(os.environ.get("AGGREGATOR_MAX_APPLIED_TX_IDS", "2000"))
+# Ningún otro batch escribió entre la lectura y la escritura
+UNCHANGED_CONDITION = "attribute_not_exists(tx_count) OR tx_count = :previous_count"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+MEXICO_TZ = timezone(timedelta(hours=-6))
+
+logger = configure_logging()
+ConditionalCheckFailed = dynamodb.meta.client.exceptions.ConditionalCheckFailedException
+
+# client_account_id -> client_tx_state_id, reutilizado entre invocaciones
+tx_state_ids = {}
+
+
+class RunningStats:
+    """Conteo, media y M2 de montos; Welford para agregar y Chan para combinar"""
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, amount: float) -> None:
+        self.count += 1
+        delta = amount - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (amount - self.mean)
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        """Combinación paralela de Chan et al.; no resta sumas de cuadrados"""
+        count = self.count + other.count
+        if count == 0:
+            return RunningStats()
+        delta = other.mean - self.mean
+        return RunningStats(
+            count,
+            self.mean + delta * other.count / count,
+            self.m2 + other.m2 + delta**2 * self.count * other.count / count,
+        )
+
+    @property
+    def std(self) -> float:
+        """Desviación estándar muestral, como la de post_client_tx_state"""
+        return (
+            math.sqrt(max(self.m2, 0.0) / (self.count - 1)) if self.count > 1 else 0.0
+        )
+
+    @classmethod
+    def from_item(cls, item: Optional[Dict[str, Any]]) -> "RunningStats":
+        """Estado guardado; las filas previas a tx_m2 lo derivan de sus sumas"""
+        if not item or not item.get("tx_count"):
+            return cls()
+        count = int(item["tx_count"])
+        if "tx_m2" in item:
+            return cls(count, float(item["avg_tx_amount"]), float(item["tx_m2"]))
+        mean = float(item["tx_sum"]) / count
+        m2 = float(item["tx_square_sum"]) - float(item["tx_sum"]) * mean
+        return cls(count, mean, max(m2, 0.0))
+
+
+class ClientTransactions:
+    """Montos de un cliente en el batch por transaction_id"""
+
+    def __init__(self):
+        # transaction_id -> (sequence number, monto, created_at)
+        self.entries: Dict[str, Tuple[str, float, str]] = {}
+
+    def add(
+        self, transaction_id: str, sequence_number: str, amount: float, created_at: str
+    ) -> None:
+        self.entries[transaction_id] = (sequence_number, amount, created_at)
+
+    def pending(self, applied) -> Dict[str, Tuple[str, float, str]]:
+        return {
+            transaction_id: entry
+            for transaction_id, entry in self.entries.items()
+            if transaction_id not in applied
+        }
+
+    @property
+    def sequence_numbers(self) -> List[str]:
+        return [entry[0] for entry in self.entries.values()]
+
+
+class ActivityBucket:
+    """Transacciones y contrapartes de un cliente dentro de un bucket de tiempo"""
+
+    def __init__(self):
+        # transaction_id -> (sequence number, contraparte)
+        self.entries: Dict[str, Tuple[str, str]] = {}
+
+    def add(
+        self, transaction_id: str, sequence_number: str, counterparty_account_id: str
+    ) -> None:
+        self.entries[transaction_id] = (sequence_number, counterparty_account_id)
+
+    def pending(self, applied) -> Dict[str, Tuple[str, str]]:
+        return {
+            transaction_id: entry
+            for transaction_id, entry in self.entries.items()
+            if transaction_id not in applied
+        }
+
+    @property
+    def sequence_numbers(self) -> List[str]:
+        return [entry[0] for entry in self.entries.values()]
+
+
+def handler(event, context):
+    log_message("Batch recibido", records=len(event.get("Records", [])))
+
+    transactions, buckets = aggregate_records(event.get("Records", []))
+
+    now = datetime.now(MEXICO_TZ).strftime(TIMESTAMP_FORMAT)
+
+    failed_sequence_numbers = []
+    for client_account_id, client_transactions in transactions.items():
+        try:
+            update_tx_state(client_account_id, client_transactions, now)
+        except Exception as e:
+            log_message(
+                f"Error actualizando tx state: {e}",
+                level="error",
+                client_account_id=client_account_id,
+            )
+            failed_sequence_numbers.extend(client_transactions.sequence_numbers)
+
+    for (client_account_id, bucket_timestamp), bucket in buckets.items():
+        try:
+            update_recent_activity(client_account_id, bucket_timestamp, bucket, now)
+        except Exception as e:
+            log_message(
+                f"Error actualizando actividad: {e}",
+                level="error",
+                client_account_id=client_account_id,
+                bucket_timestamp=bucket_timestamp,
+            )
+            failed_sequence_numbers.extend(bucket.sequence_numbers)
+
+    log_message(
+        "Batch agregado",
+        tx_states=len(transactions),
+        buckets=len(buckets),
+        failed_records=len(set(failed_sequence_numbers)),
+    )
+
+    # Lambda reintenta el shard desde el registro más antiguo que falló; lo que ya
+    # se aplicó se descarta por transaction_id
+    if failed_sequence_numbers:
+        return {
+            "batchItemFailures": [
+                {"itemIdentifier": min(failed_sequence_numbers, key=int)}
+            ]
+        }
+    return {"batchItemFailures": []}
+
+
+def aggregate_records(records: list) -> tuple:
+    """Agrupa los INSERT del batch por cliente y por bucket para escribir una vez cada uno"""
+    transactions = {}
+    buckets = {}
+
+    for record in records:
+        if record["eventName"] != "INSERT":
+            continue
+
+        new_image = record["dynamodb"]["NewImage"]
+        sequence_number = record["dynamodb"]["SequenceNumber"]
+        transaction_id = record["dynamodb"]["Keys"]["transaction_id"]["S"]
+        client_account_id = new_image.get("client_account_id", {}).get("S")
+        amount = new_image.get("amount", {}).get("N")
+        created_at = new_image.get("created_at", {}).get("S")
+        if not client_account_id or amount is None or not created_at:
+            log_message(
+                "Transacción sin datos suficientes, se omite",
+                level="warning",
+                sequence_number=sequence_number,
+            )
+            continue
+
+        transactions.setdefault(client_account_id, ClientTransactions()).add(
+            transaction_id, sequence_number, float(amount), created_at
+        )
+
+        bucket_timestamp = build_bucket_timestamp(created_at)
+        buckets.setdefault((client_account_id, bucket_timestamp), ActivityBucket()).add(
+            transaction_id,
+            sequence_number,
+            new_image.get("counterparty_account_id", {}).get("S", ""),
+        )
+
+    return transactions, buckets
+
+
+def build_bucket_timestamp(created_at: str) -> str:
+    """Inicio del bucket en el formato que usa client-recent-activity"""
+    timestamp = datetime.strptime(created_at, TIMESTAMP_FORMAT)
+    timestamp = timestamp.replace(
+        minute=timestamp.minute - timestamp.minute % bucket_minutes, second=0
+    )
+    return timestamp.strftime("%Y-%m-%dT%H:%M:%S.%f")
+
+
+def find_tx_state_id(client_account_id: str) -> str:
+    """Id del registro de estado del cliente; los nuevos usan el account id"""
+    if client_account_id not in tx_state_ids:
+        response = tx_state_table.query(
+            IndexName=tx_state_index_name,
+            KeyConditionExpression=Key("client_account_id").eq(client_account_id),
+            ProjectionExpression="client_tx_state_id",
+            Limit=1,
+        )
+        items = response.get("Items", [])
+        tx_state_ids[client_account_id] = (
+            items[0]["client_tx_state_id"] if items else client_account_id
+        )
+    return tx_state_ids[client_account_id]
+
+
+def prune_applied(applied: Dict[str, str], now: str) -> Dict[str, str]:
+    """Ids aplicados que un reintento del stream todavía puede reenviar"""
+    cutoff = (
+        datetime.strptime(now, TIMESTAMP_FORMAT)
+        - timedelta(hours=APPLIED_TX_RETENTION_HOURS)
+    ).strftime(TIMESTAMP_FORMAT)
+    kept = sorted(
+        (
+            (applied_at, transaction_id)
+            for transaction_id, applied_at in applied.items()
+            if applied_at >= cutoff
+        ),
+        reverse=True,
+    )
+    if len(kept) > MAX_APPLIED_TX_IDS:
+        log_message(
+            "Demasiados ids aplicados en la ventana, se descartan los más viejos",
+            level="warning",
+            applied=len(kept),
+        )
+    return {
+        transaction_id: applied_at
+        for applied_at, transaction_id in kept[:MAX_APPLIED_TX_IDS]
+    }
+
+
+def update_tx_state(
+    client_account_id: str, transactions: ClientTransactions, now: str
+) -> None:
+    """Combina los montos nuevos con el count/media/M2 guardados (Chan) y escribe
+    sólo si nadie más escribió desde la lectura"""
+    key = {"client_tx_state_id": find_tx_state_id(client_account_id)}
+
+    for _ in range(MAX_WRITE_ATTEMPTS):
+        item = tx_state_table.get_item(Key=key, ConsistentRead=True).get("Item") or {}
+        applied = item.get("applied_tx_ids", {})
+        pending = transactions.pending(applied)
+        if not pending:
+            # Reintento de registros que ya quedaron aplicados
+            return
+
+        batch = RunningStats()
+        for _, amount, _ in pending.values():
+            batch.add(amount)
+        stats = RunningStats.from_item(item).merge(batch)
+
+        last_tx_timestamp = max(
+            [created_at for _, _, created_at in pending.values()]
+            + [item.get("last_tx_timestamp", "")]
+        )
+        applied = prune_applied(
+            {**applied, **{transaction_id: now for transaction_id in pending}}, now
+        )
+
+        try:
+            tx_state_table.update_item(
+                Key=key,
+                UpdateExpression=(
+                    "SET tx_count = :count, avg_tx_amount = :mean, tx_m2 = :m2, "
+                    "std_tx_amount = :std, tx_sum = :sum, tx_square_sum = :square_sum, "
+                    "applied_tx_ids = :applied, "
+                    "client_account_id = :client_account_id, "
+                    "last_tx_timestamp = :last_tx_timestamp, updated_at = :now, "
+                    "created_at = if_not_exists(created_at, :now) "
+                    "REMOVE last_sequence_number"
+                ),
+                ConditionExpression=UNCHANGED_CONDITION,
+                ExpressionAttributeValues={
+                    ":previous_count": item.get("tx_count", 0),
+                    ":count": stats.count,
+                    ":mean": Decimal(str(stats.mean)),
+                    ":m2": Decimal(str(stats.m2)),
+                    ":std": Decimal(str(stats.std)),
+                    # Sólo por compatibilidad con el esquema de post_client_tx_state
+                    ":sum": Decimal(str(stats.mean * stats.count)),
+                    ":square_sum": Decimal(str(stats.m2 + stats.count * stats.mean**2)),
+                    ":applied": applied,
+                    ":client_account_id": client_account_id,
+                    ":last_tx_timestamp": last_tx_timestamp,
+                    ":now": now,
+                },
+            )
+            return
+        except ConditionalCheckFailed:
+            log_message(
+                "tx state modificado por otro batch, reintentando",
+                level="debug",
+                client_account_id=client_account_id,
+            )
+
+    raise RuntimeError(
+        f"tx state de {client_account_id} sin escribir tras {MAX_WRITE_ATTEMPTS} intentos"
+    )
+
+
+def update_recent_activity(
+    client_account_id: str, bucket_timestamp: str, bucket: ActivityBucket, now: str
+) -> None:
+    """Suma al bucket y une el set de contrapartes, una vez por transaction_id"""
+    key = {"client_recent_activity_id": f"{client_account_id}#{bucket_timestamp}"}
+
+    for _ in range(MAX_WRITE_ATTEMPTS):
+        item = (
+            recent_activity_table.get_item(Key=key, ConsistentRead=True).get("Item")
+            or {}
+        )
+        # Un bucket cubre unos minutos: sus ids aplicados no necesitan poda
+        applied = item.get("applied_tx_ids", set())
+        pending = bucket.pending(applied)
+        if not pending:
+            return
+
+        counterparties = set(item.get("counterparty_set", set())) | {
+            counterparty for _, counterparty in pending.values() if counterparty
+        }
+        update_expression = (
+            "SET tx_count = :count, applied_tx_ids = :applied, "
+            "unique_counterparties = :unique_counterparties, "
+            "unique_counterparties_count = :size, "
+            "client_account_id = :client_account_id, "
+            "bucket_timestamp = :bucket_timestamp, updated_at = :now, "
+            "created_at = if_not_exists(created_at, :now)"
+        )
+        values = {
+            ":previous_count": item.get("tx_count", 0),
+            ":count": int(item.get("tx_count", 0)) + len(pending),
+            ":applied": set(applied) | set(pending),
+            ":unique_counterparties": ",".join(sorted(counterparties)),
+            ":size": len(counterparties),
+            ":client_account_id": client_account_id,
+            ":bucket_timestamp": bucket_timestamp,
+            ":now": now,
+        }
+        # DynamoDB no admite sets vacíos
+        if counterparties:
+            update_expression += ", counterparty_set = :counterparties"
+            values[":counterparties"] = counterparties
+
+        try:
+            recent_activity_table.update_item(
+                Key=key,
+                UpdateExpression=update_expression + " REMOVE last_sequence_number",
+                ConditionExpression=UNCHANGED_CONDITION,
+                ExpressionAttributeValues=values,
+            )
+            return
+        except ConditionalCheckFailed:
+            log_message(
+                "Bucket modificado por otro batch, reintentando",
+                level="debug",
+                bucket=key["client_recent_activity_id"],
+            )
+
+    raise RuntimeError(
+        f"Bucket {key['client_recent_activity_id']} sin escribir tras "
+        f"{MAX_WRITE_ATTEMPTS} intentos"
+    )
@@ -0,0 +1,83 @@
+"""Convierte los pickles del modelo a artefactos nativos para un cold start rápido.
+
+Por cada xgboost_model_balanced_<timestamp>.pkl escribe model_artifacts/<timestamp>/
+con el booster en formato nativo (model.ubj), los árboles aplanados (trees.npz) y el
+feature_transformer como spec JSON, más un manifest.json con las versiones, la activa
+(la más reciente, o --active) y los challengers que se puntúan en sombra. Se ejecuta
+al construir la imagen, así que publicar un modelo o cambiar el activo o los
+challengers es desplegar una imagen nueva (un rollback puede usar MODEL_VERSION):
+
+    python build_artifacts.py [--output model_artifacts] [--active <model_file>]
+        [--challengers <model_file> ...]
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime
+import joblib
+from model_artifacts import (
+    MODEL_ARTIFACTS_DIR,
+    MODEL_PREFIX,
+    export_artifacts,
+    model_timestamp,
+)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default=MODEL_ARTIFACTS_DIR)
+    parser.add_argument("--active", help="model_file activo; por defecto el último")
+    parser.add_argument("--challengers", nargs="*", default=[])
+    args = parser.parse_args()
+
+    model_files = sorted(
+        f
+        for f in os.listdir(SCRIPT_DIR)
+        if f.startswith(MODEL_PREFIX) and f.endswith(".pkl")
+    )
+    if not model_files:
+        raise FileNotFoundError(f"No se encontraron modelos en: {SCRIPT_DIR}")
+    for version in [args.active, *args.challengers]:
+        if version and version not in model_files:
+            raise ValueError(f"Versión desconocida: {version}")
+
+    versions = {}
+    for model_file in model_files:
+        timestamp = model_timestamp(model_file)
+        model = joblib.load(os.path.join(SCRIPT_DIR, model_file))
+        feature_transformer = joblib.load(
+            os.path.join(SCRIPT_DIR, f"feature_transformer_balanced_{timestamp}.pkl")
+        )
+
+        # model_version conserva el nombre del pickle, igual que en las predicciones
+        output_dir = os.path.join(args.output, timestamp)
+        export_artifacts(model, feature_transformer, model_file, output_dir)
+        print(f"[INFO] Artefactos de {model_file} en {output_dir}")
+
+        # Rutas relativas al manifest para poder mover la carpeta completa
+        versions[model_file] = {
+            "model_file": os.path.relpath(
+                os.path.join(SCRIPT_DIR, model_file), args.output
+            ),
+            "artifact_dir": timestamp,
+            "built_at": datetime.now().isoformat(),
+        }
+
+    manifest = {
+        "active": args.active or model_files[-1],
+        "challengers": args.challengers,
+        "versions": versions,
+    }
+    # Se escribe aparte y se renombra: nunca queda un manifest a medias
+    manifest_path = os.path.join(args.output, "manifest.json")
+    with open(f"{manifest_path}.tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+    print(f"[INFO] Manifest en {manifest_path}, activo: {manifest['active']}")
+
+
+if __name__ == "__main__":
+    main()
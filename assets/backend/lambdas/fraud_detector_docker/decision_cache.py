@@ -0,0 +1,93 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Decisiones recientes por contenedor; una redelivery de SQS llega en segundos o
+# minutos (visibility timeout de 300 s), así que basta con una ventana corta
+DECISION_CACHE_MAX_ENTRIES = int(os.environ.get("DECISION_CACHE_MAX_ENTRIES", "10000"))
+DECISION_CACHE_TTL_SECONDS = float(os.environ.get("DECISION_CACHE_TTL_SECONDS", "900"))
+
+ANALYZED_STATUS = "ANALYZED"
+
+# Atributos de la transacción necesarios para reconstruir una decisión guardada
+DECISION_ATTRIBUTES = [
+    "transaction_id",
+    "#st",
+    "risk_score",
+    "risk_prediction",
+    "explanation",
+    "model_features",
+    "model_version",
+    "client_account_id",
+    "amount",
+]
+
+
+class DecisionCache:
+    """LRU con TTL de decisiones ya escritas en la tabla, por transaction_id y versión"""
+
+    def __init__(
+        self,
+        max_entries: int = DECISION_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = DECISION_CACHE_TTL_SECONDS,
+        clock=time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Dict[str, Any]]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, transaction_id: str, model_version: str) -> Optional[Dict[str, Any]]:
+        key = (transaction_id, model_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, decision = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return decision
+
+    def put(
+        self, transaction_id: str, model_version: str, decision: Dict[str, Any]
+    ) -> None:
+        key = (transaction_id, model_version)
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl_seconds, decision)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def decision_from_item(
+    item: Dict[str, Any], model_version: str
+) -> Optional[Dict[str, Any]]:
+    """Decisión con el formato de predict_risk si la transacción ya se analizó con esa versión"""
+    if (
+        item.get("status") != ANALYZED_STATUS
+        or item.get("model_version") != model_version
+        or item.get("risk_score") is None
+    ):
+        return None
+
+    return {
+        "transaction_id": item["transaction_id"],
+        "risk_probability": float(item["risk_score"]),
+        "risk_prediction": bool(item.get("risk_prediction")),
+        "shap_explanation": json.loads(item.get("explanation") or "{}"),
+        "model_features": json.loads(item.get("model_features") or "{}"),
+        "model_version": item["model_version"],
+        "client_account_id": item.get("client_account_id", ""),
+        "amount": float(item.get("amount", 0)),
+    }
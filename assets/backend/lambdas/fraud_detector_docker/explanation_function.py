@@ -0,0 +1,114 @@
+import json
+import os
+import boto3
+from instrumentation import metrics
+from main import init_predictor, warm_up_predictor
+from inference import PENDING_EXPLANATION_STATUS
+
+dynamodb = boto3.resource("dynamodb")
+transactions_table = dynamodb.Table(os.environ["TRANSACTIONS_TABLE_NAME"])
+
+# Cada request explica: el TreeExplainer se construye en el init del contenedor
+warm_up_predictor()
+
+
+def response(status_code: int, body: dict) -> dict:
+    return {
+        "statusCode": status_code,
+        "headers": {
+            "Content-Type": "application/json",
+            "Access-Control-Allow-Origin": "*",
+        },
+        "body": json.dumps(body),
+    }
+
+
+def handler(event, context):
+    """GET /transactions/{transaction_id}/explanation: SHAP bajo demanda con caché"""
+    print(f"Event: {event}")
+    print(f"Context: {context}")
+    try:
+        transaction_id = (event.get("pathParameters") or {}).get("transaction_id")
+        if not transaction_id:
+            return response(400, {"error": "transaction_id es requerido"})
+
+        with metrics.span("dynamodb_get"):
+            item = transactions_table.get_item(
+                Key={"transaction_id": transaction_id},
+                ProjectionExpression="transaction_id, explanation, model_features, model_version",
+            ).get("Item")
+        if item is None:
+            return response(404, {"error": "Transacción no encontrada"})
+
+        stored = item.get("explanation")
+        explanation = json.loads(stored) if stored else None
+        if explanation and explanation.get("status") != PENDING_EXPLANATION_STATUS:
+            print(f"Explicación en caché para {transaction_id}")
+            return response(
+                200,
+                {
+                    "transaction_id": transaction_id,
+                    "explanation": explanation,
+                    "cached": True,
+                },
+            )
+
+        if not item.get("model_features"):
+            return response(
+                409, {"error": "La transacción aún no tiene features para explicar"}
+            )
+
+        # Se explica con el mismo modelo que predijo; el registry lo conserva cargado
+        predictor = None
+        if item.get("model_version"):
+            predictor = init_predictor(item["model_version"])
+        if predictor is None:
+            predictor = init_predictor()
+            if predictor is None:
+                return response(500, {"error": "No se pudo cargar el modelo"})
+
+        model_version = predictor.model_version
+        if item.get("model_version") and item["model_version"] != model_version:
+            print(
+                f"[WARNING] {transaction_id} se predijo con {item['model_version']}, "
+                f"se explica con {model_version}"
+            )
+
+        explanation = predictor.explain([json.loads(item["model_features"])])[0]
+        if "error" in explanation:
+            return response(500, {"error": explanation["error"]})
+        explanation["transaction_index"] = 0
+
+        # Sólo reemplaza el marcador pendiente; si otro request ya la guardó, gana ése
+        try:
+            condition = {
+                "ConditionExpression": "attribute_not_exists(explanation)",
+                "ExpressionAttributeValues": {":ex": json.dumps(explanation)},
+            }
+            if stored:
+                condition["ConditionExpression"] = "explanation = :pending"
+                condition["ExpressionAttributeValues"][":pending"] = stored
+            transactions_table.update_item(
+                Key={"transaction_id": transaction_id},
+                UpdateExpression="SET explanation = :ex",
+                **condition,
+            )
+        except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+            print(f"La explicación de {transaction_id} ya fue actualizada")
+
+        return response(
+            200,
+            {
+                "transaction_id": transaction_id,
+                "explanation": explanation,
+                "cached": False,
+            },
+        )
+    except Exception as e:
+        print(f"ERROR: {str(e)}")
+        import traceback
+
+        traceback.print_exc()
+        return response(500, {"error": str(e)})
+    finally:
+        metrics.flush()
@@ -0,0 +1,155 @@
+from typing import Dict, Any, List, Tuple
+import numpy as np
+
+
+class CompiledFeatureEncoder:
+    """Réplica del feature_transformer que escribe directo en una matriz float32"""
+
+    def __init__(
+        self,
+        input_names: List[str],
+        categorical: List[Tuple[int, str, Dict[Any, float]]],
+        numerical: List[Tuple[int, List[str], np.ndarray, np.ndarray]],
+        feature_names_out: List[str],
+    ):
+        self.input_names = input_names
+        # (columna de salida, columna de entrada, categoría -> código)
+        self.categorical = categorical
+        # (primera columna de salida, columnas de entrada, mean, scale)
+        self.numerical = numerical
+        self.feature_names_out = feature_names_out
+        self.n_features_out = len(feature_names_out)
+
+    @classmethod
+    def from_transformer(cls, feature_transformer) -> "CompiledFeatureEncoder":
+        """Extrae categorías y parámetros de escala de un ColumnTransformer ajustado"""
+        input_names = list(feature_transformer.feature_names_in_)
+        categorical = []
+        numerical = []
+        position = 0
+
+        for name, transformer, columns in feature_transformer.transformers_:
+            if transformer == "drop" or len(columns) == 0:
+                continue
+            column_names = [
+                input_names[column] if isinstance(column, (int, np.integer)) else column
+                for column in columns
+            ]
+            kind = type(transformer).__name__
+
+            if kind == "OrdinalEncoder":
+                if transformer.handle_unknown != "error":
+                    raise ValueError("OrdinalEncoder sólo con handle_unknown='error'")
+                for column_name, categories in zip(
+                    column_names, transformer.categories_
+                ):
+                    categorical.append(
+                        (
+                            position,
+                            column_name,
+                            {
+                                category: float(code)
+                                for code, category in enumerate(categories)
+                            },
+                        )
+                    )
+                    position += 1
+            elif kind == "StandardScaler":
+                size = len(column_names)
+                mean = (
+                    transformer.mean_
+                    if transformer.with_mean
+                    else np.zeros(size, dtype=np.float64)
+                )
+                scale = (
+                    transformer.scale_
+                    if transformer.with_std
+                    else np.ones(size, dtype=np.float64)
+                )
+                numerical.append((position, column_names, mean, scale))
+                position += size
+            elif transformer == "passthrough":
+                size = len(column_names)
+                numerical.append(
+                    (
+                        position,
+                        column_names,
+                        np.zeros(size, dtype=np.float64),
+                        np.ones(size, dtype=np.float64),
+                    )
+                )
+                position += size
+            else:
+                raise ValueError(f"Transformer no soportado: {name} ({kind})")
+
+        feature_names_out = list(feature_transformer.get_feature_names_out())
+        if len(feature_names_out) != position:
+            raise ValueError("El número de columnas de salida no coincide")
+
+        return cls(input_names, categorical, numerical, feature_names_out)
+
+    def to_spec(self) -> Dict[str, Any]:
+        """Parámetros del encoder serializables a JSON, sin depender de sklearn"""
+        return {
+            "input_names": self.input_names,
+            "categorical": [
+                {"position": position, "column": column_name, "codes": codes}
+                for position, column_name, codes in self.categorical
+            ],
+            "numerical": [
+                {
+                    "position": position,
+                    "columns": column_names,
+                    "mean": [float(value) for value in mean],
+                    "scale": [float(value) for value in scale],
+                }
+                for position, column_names, mean, scale in self.numerical
+            ],
+            "feature_names_out": self.feature_names_out,
+        }
+
+    @classmethod
+    def from_spec(cls, spec: Dict[str, Any]) -> "CompiledFeatureEncoder":
+        """Reconstruye el encoder desde to_spec()"""
+        return cls(
+            input_names=spec["input_names"],
+            categorical=[
+                (block["position"], block["column"], block["codes"])
+                for block in spec["categorical"]
+            ],
+            numerical=[
+                (
+                    block["position"],
+                    block["columns"],
+                    np.asarray(block["mean"], dtype=np.float64),
+                    np.asarray(block["scale"], dtype=np.float64),
+                )
+                for block in spec["numerical"]
+            ],
+            feature_names_out=spec["feature_names_out"],
+        )
+
+    def transform(self, rows: List[Dict[str, Any]]) -> np.ndarray:
+        """Codifica filas de features crudas en el mismo orden que transform()"""
+        X = np.empty((len(rows), self.n_features_out), dtype=np.float32)
+
+        for column, (position, column_name, codes) in enumerate(self.categorical):
+            try:
+                X[:, position] = [codes[row[column_name]] for row in rows]
+            except KeyError as e:
+                # Mismo contrato que handle_unknown='error' del OrdinalEncoder; la
+                # columna se cuenta entre las del encoder, no entre las de entrada
+                raise ValueError(
+                    f"Found unknown categories [{e.args[0]!r}] in column "
+                    f"{column} during transform"
+                )
+
+        for position, column_names, mean, scale in self.numerical:
+            values = np.array(
+                [[row[column] for column in column_names] for row in rows],
+                dtype=np.float64,
+            ).reshape(len(rows), len(column_names))
+            # Se calcula en float64 como sklearn y se castea al escribir
+            X[:, position : position + len(column_names)] = (values - mean) / scale
+
+        return X
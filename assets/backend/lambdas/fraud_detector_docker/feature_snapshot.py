@@ -0,0 +1,240 @@
+"""Snapshots columnares de las tablas de features para el bootstrap del fraud detector.
+
+Cada snapshot es una carpeta snapshot-<watermark>/ con un archivo Arrow IPC sin
+comprimir por tabla, que se puede memory-mapear, más un manifest.json en la raíz
+que apunta a la carpeta vigente. El manifest guarda, por tabla, el último sequence
+number de cada shard de su stream leído antes del scan: el bootstrap continúa desde
+ahí con AFTER_SEQUENCE_NUMBER. La raíz puede ser una carpeta local o
+s3://bucket/prefijo; en ambas se conservan los últimos KEEP_SNAPSHOTS. Se construye
+periódicamente con:
+
+    python feature_snapshot.py --output /tmp/feature_snapshot
+    python feature_snapshot.py --output /tmp/feature_snapshot \\
+        --from-parquet /tmp/synthetic   # salida de benchmarks/synthetic_data.py
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+import boto3
+import polars as pl
+
+MANIFEST_FILE = "manifest.json"
+SNAPSHOT_PREFIX = "snapshot-"
+# Carpetas locales que se conservan; un bootstrap en curso puede seguir leyendo la anterior
+KEEP_SNAPSHOTS = 2
+# Donde se descargan los snapshots de S3 antes de mapearlos
+SNAPSHOT_CACHE_DIR = os.environ.get(
+    "FEATURE_SNAPSHOT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "snapshots")
+)
+
+
+def _split_s3(root: str) -> Tuple[str, str]:
+    bucket, _, prefix = root[len("s3://") :].partition("/")
+    return bucket, prefix.strip("/")
+
+
+def _s3_key(prefix: str, *parts: str) -> str:
+    return "/".join([prefix, *parts]) if prefix else "/".join(parts)
+
+
+def write_snapshot(
+    root: str,
+    frames: Dict[str, pl.DataFrame],
+    watermark: datetime,
+    streams: Optional[Dict[str, Dict]] = None,
+) -> Dict:
+    """Escribe un snapshot y, al final, el manifest que lo publica"""
+    snapshot = f"{SNAPSHOT_PREFIX}{watermark.strftime('%Y%m%dT%H%M%S%fZ')}"
+    manifest = {
+        "snapshot": snapshot,
+        "watermark": watermark.isoformat(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "tables": {},
+        # Sin posiciones (p.ej. desde Parquet) el bootstrap lee todo lo retenido
+        "streams": streams or {},
+    }
+
+    if root.startswith("s3://"):
+        local_root = tempfile.mkdtemp()
+    else:
+        local_root = root
+    snapshot_dir = os.path.join(local_root, snapshot)
+    os.makedirs(snapshot_dir, exist_ok=True)
+
+    for name, df in frames.items():
+        # Sin compresión: el bootstrap mapea los buffers sin copiarlos
+        df.write_ipc(
+            os.path.join(snapshot_dir, f"{name}.arrow"), compression="uncompressed"
+        )
+        manifest["tables"][name] = {
+            "file": f"{name}.arrow",
+            "rows": df.height,
+            "schema": {column: str(dtype) for column, dtype in df.schema.items()},
+        }
+
+    if root.startswith("s3://"):
+        bucket, prefix = _split_s3(root)
+        s3 = boto3.client("s3")
+        for table in manifest["tables"].values():
+            s3.upload_file(
+                os.path.join(snapshot_dir, table["file"]),
+                bucket,
+                _s3_key(prefix, snapshot, table["file"]),
+            )
+        # El manifest va al último: nadie lee un snapshot a medio subir
+        s3.put_object(
+            Bucket=bucket,
+            Key=_s3_key(prefix, MANIFEST_FILE),
+            Body=json.dumps(manifest, indent=2).encode(),
+        )
+        shutil.rmtree(local_root, ignore_errors=True)
+        prune_s3_snapshots(s3, bucket, prefix, snapshot)
+        return manifest
+
+    manifest_path = os.path.join(root, MANIFEST_FILE)
+    with open(f"{manifest_path}.tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+    prune_snapshots(root, snapshot)
+    return manifest
+
+
+def prune_snapshots(root: str, current: str) -> None:
+    """Borra las carpetas locales más viejas que las últimas KEEP_SNAPSHOTS"""
+    snapshots = sorted(
+        entry
+        for entry in os.listdir(root)
+        if entry.startswith(SNAPSHOT_PREFIX) and entry != current
+    )
+    for entry in snapshots[: max(0, len(snapshots) - (KEEP_SNAPSHOTS - 1))]:
+        shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+
+
+def prune_s3_snapshots(s3, bucket: str, prefix: str, current: str) -> None:
+    """Borra de S3 los snapshots más viejos que los últimos KEEP_SNAPSHOTS"""
+    paginator = s3.get_paginator("list_objects_v2")
+    snapshots = []
+    for page in paginator.paginate(
+        Bucket=bucket, Prefix=_s3_key(prefix, SNAPSHOT_PREFIX), Delimiter="/"
+    ):
+        for common_prefix in page.get("CommonPrefixes", []):
+            name = common_prefix["Prefix"].rstrip("/").rsplit("/", 1)[-1]
+            if name != current:
+                snapshots.append(name)
+
+    for snapshot in sorted(snapshots)[: max(0, len(snapshots) - (KEEP_SNAPSHOTS - 1))]:
+        for page in paginator.paginate(
+            Bucket=bucket, Prefix=_s3_key(prefix, snapshot) + "/"
+        ):
+            objects = [{"Key": item["Key"]} for item in page.get("Contents", [])]
+            if objects:
+                s3.delete_objects(Bucket=bucket, Delete={"Objects": objects})
+
+
+def read_manifest(root: str) -> Optional[Dict]:
+    """Manifest vigente, o None si todavía no hay snapshot"""
+    if root.startswith("s3://"):
+        bucket, prefix = _split_s3(root)
+        s3 = boto3.client("s3")
+        try:
+            response = s3.get_object(Bucket=bucket, Key=_s3_key(prefix, MANIFEST_FILE))
+        except s3.exceptions.NoSuchKey:
+            return None
+        return json.loads(response["Body"].read())
+
+    manifest_path = os.path.join(root, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def snapshot_watermark(manifest: Dict) -> datetime:
+    return datetime.fromisoformat(manifest["watermark"])
+
+
+def _local_snapshot_dir(root: str, manifest: Dict) -> str:
+    """Carpeta local del snapshot; de S3 se descarga una sola vez por contenedor"""
+    if not root.startswith("s3://"):
+        return os.path.join(root, manifest["snapshot"])
+
+    snapshot_dir = os.path.join(SNAPSHOT_CACHE_DIR, manifest["snapshot"])
+    if os.path.isdir(snapshot_dir):
+        return snapshot_dir
+
+    bucket, prefix = _split_s3(root)
+    s3 = boto3.client("s3")
+    download_dir = f"{snapshot_dir}.tmp"
+    os.makedirs(download_dir, exist_ok=True)
+    for table in manifest["tables"].values():
+        s3.download_file(
+            bucket,
+            _s3_key(prefix, manifest["snapshot"], table["file"]),
+            os.path.join(download_dir, table["file"]),
+        )
+    os.replace(download_dir, snapshot_dir)
+    # /tmp es limitado: sólo se quedan las descargas recientes
+    prune_snapshots(SNAPSHOT_CACHE_DIR, manifest["snapshot"])
+    return snapshot_dir
+
+
+def read_snapshot(
+    root: str, manifest: Optional[Dict] = None
+) -> Tuple[Dict[str, pl.DataFrame], Dict]:
+    """Mapea en memoria las tablas del snapshot vigente sin copiar sus columnas"""
+    manifest = manifest or read_manifest(root)
+    if manifest is None:
+        raise FileNotFoundError(f"No hay snapshot en {root}")
+
+    snapshot_dir = _local_snapshot_dir(root, manifest)
+    frames = {}
+    for name, table in manifest["tables"].items():
+        # rechunk=False conserva los buffers mapeados en lugar de copiarlos
+        frames[name] = pl.read_ipc(
+            os.path.join(snapshot_dir, table["file"]),
+            memory_map=True,
+            rechunk=False,
+        )
+        if frames[name].height != table["rows"]:
+            raise ValueError(
+                f"{name}: {frames[name].height} filas, el manifest dice {table['rows']}"
+            )
+    return frames, manifest
+
+
+def read_parquet_tables(directory: str) -> Dict[str, Dict[str, pl.Series]]:
+    """Columnas crudas por tabla desde <directory>/<tabla>/*.parquet"""
+    return {
+        name: pl.read_parquet(os.path.join(directory, name, "*.parquet")).to_dict()
+        for name in sorted(os.listdir(directory))
+        if os.path.isdir(os.path.join(directory, name))
+    }
+
+
+def main() -> None:
+    from main import build_feature_snapshot
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", required=True, help="carpeta o s3://bucket/prefijo")
+    parser.add_argument(
+        "--from-parquet",
+        help="carpeta con <tabla>/*.parquet en lugar de escanear DynamoDB",
+    )
+    args = parser.parse_args()
+
+    columns = read_parquet_tables(args.from_parquet) if args.from_parquet else None
+    manifest = build_feature_snapshot(args.output, columns)
+    for name, table in manifest["tables"].items():
+        print(f"[INFO] {name}: {table['rows']:,} filas")
+    print(f"[INFO] Snapshot {manifest['snapshot']}, watermark {manifest['watermark']}")
+    for name, positions in manifest["streams"].items():
+        print(f"[INFO] {name}: {len(positions['shards'])} shards con posición")
+
+
+if __name__ == "__main__":
+    main()
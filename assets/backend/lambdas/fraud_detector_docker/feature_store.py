@@ -0,0 +1,264 @@
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Tuple
+import logging
+import polars as pl
+from main import (
+    build_default_features,
+    build_geo_risk_map,
+    convert_risk_level_to_float,
+    log_message,
+)
+
+
+class _ClientActivity:
+    """Buckets de actividad de un cliente ordenados por bucket_timestamp"""
+
+    __slots__ = ("timestamps", "tx_count_prefix", "counterparties")
+
+    def __init__(self, rows: List[Tuple[datetime, Optional[int], Optional[str]]]):
+        rows.sort(key=lambda row: row[0])
+        self.timestamps = [row[0] for row in rows]
+
+        # Suma acumulada de tx_count para resolver ventanas en O(log n)
+        self.tx_count_prefix = [0]
+        for _, tx_count, _ in rows:
+            self.tx_count_prefix.append(self.tx_count_prefix[-1] + (tx_count or 0))
+
+        self.counterparties = [_split_counterparties(row[2]) for row in rows]
+
+    def window(self, start: datetime, end: datetime) -> Tuple[int, int]:
+        """Rango [lo, hi) de buckets con start <= bucket_timestamp < end"""
+        return bisect_left(self.timestamps, start), bisect_left(self.timestamps, end)
+
+
+def _split_counterparties(value: Optional[str]) -> frozenset:
+    if value is None:
+        return frozenset()
+    return frozenset(
+        counterparty.strip()
+        for counterparty in value.split(",")
+        if counterparty.strip() != ""
+    )
+
+
+def _single(index: Dict, key: Any) -> Optional[tuple]:
+    """Equivalente a filter(...).item(): falla si la llave está duplicada"""
+    rows = index.get(key)
+    if not rows:
+        return None
+    if len(rows) > 1:
+        raise ValueError(
+            f"can only call '.item()' if the dataframe is of shape (1, 1), got {len(rows)} rows for {key}"
+        )
+    return next(iter(rows.values()))
+
+
+class FeatureStore:
+    """Índices en memoria para calcular features dinámicas sin escanear DataFrames"""
+
+    # tabla -> (llave primaria, llave de búsqueda, columnas indexadas)
+    TABLES = {
+        "clients": ("client_id", "account_id", ["risk_level", "country"]),
+        "counterparties": ("counterparty_id", "account_id", ["country"]),
+        "client_tx_state": (
+            "client_tx_state_id",
+            "client_account_id",
+            ["avg_tx_amount", "std_tx_amount"],
+        ),
+        "client_recent_activity": (
+            "client_recent_activity_id",
+            "client_account_id",
+            ["bucket_timestamp", "tx_count", "unique_counterparties"],
+        ),
+    }
+
+    def __init__(
+        self,
+        clients_df: Optional[pl.DataFrame],
+        counterparties_df: Optional[pl.DataFrame],
+        client_tx_state_df: Optional[pl.DataFrame],
+        client_recent_activity_df: Optional[pl.DataFrame],
+    ):
+        self.available = not (
+            client_tx_state_df is None
+            or client_recent_activity_df is None
+            or clients_df is None
+            or counterparties_df is None
+        )
+        self.geo_risk_map = build_geo_risk_map()
+
+        # llave de búsqueda -> {llave primaria: valores}, para poder aplicar upserts
+        self.indexes = {table: {} for table in self.TABLES}
+        self._lookup_keys = {table: {} for table in self.TABLES}
+        self.client_activity = {}
+
+        for table, df in zip(
+            self.TABLES,
+            [
+                clients_df,
+                counterparties_df,
+                client_tx_state_df,
+                client_recent_activity_df,
+            ],
+        ):
+            self.upsert(table, df)
+
+        print(
+            f"FeatureStore listo: {len(self.indexes['clients']):,} clientes, "
+            f"{len(self.indexes['counterparties']):,} contrapartes, "
+            f"{len(self.client_activity):,} clientes con actividad reciente"
+        )
+
+    def upsert(self, table: str, df: Optional[pl.DataFrame]) -> None:
+        """Inserta o reemplaza en el índice las filas de un DataFrame"""
+        if df is None or df.shape[0] == 0:
+            return
+
+        pk_name, key_name, columns = self.TABLES[table]
+        if pk_name not in df.columns:
+            # Sin llave primaria no hay forma de reemplazar ni eliminar la fila después
+            raise ValueError(f"{table}: falta la llave primaria {pk_name}")
+        primary_keys = df.get_column(pk_name).to_list()
+        keys = df.get_column(key_name).to_list()
+        values = zip(*(df.get_column(column).to_list() for column in columns))
+
+        touched = set()
+        for primary_key, key, row_values in zip(primary_keys, keys, values):
+            touched.update(self._discard(table, primary_key))
+            if key is None:
+                continue
+            self.indexes[table].setdefault(key, {})[primary_key] = row_values
+            self._lookup_keys[table][primary_key] = key
+            touched.add(key)
+
+        self._rebuild_activity(table, touched)
+
+    def remove(self, table: str, primary_keys: List[Any]) -> None:
+        """Elimina del índice las filas borradas en la tabla"""
+        touched = set()
+        for primary_key in primary_keys:
+            touched.update(self._discard(table, primary_key))
+        self._rebuild_activity(table, touched)
+
+    def _discard(self, table: str, primary_key: Any) -> List[Any]:
+        key = self._lookup_keys[table].pop(primary_key, None)
+        if key is None:
+            return []
+        rows = self.indexes[table][key]
+        rows.pop(primary_key, None)
+        if not rows:
+            del self.indexes[table][key]
+        return [key]
+
+    def _rebuild_activity(self, table: str, client_account_ids: set) -> None:
+        if table != "client_recent_activity":
+            return
+        for client_account_id in client_account_ids:
+            rows = [
+                row
+                for row in self.indexes[table].get(client_account_id, {}).values()
+                if row[0] is not None
+            ]
+            if rows:
+                self.client_activity[client_account_id] = _ClientActivity(rows)
+            else:
+                self.client_activity.pop(client_account_id, None)
+
+    def get_dynamic_features(
+        self,
+        transaction: Dict[str, Any],
+        calculate_mean_std: bool = True,
+        logger: Optional[logging.Logger] = None,
+    ) -> Dict[str, Any]:
+        """Mismas features que main.get_dynamic_features usando los índices en memoria"""
+
+        DEFAULT_FEATURES = build_default_features(transaction)
+
+        if not self.available:
+            log_message(
+                "No hay datos históricos disponibles, usando valores por defecto",
+                level="warning",
+                logger=logger,
+            )
+            return DEFAULT_FEATURES
+
+        try:
+            client_account_id = transaction["client_account_id"]
+
+            current_time = datetime.strptime(
+                transaction["timestamp"], "%Y-%m-%d %H:%M:%S"
+            )
+            day_part = "night"
+
+            # 1. Calcular geo risks
+            client_info = _single(self.indexes["clients"], client_account_id)
+            client_risk = client_info[0] if client_info is not None else None
+            client_country = client_info[1] if client_info is not None else "Mexico"
+
+            counterparty_info = _single(
+                self.indexes["counterparties"], transaction["counterparty_account_id"]
+            )
+            counterparty_country = (
+                counterparty_info[0] if counterparty_info is not None else "Mexico"
+            )
+
+            client_geo_risk = self.geo_risk_map.get(client_country, 0.4)
+            counterparty_geo_risk = self.geo_risk_map.get(counterparty_country, 0.4)
+
+            # 2. Calcular información de montos
+            client_state = _single(self.indexes["client_tx_state"], client_account_id)
+            mean_amount = (
+                client_state[0]
+                if client_state is not None
+                else transaction.get("amount", 0)
+            )
+            std_amount = client_state[1] if client_state is not None else 0.0
+
+            # 3. Calcular actividad reciente
+            tx_count_1h = 0
+            unique_cp_1d = 0
+            activity = self.client_activity.get(client_account_id)
+            if activity is not None:
+                lo, hi = activity.window(
+                    current_time - timedelta(hours=1), current_time
+                )
+                tx_count_1h = (
+                    activity.tx_count_prefix[hi] - activity.tx_count_prefix[lo]
+                )
+
+                lo, hi = activity.window(current_time - timedelta(days=1), current_time)
+                if hi > lo:
+                    unique_cp_1d = len(
+                        frozenset().union(*activity.counterparties[lo:hi])
+                    )
+
+            calculated_features = {
+                "client_risk_level": (
+                    convert_risk_level_to_float(client_risk) if client_risk else 0.1
+                ),
+                "client_geo_risk": client_geo_risk,
+                "counterparty_geo_risk": counterparty_geo_risk,
+                "tx_count_1h": tx_count_1h,
+                "unique_cp_1d": unique_cp_1d,
+                "mean_amount": mean_amount,
+                "std_amount": std_amount,
+                "day_part": day_part,
+            }
+
+            log_message(
+                "Features calculadas",
+                level="debug",
+                logger=logger,
+                client_account_id=client_account_id,
+                features=calculated_features,
+            )
+            return calculated_features
+
+        except Exception as e:
+            log_message(
+                f"Error calculando features dinámicas: {e}",
+                level="error",
+                logger=logger,
+            )
+            return DEFAULT_FEATURES
@@ -1,24 +1,86 @@
-import joblib
-import pandas as pd
 import numpy as np
 from datetime import datetime
-import shap
 import os
-from typing import Dict, Any, List
+import threading
+from typing import TYPE_CHECKING, Dict, Any, List
+from feature_encoder import CompiledFeatureEncoder
+from instrumentation import metrics
+from structured_logging import log_message
+from model_artifacts import (
+    MODEL_PREFIX,
+    SPEC_FILE,
+    artifact_dir_for,
+    load_artifacts,
+    model_timestamp,
+)
+from tree_engine import FlatTreeEnsemble
 import warnings
 
+# joblib, pandas y shap se importan al usarse: con artefactos nativos el cold start
+# sólo paga NumPy, y SHAP únicamente cuando se pide una explicación
+if TYPE_CHECKING:
+    import pandas as pd
+
 warnings.filterwarnings("ignore")
 
+# Número de factores SHAP que se conservan por transacción; vacío = todos
+SHAP_TOP_K = int(os.environ["SHAP_TOP_K"]) if os.environ.get("SHAP_TOP_K") else None
+
+# Probabilidad a partir de la cual SHAP se calcula en línea; el resto queda
+# pendiente y se explica bajo demanda. 0 explica todo el batch.
+SHAP_INLINE_THRESHOLD = float(os.environ.get("SHAP_INLINE_THRESHOLD", "0"))
+
+# "xgboost" usa predict_proba del modelo; "numpy" evalúa los árboles aplanados
+# en batches chicos, donde el overhead del wrapper domina, y XGBoost en los grandes
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "xgboost")
+NUMPY_BACKEND_MAX_BATCH = int(os.environ.get("NUMPY_BACKEND_MAX_BATCH", "64"))
+
+PENDING_EXPLANATION_STATUS = "PENDING"
+
+
+def pending_explanation(transaction_index: int) -> Dict[str, Any]:
+    """Marcador de explicación diferida; top_risk_factors vacío para el dashboard"""
+    return {
+        "status": PENDING_EXPLANATION_STATUS,
+        "top_risk_factors": [],
+        "total_features_analyzed": 0,
+        "transaction_index": transaction_index,
+    }
+
 
 class TransactionRiskPredictor:
-    def __init__(self, model_dir: str = None):
+    def __init__(
+        self,
+        model_dir: str = None,
+        shap_top_k: int = SHAP_TOP_K,
+        shap_threshold: float = SHAP_INLINE_THRESHOLD,
+        backend: str = INFERENCE_BACKEND,
+        use_artifacts: bool = True,
+        artifact_dir: str = None,
+        challengers: List["TransactionRiskPredictor"] = None,
+    ):
         self.model = None
         self.feature_transformer = None
         self.label_encoder = None
         self.explainer = None
         self.feature_names = None
         self.latest_timestamp = None
+        self.shap_top_k = shap_top_k
+        self.shap_threshold = shap_threshold
+        self.backend = backend
+        self.tree_engine = None
+        self.feature_encoder = None
+        self._explanation_names = None
+        self._explainer_lock = threading.Lock()
+        self.use_artifacts = use_artifacts
         self.model_dir = model_dir or self._find_latest_model()
+        self.model_version = os.path.basename(self.model_dir)
+        self.latest_timestamp = model_timestamp(self.model_version)
+        self.artifact_dir = artifact_dir or artifact_dir_for(self.latest_timestamp)
+        # [(predictor, comparte la matriz del campeón)]; sólo se evalúan los árboles
+        self.challengers = []
+        if challengers:
+            self.set_challengers(challengers)
 
     def _find_latest_model(self) -> str:
         """Encuentra el modelo más reciente en la carpeta raíz del lambda"""
@@ -27,7 +89,7 @@ class TransactionRiskPredictor:
         model_files = [
             f
             for f in os.listdir(script_dir)
-            if f.startswith("xgboost_model_") and f.endswith(".pkl")
+            if f.startswith(MODEL_PREFIX) and f.endswith(".pkl")
         ]
 
         if not model_files:
@@ -37,31 +99,46 @@ class TransactionRiskPredictor:
         latest_model = model_files[0]
         print("lastest_model:", latest_model)
 
-        timestamp = latest_model.split("xgboost_model_balanced_")[-1].replace(
-            ".pkl", ""
-        )
-        self.latest_timestamp = timestamp
-
         return os.path.join(script_dir, latest_model)
 
+    def set_challengers(self, challengers: List["TransactionRiskPredictor"]) -> None:
+        """Modelos en sombra: se puntúan con el mismo batch y nunca se publican"""
+        if self.model is None:
+            self.load_model()
+        attached = []
+        for challenger in challengers:
+            if challenger.model_version == self.model_version:
+                continue
+            if challenger.model is None:
+                challenger.load_model()
+            # Mismo encoder, misma matriz: el costo del challenger es sólo el árbol
+            shares_matrix = (
+                self.feature_encoder is not None
+                and challenger.feature_encoder is not None
+                and challenger.feature_encoder.to_spec()
+                == self.feature_encoder.to_spec()
+            )
+            if not shares_matrix:
+                print(
+                    f"[WARNING] {challenger.model_version} usa otro encoder; "
+                    "se transforma aparte"
+                )
+            attached.append((challenger, shares_matrix))
+        # Se reemplaza la lista completa: un batch en curso ve la anterior o la nueva
+        self.challengers = attached
+
     def load_model(self):
         """Cargar modelo y transformadores"""
         try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-
-            model_path = f"xgboost_model_balanced_{self.latest_timestamp}.pkl"
-            model_full_path = os.path.join(script_dir, model_path)
-            self.model = joblib.load(model_full_path)
+            self._explanation_names = None
+            self.explainer = None
 
-            transformer_path = (
-                f"feature_transformer_balanced_{self.latest_timestamp}.pkl"
-            )
-            transformer_full_path = os.path.join(script_dir, transformer_path)
-            self.feature_transformer = joblib.load(transformer_full_path)
-
-            encoder_path = f"label_encoder_balanced_{self.latest_timestamp}.pkl"
-            encoder_full_path = os.path.join(script_dir, encoder_path)
-            self.label_encoder = joblib.load(encoder_full_path)
+            if self.use_artifacts and os.path.isfile(
+                os.path.join(self.artifact_dir, SPEC_FILE)
+            ):
+                self._load_native_artifacts(self.artifact_dir)
+            else:
+                self._load_pickles()
 
             self.feature_names = [
                 "movement_type",
@@ -82,13 +159,62 @@ class TransactionRiskPredictor:
         except Exception as e:
             raise Exception(f"Error cargando modelo: {str(e)}")
 
+    def _load_native_artifacts(self, artifact_dir: str):
+        """Booster nativo diferido, encoder desde JSON y árboles desde NPZ"""
+        artifacts = load_artifacts(artifact_dir)
+        self.model = artifacts["model"]
+        self.feature_encoder = artifacts["feature_encoder"]
+        self.feature_transformer = None
+        self.label_encoder = None
+        self.model_version = artifacts["spec"]["model_version"]
+        self.tree_engine = artifacts["tree_engine"] if self.backend == "numpy" else None
+        print(f"[INFO] Artefactos nativos cargados desde: {artifact_dir}")
+
+    def _load_pickles(self):
+        """Ruta original: pickles de sklearn/XGBoost, más lenta en cold start"""
+        import joblib
+
+        script_dir = os.path.dirname(os.path.abspath(self.model_dir))
+
+        self.model = joblib.load(self.model_dir)
+
+        transformer_path = f"feature_transformer_balanced_{self.latest_timestamp}.pkl"
+        transformer_full_path = os.path.join(script_dir, transformer_path)
+        self.feature_transformer = joblib.load(transformer_full_path)
+
+        encoder_path = f"label_encoder_balanced_{self.latest_timestamp}.pkl"
+        encoder_full_path = os.path.join(script_dir, encoder_path)
+        self.label_encoder = joblib.load(encoder_full_path)
+
+        try:
+            self.feature_encoder = CompiledFeatureEncoder.from_transformer(
+                self.feature_transformer
+            )
+        except ValueError as e:
+            print(f"[WARNING] Se usará feature_transformer.transform: {e}")
+            self.feature_encoder = None
+
+        self.tree_engine = None
+        if self.backend == "numpy":
+            self.tree_engine = FlatTreeEnsemble.from_booster(self.model.get_booster())
+
     def _prepare_transaction_features(
         self, transactions: List[Dict[str, Any]]
-    ) -> pd.DataFrame:
+    ) -> "pd.DataFrame":
         """Preparar features de una transacción individual"""
+        import pandas as pd
+
+        return pd.DataFrame(self._feature_rows(transactions))
+
+    def _feature_rows(self, transactions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Features crudas de cada transacción, con los valores por defecto del modelo"""
 
         features_list = []
-        print("Preparing features for transactions:", transactions)
+        log_message(
+            "Preparing features for transactions",
+            level="debug",
+            transactions=transactions,
+        )
         for transaction in transactions:
             features_dict = {
                 "movement_type": transaction.get("movement_type", "TRANSFER"),
@@ -109,7 +235,15 @@ class TransactionRiskPredictor:
             }
             features_list.append(features_dict)
 
-        return pd.DataFrame(features_list)
+        return features_list
+
+    def _transform(self, feature_rows: List[Dict[str, Any]]) -> Any:
+        """Matriz para el modelo: encoder compilado o, si no aplica, el transformer"""
+        if self.feature_encoder is not None:
+            return self.feature_encoder.transform(feature_rows)
+        import pandas as pd
+
+        return self.feature_transformer.transform(pd.DataFrame(feature_rows))
 
     def predict_risk(self, transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Predecir riesgo de una transacción y generar explicación SHAP"""
@@ -119,26 +253,65 @@ class TransactionRiskPredictor:
 
         processed_tx = []
 
-        # Preparar features
-        features_df = self._prepare_transaction_features(transactions)
-        print("Features DataFrame:", features_df)
-
-        # Transformar features
-        X_transformed = self.feature_transformer.transform(features_df)
+        # Preparar y transformar features sin pasar por pandas
+        model_features = self._feature_rows(transactions)
+        with metrics.span("transform"):
+            X_transformed = self._transform(model_features)
+        log_message(
+            "Transformed features",
+            level="debug",
+            shape=lambda: list(X_transformed.shape),
+        )
 
-        # Predicción
-        risk_probability = [
-            float(value) for value in self.model.predict_proba(X_transformed)[:, 1]
+        # Predicción: un solo predict_proba para todo el batch; la clase se deriva
+        # con el mismo umbral de 0.5 que usa XGBClassifier.predict
+        with metrics.span("predict"):
+            probabilities = self._predict_proba(X_transformed, len(transactions))
+        risk_probability = [float(value) for value in probabilities]
+        risk_prediction = [
+            int(value)
+            for value in self.model.classes_[(probabilities > 0.5).astype(int)]
         ]
-        risk_prediction = [int(value) for value in self.model.predict(X_transformed)]
-        print("Risk probabilities:", risk_probability)
-        print("Risk predictions:", risk_prediction)
+        log_message(
+            "Risk probabilities",
+            level="debug",
+            risk_probability=risk_probability,
+            risk_prediction=risk_prediction,
+        )
+        challenger_scores = {}
+        if self.challengers:
+            with metrics.span("challengers"):
+                challenger_scores = self._score_challengers(
+                    X_transformed, model_features
+                )
 
-        # Generar explicación SHAP
-        shap_explanations = self._generate_shap_explanation(X_transformed, features_df)
-        print("SHAP explanations:", shap_explanations)
+        # Generar explicación SHAP sólo para las transacciones sobre el umbral
+        explain_idx = np.flatnonzero(probabilities >= self.shap_threshold)
+        shap_explanations = [
+            pending_explanation(idx) for idx in range(len(transactions))
+        ]
+        if explain_idx.size:
+            # Sin encoder compilado, el transformer devuelve pandas (set_output)
+            X_explain = (
+                X_transformed.iloc[explain_idx]
+                if hasattr(X_transformed, "iloc")
+                else X_transformed[explain_idx]
+            )
+            with metrics.span("shap"):
+                explained = self._generate_shap_explanation(
+                    X_explain,
+                    [model_features[idx] for idx in explain_idx],
+                    top_k=self.shap_top_k,
+                )
+            for idx, explanation in zip(explain_idx.tolist(), explained):
+                explanation["transaction_index"] = idx
+                shap_explanations[idx] = explanation
+        log_message(
+            lambda: f"SHAP en línea para {explain_idx.size}/{len(transactions)} transacciones",
+            level="debug",
+            shap_explanations=shap_explanations,
+        )
 
-        print("Preparing final results...")
         for idx, transaction in enumerate(transactions):
             risk_level = self._interpret_risk_level(risk_probability[idx])
 
@@ -149,86 +322,183 @@ class TransactionRiskPredictor:
                     "risk_prediction": bool(risk_prediction[idx]),
                     "risk_level": risk_level,
                     "shap_explanation": shap_explanations[idx],
-                    "model_version": os.path.basename(self.model_dir),
+                    "model_features": model_features[idx],
+                    "model_version": self.model_version,
                     "prediction_timestamp": datetime.now().isoformat(),
                 }
             )
+            if challenger_scores:
+                processed_tx[-1]["challenger_scores"] = {
+                    version: scores[idx]
+                    for version, scores in challenger_scores.items()
+                }
 
         return processed_tx
 
-    def _generate_shap_explanation(
-        self, X_transformed: np.ndarray, original_features: pd.DataFrame
-    ) -> List[Dict[str, Any]]:
-        """Generar explicación SHAP para múltiples transacciones"""
+    def _predict_proba(self, X_transformed: Any, n_rows: int) -> np.ndarray:
+        """Probabilidad de la clase positiva con el backend que convenga al batch"""
+        if self.tree_engine is not None and n_rows <= NUMPY_BACKEND_MAX_BATCH:
+            return self.tree_engine.predict_proba(X_transformed)[:, 1]
+        return self.model.predict_proba(X_transformed)[:, 1]
+
+    def _score_challengers(
+        self, X_transformed: Any, model_features: List[Dict[str, Any]]
+    ) -> Dict[str, List[float]]:
+        """Probabilidad de cada challenger sobre el batch; un fallo no afecta al campeón"""
+        scores = {}
+        for challenger, shares_matrix in self.challengers:
+            try:
+                X = (
+                    X_transformed
+                    if shares_matrix
+                    else challenger._transform(model_features)
+                )
+                probabilities = challenger._predict_proba(X, len(model_features))
+                scores[challenger.model_version] = [
+                    round(float(value), 4) for value in probabilities
+                ]
+            except Exception as e:
+                log_message(
+                    f"Challenger {challenger.model_version} falló: {e}",
+                    level="warning",
+                )
+        return scores
 
-        try:
-            if self.explainer is None:
-                self.explainer = shap.TreeExplainer(self.model)
+    def warm_up(self, explain: bool = True) -> None:
+        """Ejecuta una vez cada camino del request para que imports y cachés queden listos"""
+        if self.model is None:
+            self.load_model()
+
+        if explain:
+            self._get_explainer()
+        if self.feature_encoder is None:
+            return
+
+        # Primera categoría conocida de cada columna; el resto, valores por defecto
+        sample = {
+            column_name: next(iter(codes))
+            for _, column_name, codes in self.feature_encoder.categorical
+        }
+        feature_rows = self._feature_rows([sample])
+        X_transformed = self._transform(feature_rows)
+
+        # Batch chico (motor NumPy) y grande (booster) para cargar ambos backends
+        self._predict_proba(X_transformed, 1)
+        self.model.predict_proba(X_transformed)
+        if explain:
+            self._generate_shap_explanation(X_transformed, feature_rows)
 
-            shap_values = self.explainer.shap_values(X_transformed)
-            print("shap_values shape:", np.array(shap_values).shape)
+    def explain(self, model_features: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Explicación SHAP diferida a partir de las features guardadas al predecir"""
+
+        if self.model is None:
+            self.load_model()
+
+        feature_rows = self._feature_rows(model_features)
+        X_transformed = self._transform(feature_rows)
+        with metrics.span("shap"):
+            return self._generate_shap_explanation(
+                X_transformed, feature_rows, top_k=self.shap_top_k
+            )
 
-            # Obtener nombres de features transformadas
-            feature_names_transformed = None
-            if hasattr(self.feature_transformer, "get_feature_names_out"):
+    def _explanation_feature_names(self) -> np.ndarray:
+        """Nombres de features sin prefijo del transformer, calculados una sola vez"""
+        if self._explanation_names is None:
+            if self.feature_encoder is not None:
+                feature_names_transformed = self.feature_encoder.feature_names_out
+            elif hasattr(self.feature_transformer, "get_feature_names_out"):
                 feature_names_transformed = (
                     self.feature_transformer.get_feature_names_out()
                 )
             else:
                 feature_names_transformed = self.feature_names
 
-            # Generar explicación para cada transacción
-            explanations = []
+            self._explanation_names = np.array(
+                [
+                    name.split("__")[1] if "__" in name else name
+                    for name in feature_names_transformed
+                ],
+                dtype=object,
+            )
+        return self._explanation_names
 
-            for tx_idx in range(
-                X_transformed.shape[0]
-            ):  # Iterar sobre cada transacción
-                feature_importance = []
+    def _get_explainer(self):
+        """TreeExplainer construido una sola vez aunque lo pidan varios hilos"""
+        if self.explainer is None:
+            with self._explainer_lock:
+                if self.explainer is None:
+                    import shap
 
-                # Obtener valores SHAP para esta transacción específica
-                tx_shap_values = (
-                    shap_values[tx_idx] if len(shap_values.shape) > 1 else shap_values
-                )
+                    # Booster nativo o XGBClassifier: exponen el mismo booster
+                    self.explainer = shap.TreeExplainer(self.model.get_booster())
+        return self.explainer
 
-                for feature_idx, (feature_name, shap_val) in enumerate(
-                    zip(feature_names_transformed, tx_shap_values)
-                ):
-                    original_name = feature_name
-                    if "__" in feature_name:
-                        original_name = (
-                            feature_name.split("__")[1]
-                            if len(feature_name.split("__")) > 1
-                            else feature_name
-                        )
+    def _generate_shap_explanation(
+        self,
+        X_transformed: np.ndarray,
+        original_features: List[Dict[str, Any]],
+        top_k: int = None,
+    ) -> List[Dict[str, Any]]:
+        """Generar explicación SHAP para múltiples transacciones"""
+
+        try:
+            explainer = self._get_explainer()
+            shap_values = np.asarray(explainer.shap_values(X_transformed))
+            log_message(
+                "shap_values shape",
+                level="debug",
+                shape=lambda: list(shap_values.shape),
+            )
+
+            n_transactions = X_transformed.shape[0]
+            if shap_values.ndim == 1:
+                shap_values = np.broadcast_to(
+                    shap_values, (n_transactions, shap_values.shape[0])
+                )
+            shap_values = shap_values.astype(np.float64)
+            n_features = shap_values.shape[1]
+
+            # Orden por magnitud para toda la matriz; stable conserva el orden de
+            # las features empatadas igual que list.sort
+            magnitudes = np.abs(shap_values)
+            order = np.argsort(-magnitudes, axis=1, kind="stable")
+            if top_k is not None:
+                order = order[:, :top_k]
+
+            names = self._explanation_feature_names()[order].tolist()
+            values = np.take_along_axis(shap_values, order, axis=1)
+            increases = (values > 0).tolist()
+            magnitudes = np.take_along_axis(magnitudes, order, axis=1).tolist()
+            values = values.tolist()
+            base_risk = float(explainer.expected_value)
 
-                    feature_importance.append(
+            return [
+                {
+                    "top_risk_factors": [
                         {
-                            "feature": original_name,
-                            "shap_value": float(shap_val),
+                            "feature": feature,
+                            "shap_value": shap_val,
                             "impact": (
-                                "increases_risk" if shap_val > 0 else "decreases_risk"
+                                "increases_risk" if increases_risk else "decreases_risk"
                             ),
-                            "magnitude": abs(float(shap_val)),
+                            "magnitude": magnitude,
                         }
-                    )
-
-                # Ordenar por magnitud (importancia)
-                feature_importance.sort(key=lambda x: x["magnitude"], reverse=True)
-
-                # Crear explicación para esta transacción
-                tx_explanation = {
-                    "top_risk_factors": feature_importance,
-                    "base_risk": float(self.explainer.expected_value),
-                    "total_features_analyzed": len(feature_importance),
+                        for feature, shap_val, increases_risk, magnitude in zip(
+                            names[tx_idx],
+                            values[tx_idx],
+                            increases[tx_idx],
+                            magnitudes[tx_idx],
+                        )
+                    ],
+                    "base_risk": base_risk,
+                    "total_features_analyzed": n_features,
                     "transaction_index": tx_idx,
                 }
-
-                explanations.append(tx_explanation)
-
-            return explanations
+                for tx_idx in range(n_transactions)
+            ]
 
         except Exception as e:
-            print(f"[WARNING] Error generando SHAP: {str(e)}")
+            log_message(f"Error generando SHAP: {str(e)}", level="warning")
             # Retornar lista vacía del mismo tamaño que el número de transacciones
             return [
                 {
@@ -258,6 +528,9 @@ class TransactionRiskPredictor:
 def predict_transaction_risk(
     transaction: Dict[str, Any], model_dir: str = None
 ) -> Dict[str, Any]:
-    """Función wrapper para predicción rápida"""
-    predictor = TransactionRiskPredictor(model_dir)
-    return predictor.predict_risk(transaction)
+    """Función wrapper para predicción rápida con el modelo ya cargado del registry"""
+    from model_registry import get_registry
+
+    model_version = os.path.basename(model_dir) if model_dir else None
+    predictor = get_registry().get(model_version)
+    return predictor.predict_risk([transaction])[0]
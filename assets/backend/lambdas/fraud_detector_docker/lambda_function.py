@@ -1,8 +1,26 @@
 import json
 import os
 import boto3
+from boto3.dynamodb.types import TypeDeserializer
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
-from main import load_all_tables, get_dynamic_features, init_predictor
+from decision_cache import (
+    ANALYZED_STATUS,
+    DECISION_ATTRIBUTES,
+    DecisionCache,
+    decision_from_item,
+)
+from instrumentation import metrics
+from main import (
+    FEATURE_SNAPSHOT_PATH,
+    load_all_tables,
+    load_feature_snapshot,
+    init_predictor,
+    warm_up_predictor,
+)
+from structured_logging import begin_invocation, log_message
+from feature_store import FeatureStore
+from stream_refresher import FeatureRefresher, StreamRefreshError
 
 
 sqs = boto3.client("sqs")
@@ -18,114 +36,496 @@ clients_df = None
 counterparties_df = None
 client_tx_state_df = None
 client_recent_activity_df = None
+feature_store = None
+feature_refresher = None
+# Decisiones ya escritas: una redelivery no vuelve a calcular features, modelo ni SHAP
+decision_cache = DecisionCache()
+deserializer = TypeDeserializer()
+mexico_tz = timezone(timedelta(hours=-6))
+# info: todas las comparaciones en sombra; debug: sólo las invocaciones muestreadas
+CHALLENGER_LOG_LEVEL = os.environ.get("CHALLENGER_LOG_LEVEL", "info")
+# Intentos de la escritura condicional antes de reportar el registro como fallido
+COMMIT_DECISION_ATTEMPTS = 2
 
+# Fuera del handler: el init del contenedor absorbe la carga del modelo y de shap
+warm_up_predictor()
 
-def handler(event, context):
-    global data_loaded, predictor, transaction_data, clients_df, counterparties_df, client_tx_state_df, client_recent_activity_df
 
-    print(f"Event: {event}")
-    print(f"Body: {json.loads(event.get('Records', {})[0].get('body', {}))}")
-    print(f"Context: {context}")
+def load_state():
+    """Bootstrap desde el snapshot de features si hay uno vigente; si no, carga completa"""
+    if FEATURE_SNAPSHOT_PATH:
+        try:
+            if load_state_from_snapshot():
+                return
+        except Exception as e:
+            log_message(
+                f"Bootstrap desde snapshot falló, carga completa: {e}",
+                level="warning",
+            )
+    load_full_state()
+
+
+def load_state_from_snapshot() -> bool:
+    """Mapea el snapshot y reproduce sólo los cambios del stream desde las posiciones del snapshot"""
+    global transaction_data, clients_df, counterparties_df, client_tx_state_df, client_recent_activity_df, feature_store, feature_refresher
+
+    with metrics.span("load_snapshot"):
+        snapshot = load_feature_snapshot()
+    if snapshot is None:
+        return False
+    frames, manifest = snapshot
+
+    # Sin stream no hay deltas: se cae a la carga completa. Snapshots sin posiciones
+    # (p.ej. construidos desde Parquet) reproducen todo lo retenido
+    refresher = FeatureRefresher()
+    refresher.start(manifest.get("streams") or {})
+    store = FeatureStore(
+        frames["clients"],
+        frames["counterparties"],
+        frames["client_tx_state"],
+        frames["client_recent_activity"],
+    )
+    with metrics.span("replay_deltas"):
+        frames = refresher.replay(frames, store)
+
+    # Las transacciones no son insumo de las features; el snapshot no las incluye
+    transaction_data = None
+    clients_df = frames["clients"]
+    counterparties_df = frames["counterparties"]
+    client_tx_state_df = frames["client_tx_state"]
+    client_recent_activity_df = frames["client_recent_activity"]
+    feature_store = store
+    feature_refresher = refresher
+    log_message(
+        "Estado cargado desde snapshot",
+        snapshot=manifest["snapshot"],
+        watermark=manifest["watermark"],
+    )
+    return True
+
 
+def load_full_state():
+    """Carga completa de las tablas de features y abre sus streams para refrescarlas"""
+    global transaction_data, clients_df, counterparties_df, client_tx_state_df, client_recent_activity_df, feature_store, feature_refresher
+
+    # Los streams se posicionan antes del scan para no perder cambios intermedios
+    feature_refresher = FeatureRefresher()
     try:
-        print(f"Data loaded status: {data_loaded}")
-        print(f"Predictor status: {predictor}")
-        print(f"Init predictor status: {init_predictor}")
+        feature_refresher.start()
+    except Exception as e:
+        log_message(
+            f"No se pudieron abrir los streams, se recargará al vencer: {e}",
+            level="warning",
+        )
+
+    (
+        transaction_data,
+        clients_df,
+        counterparties_df,
+        client_tx_state_df,
+        client_recent_activity_df,
+    ) = load_all_tables()
+    feature_store = FeatureStore(
+        clients_df,
+        counterparties_df,
+        client_tx_state_df,
+        client_recent_activity_df,
+    )
+
 
+def refresh_state():
+    """Trae sólo los cambios recientes; recarga todo sólo si el stream perdió continuidad"""
+    global clients_df, counterparties_df, client_tx_state_df, client_recent_activity_df
+
+    try:
+        frames = feature_refresher.refresh(
+            {
+                "clients": clients_df,
+                "counterparties": counterparties_df,
+                "client_tx_state": client_tx_state_df,
+                "client_recent_activity": client_recent_activity_df,
+            },
+            feature_store,
+        )
+        clients_df = frames["clients"]
+        counterparties_df = frames["counterparties"]
+        client_tx_state_df = frames["client_tx_state"]
+        client_recent_activity_df = frames["client_recent_activity"]
+    except StreamRefreshError as e:
+        log_message(
+            f"Refresh incremental falló, recargando tablas completas: {e}",
+            level="warning",
+        )
+        load_state()
+    except Exception as e:
+        # Error transitorio: se sigue con los frames actuales y el refresher, aún
+        # vencido, lo reintenta en la siguiente invocación
+        log_message(
+            f"Refresh incremental falló, se reintentará: {e}",
+            level="error",
+            exc_info=True,
+        )
+
+
+def handler(event, context):
+    global data_loaded, predictor
+
+    records = event.get("Records", [])
+
+    begin_invocation(getattr(context, "aws_request_id", None))
+    log_message(
+        "Batch recibido",
+        batch_size=len(records),
+        data_loaded=data_loaded,
+        model_version=lambda: predictor.model_version if predictor else None,
+    )
+    log_message("Evento completo", level="debug", event=event)
+
+    try:
         if not data_loaded:
-            print("Cargando datos por primera vez...")
-            (
-                transaction_data,
-                clients_df,
-                counterparties_df,
-                client_tx_state_df,
-                client_recent_activity_df,
-            ) = load_all_tables()
-            predictor = init_predictor()
+            log_message("Cargando datos por primera vez...")
+            with metrics.span("load_state"):
+                load_state()
+                predictor = init_predictor()
             data_loaded = True
-            print("Datos cargados y almacenados en memoria global")
+            log_message("Datos cargados y almacenados en memoria global")
+        elif feature_refresher.is_stale():
+            log_message("Refrescando datos en memoria (container reuse)")
+            with metrics.span("refresh_state"):
+                refresh_state()
         else:
-            print("Usando datos previamente cargados (container reuse)")
+            log_message(
+                "Usando datos previamente cargados (container reuse)", level="debug"
+            )
+
+        with metrics.span("batch"):
+            batch_item_failures = process_records(records)
+        log_message(
+            "Batch procesado",
+            batch_size=len(records),
+            failures=[failure["itemIdentifier"] for failure in batch_item_failures],
+        )
+        metrics.count("records", len(records))
+        metrics.count("failed_records", len(batch_item_failures))
+
+        return {"statusCode": 200, "batchItemFailures": batch_item_failures}
+    except Exception as e:
+        log_message(
+            f"ERROR: {e}",
+            level="error",
+            exc_info=True,
+            message_ids=[record.get("messageId") for record in records],
+        )
+        # Con ReportBatchItemFailures una respuesta sin fallas se toma como éxito,
+        # así que se reporta todo el batch para que SQS lo reintente
+        return {
+            "statusCode": 500,
+            "batchItemFailures": [
+                {"itemIdentifier": record["messageId"]} for record in records
+            ],
+        }
+    finally:
+        metrics.flush()
+
+
+def process_records(records: list) -> list:
+    """Calcula features de todo el batch, predice una sola vez y publica cada resultado"""
+    batch_item_failures = []
+    parsed = []
+    pending = []
+    decided = []
+    model_version = predictor.model_version
+
+    for record in records:
+        try:
+            transaction = json.loads(record["body"])
+            transaction["transaction_id"] = transaction.get("transaction_id", "unknown")
+            parsed.append((record, transaction))
+        except Exception as e:
+            log_message(
+                f"Error preparando transacción: {e}",
+                level="error",
+                message_id=record.get("messageId"),
+            )
+            batch_item_failures.append({"itemIdentifier": record["messageId"]})
 
-        print(f"Transactions: {transaction_data}")
-        print(f"Clients DF: {clients_df}")
-        print(f"Counterparties DF: {counterparties_df}")
-        print(f"Client TX State DF: {client_tx_state_df}")
-        print(f"Client Recent Activity DF: {client_recent_activity_df}")
+    # La caché se consulta para todos los registros (SQS puede entregar un duplicado
+    # con ApproximateReceiveCount 1); sólo las redeliveries fuera de caché pagan
+    # una lectura de la tabla
+    decisions = {}
+    for record, transaction in parsed:
+        decision = decision_cache.get(transaction["transaction_id"], model_version)
+        if decision is not None:
+            decisions[transaction["transaction_id"]] = decision
+    decisions.update(
+        load_stored_decisions(
+            [
+                transaction["transaction_id"]
+                for record, transaction in parsed
+                if transaction["transaction_id"] not in decisions
+                and is_redelivery(record)
+            ],
+            model_version,
+        )
+    )
 
-        for record in event["Records"]:
-            print("Record: ", record)
-            transaction_data = json.loads(record["body"])
-            print("Predictor: ", predictor)
-            print("Data loaded: ", data_loaded)
+    for record, transaction in parsed:
+        decision = decisions.get(transaction["transaction_id"])
+        if decision is not None:
+            decided.append((record, decision))
+            continue
+        try:
+            if not transaction.get("timestamp"):
+                transaction["timestamp"] = transaction.get("created_at", "")
 
+            with metrics.span("feature_lookup"):
+                calculated_features = feature_store.get_dynamic_features(transaction)
+            log_message(
+                "Calculated features",
+                level="debug",
+                transaction_id=transaction["transaction_id"],
+                features=calculated_features,
+            )
+
+            transaction.update(calculated_features)
+            pending.append((record, transaction))
+        except Exception as e:
+            log_message(
+                f"Error preparando transacción: {e}",
+                level="error",
+                message_id=record.get("messageId"),
+            )
+            batch_item_failures.append({"itemIdentifier": record["messageId"]})
+
+    if decided:
+        log_message(f"Decisiones ya guardadas, sin re-scoring: {len(decided)}")
+        metrics.count("cached_decisions", len(decided))
+    # Ya están en la tabla: sólo falta que el resultado llegue a la cola de salida
+    for record, decision in decided:
+        try:
+            send_result(decision)
+        except Exception as e:
+            log_message(
+                f"Error publicando: {e}",
+                level="error",
+                transaction_id=decision["transaction_id"],
+            )
+            batch_item_failures.append({"itemIdentifier": record["messageId"]})
+
+    if not pending:
+        return batch_item_failures
+
+    try:
+        # Una sola llamada vectorizada: transform, predict_proba y SHAP para todo el batch
+        with metrics.span("predict_risk"):
+            results = predictor.predict_risk(
+                [transaction for _, transaction in pending]
+            )
+    except Exception as e:
+        # Un registro inválido (p.ej. una categoría desconocida) tumba el transform del
+        # batch completo; se predice uno por uno para aislar al culpable
+        log_message(
+            f"Error en predicción por batch, reintentando por registro: {e}",
+            level="warning",
+        )
+        results = [None] * len(pending)
+        for idx, (record, transaction) in enumerate(pending):
             try:
-                if not transaction_data.get("timestamp"):
-                    transaction_data["timestamp"] = transaction_data.get(
-                        "created_at", ""
-                    )
-
-                calculated_features = get_dynamic_features(
-                    transaction_data,
-                    client_tx_state_df,
-                    client_recent_activity_df,
-                    clients_df,
-                    counterparties_df,
+                results[idx] = predictor.predict_risk([transaction])[0]
+            except Exception as record_error:
+                log_message(
+                    f"Error en predicción: {record_error}",
+                    level="error",
+                    transaction_id=transaction["transaction_id"],
                 )
+    log_message("Prediction results", level="debug", results=results)
+    log_challenger_scores(results)
+
+    for (record, transaction), prediction in zip(pending, results):
+        if prediction is None:
+            batch_item_failures.append({"itemIdentifier": record["messageId"]})
+            continue
+        try:
+            # Datos que transaction_updater necesita para el broadcast, sin get_item
+            publish_result(
+                {
+                    **prediction,
+                    "client_account_id": transaction.get("client_account_id", ""),
+                    "amount": float(transaction.get("amount", 0)),
+                }
+            )
+            # created_at -> ANALYZED, lo que el dashboard percibe como latencia
+            metrics.record_lag("analyzed_lag", transaction.get("created_at", ""))
+        except Exception as e:
+            log_message(
+                f"Error publicando: {e}",
+                level="error",
+                transaction_id=transaction["transaction_id"],
+            )
+            batch_item_failures.append({"itemIdentifier": record["messageId"]})
+
+    return batch_item_failures
+
+
+def log_challenger_scores(results: list) -> None:
+    """Scores en sombra: un registro estructurado por batch, nunca en la tabla"""
+    scored = [
+        prediction
+        for prediction in results
+        if prediction and prediction.get("challenger_scores")
+    ]
+    if not scored:
+        return
+
+    models = sorted({version for p in scored for version in p["challenger_scores"]})
+    log_message(
+        "Scores de challengers",
+        level=CHALLENGER_LOG_LEVEL,
+        log_type="challenger_scores",
+        champion=scored[0]["model_version"],
+        models=models,
+        # [transaction_id, score del campeón, score de cada modelo en models]
+        rows=lambda: [
+            [
+                p["transaction_id"],
+                p["risk_probability"],
+                *[p["challenger_scores"].get(version) for version in models],
+            ]
+            for p in scored
+        ],
+    )
+
 
-                print("Calculated features: ", calculated_features)
+def is_redelivery(record: dict) -> bool:
+    return int(record.get("attributes", {}).get("ApproximateReceiveCount", "1")) > 1
 
-                transaction_data.update(calculated_features)
-                print("Transaction data with features: ", transaction_data)
 
-                transaction_data["transaction_id"] = transaction_data.get(
-                    "transaction_id", "unknown"
+def load_stored_decisions(transaction_ids: list, model_version: str) -> dict:
+    """Decisiones ya escritas por otro intento o contenedor, por transaction_id"""
+    transaction_ids = list(dict.fromkeys(transaction_ids))
+    decisions = {}
+    try:
+        for start in range(0, len(transaction_ids), 100):
+            with metrics.span("dynamodb_batch_get"):
+                response = dynamodb.batch_get_item(
+                    RequestItems={
+                        transactions_table.name: {
+                            "Keys": [
+                                {"transaction_id": transaction_id}
+                                for transaction_id in transaction_ids[
+                                    start : start + 100
+                                ]
+                            ],
+                            "ProjectionExpression": ", ".join(DECISION_ATTRIBUTES),
+                            "ExpressionAttributeNames": {"#st": "status"},
+                        }
+                    }
                 )
-                results = predictor.predict_risk([transaction_data])
-                print("Prediction results: ", results)
-
-                result = {
-                    "transaction_id": transaction_data["transaction_id"],
-                    "risk_score": Decimal(str(results[0]["risk_probability"])),
-                    "risk_prediction": results[0]["risk_prediction"],
-                    "explanation": json.dumps(results[0].get("shap_explanation", {})),
-                    "model_version": results[0].get("model_version", "unknown"),
-                    "status": "ANALYZED",
-                }
+            # Las llaves no procesadas se predicen; la escritura condicional las cubre
+            for item in response["Responses"].get(transactions_table.name, []):
+                decision = decision_from_item(item, model_version)
+                if decision is not None:
+                    decision_cache.put(item["transaction_id"], model_version, decision)
+                    decisions[item["transaction_id"]] = decision
+    except Exception as e:
+        log_message(
+            f"No se pudieron leer decisiones guardadas, se predice de nuevo: {e}",
+            level="warning",
+        )
+    return decisions
+
+
+def publish_result(prediction: dict) -> None:
+    """Guarda la decisión en DynamoDB y envía el resultado a la cola de salida"""
+    decision = commit_decision(prediction)
+    decision_cache.put(decision["transaction_id"], decision["model_version"], decision)
+    send_result(decision)
+
 
-                # Update DynamoDB transaction before sending to SQS
+def commit_decision(prediction: dict) -> dict:
+    """Única escritura del resultado: condicional, gana la primera decisión de la versión"""
+    now = datetime.now(mexico_tz).strftime("%Y-%m-%d %H:%M:%S")
+    result = {
+        "transaction_id": prediction["transaction_id"],
+        "risk_score": Decimal(str(prediction["risk_probability"])),
+        "risk_prediction": prediction["risk_prediction"],
+        "explanation": json.dumps(prediction.get("shap_explanation", {})),
+        "model_version": prediction.get("model_version", "unknown"),
+        "status": ANALYZED_STATUS,
+    }
+    # Features exactas con las que se predijo, para explicar bajo demanda
+    model_features = json.dumps(prediction.get("model_features", {}))
+
+    # Update DynamoDB transaction before sending to SQS. Nunca se publica una
+    # decisión que no quedó escrita: se reintenta una vez y si no, falla el registro
+    for attempt in range(COMMIT_DECISION_ATTEMPTS):
+        try:
+            with metrics.span("dynamodb_update"):
                 transactions_table.update_item(
                     Key={"transaction_id": result["transaction_id"]},
-                    UpdateExpression="SET risk_score = :rs, risk_prediction = :rp, explanation = :ex, #st = :status",
+                    UpdateExpression="SET risk_score = :rs, risk_prediction = :rp, explanation = :ex, model_features = :mf, model_version = :mv, #st = :status, updated_at = :now, last_status_at = :now",
+                    # attribute_exists: update_item no crea transacciones desconocidas
+                    ConditionExpression="attribute_exists(transaction_id) AND (attribute_not_exists(model_version) OR model_version <> :mv OR #st <> :status)",
                     ExpressionAttributeNames={"#st": "status"},
                     ExpressionAttributeValues={
                         ":rs": result["risk_score"],
                         ":rp": result["risk_prediction"],
                         ":ex": result["explanation"],
+                        ":mf": model_features,
+                        ":mv": result["model_version"],
                         ":status": result["status"],
+                        ":now": now,
                     },
+                    ReturnValuesOnConditionCheckFailure="ALL_OLD",
                 )
-
-                sqs.send_message(
-                    QueueUrl=output_queue_url,
-                    MessageBody=json.dumps(
-                        {
-                            **result,
-                            "risk_score": float(
-                                result["risk_score"]
-                            ),  # Convert Decimal back to float for JSON
-                        }
-                    ),
-                    MessageGroupId=result["transaction_id"],
-                    MessageDeduplicationId=f"{result['transaction_id']}-result",
+            return prediction
+        except (
+            transactions_table.meta.client.exceptions.ConditionalCheckFailedException
+        ) as e:
+            item = {
+                key: deserializer.deserialize(value)
+                for key, value in e.response.get("Item", {}).items()
+            }
+            if not item:
+                raise ValueError(
+                    f"Transacción desconocida: {result['transaction_id']}"
+                ) from e
+            stored = decision_from_item(item, result["model_version"])
+            if stored is not None:
+                log_message(
+                    "Ya tenía decisión, se publica la guardada",
+                    transaction_id=result["transaction_id"],
                 )
-            except Exception as e:
-                print(f"Error en predicción: {e}")
-        return {"statusCode": 200}
-    except Exception as e:
-        print(f"ERROR: {e}")
-        print(f"Event: {event}")
-        import traceback
+                return stored
+            log_message(
+                "Escritura condicional rechazada sin decisión guardada",
+                level="warning",
+                transaction_id=result["transaction_id"],
+                attempt=attempt + 1,
+            )
+
+    raise RuntimeError(
+        f"No se guardó la decisión de {result['transaction_id']} "
+        f"tras {COMMIT_DECISION_ATTEMPTS} intentos"
+    )
+
 
-        traceback.print_exc()
-        return {"statusCode": 500}
+def send_result(prediction: dict) -> None:
+    """Envía el resultado a la cola de salida; el dedup id absorbe reenvíos"""
+    result = {
+        "transaction_id": prediction["transaction_id"],
+        "risk_score": prediction["risk_probability"],
+        "risk_prediction": prediction["risk_prediction"],
+        "explanation": json.dumps(prediction.get("shap_explanation", {})),
+        "model_version": prediction.get("model_version", "unknown"),
+        "status": ANALYZED_STATUS,
+        "client_account_id": prediction.get("client_account_id", ""),
+        "amount": prediction.get("amount", 0.0),
+    }
+    with metrics.span("sqs_send"):
+        sqs.send_message(
+            QueueUrl=output_queue_url,
+            MessageBody=json.dumps(result),
+            MessageGroupId=result["transaction_id"],
+            MessageDeduplicationId=f"{result['transaction_id']}-result",
+        )
@@ -1,14 +1,34 @@
-from typing import Optional, Dict, Any
-from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
 from dotenv import load_dotenv
 import os
+import threading
 import polars as pl
 import boto3
+from boto3.dynamodb.types import TypeDeserializer
 import logging
-from inference import TransactionRiskPredictor
+from feature_snapshot import (
+    read_manifest,
+    read_snapshot,
+    snapshot_watermark,
+    write_snapshot,
+)
+from model_registry import MODEL_WARM_UP, get_registry
+from structured_logging import configure_logging, log_message
 
 load_dotenv()
 
+DYNAMODB_SCAN_SEGMENTS = int(os.environ.get("DYNAMODB_SCAN_SEGMENTS", "4"))
+
+# Carpeta o s3://bucket/prefijo del snapshot de features; vacío = carga completa
+FEATURE_SNAPSHOT_PATH = os.environ.get("FEATURE_SNAPSHOT_PATH", "")
+# Los streams retienen 24 h: un snapshot más viejo no se puede poner al día
+FEATURE_SNAPSHOT_MAX_AGE_SECONDS = float(
+    os.environ.get("FEATURE_SNAPSHOT_MAX_AGE_SECONDS", str(20 * 3600))
+)
+
 predictor = None
 transactions_df = None
 clients_df = None
@@ -38,33 +58,7 @@ def build_geo_risk_map():
     return geo_risk
 
 
-def configure_logging(level_name: str = None) -> logging.Logger:
-    if not level_name:
-        level_name = logging.INFO
-
-    logging.basicConfig(
-        level=level_name,
-    )
-
-    root = logging.getLogger()
-    root.setLevel(level_name)
-
-    return root
-
-
-root = configure_logging()
-
-logger = logging.getLogger(root.name)
-
-
-def log_message(
-    message: str, level: str = "info", logger: Optional[logging.Logger] = None
-) -> None:
-    if not logger:
-        print(message)
-    else:
-        log_func = getattr(logger, level.lower(), logger.info)
-        log_func(message)
+logger = configure_logging()
 
 
 def convert_risk_level_to_float(risk_int: int) -> float:
@@ -79,66 +73,161 @@ def convert_risk_level_to_float(risk_int: int) -> float:
         return 0.8  # VERY_HIGH: >0.7
 
 
-def init_predictor():
+def init_predictor(model_version: str = None):
     """Initialize predictor safely with error handling"""
     try:
-        if TransactionRiskPredictor is None:
-            print("TransactionRiskPredictor not available")
-            return None
-        predictor = TransactionRiskPredictor()
-        predictor.load_model()
-        print("Predictor initialized successfully")
+        # El registry conserva los modelos cargados por versión para todo el proceso
+        predictor = get_registry().get(model_version)
+        print(f"Predictor initialized successfully: {predictor.model_version}")
         return predictor
     except Exception as e:
         print(f"Error initializing predictor: {e}")
         return None
 
 
+def warm_up_predictor() -> None:
+    """Modelo activo, imports y TreeExplainer listos durante el init del contenedor"""
+    if not MODEL_WARM_UP:
+        return
+    try:
+        get_registry().initialize()
+    except Exception as e:
+        # El handler lo vuelve a intentar en la primera invocación
+        log_message(f"Warm-up del modelo falló: {e}", level="warning")
+
+
+_dynamodb_client = None
+_dynamodb_client_lock = threading.Lock()
+_deserializer = TypeDeserializer()
+
+
+def get_dynamodb_client():
+    """Cliente low-level compartido; boto3 no crea clientes de forma thread-safe"""
+    global _dynamodb_client
+    with _dynamodb_client_lock:
+        if _dynamodb_client is None:
+            _dynamodb_client = boto3.client("dynamodb")
+        return _dynamodb_client
+
+
+def convert_attribute_value(
+    name: str, value: Dict[str, Any], decimal_to_float: set, decimal_to_int: set
+) -> Any:
+    """Convierte un AttributeValue de DynamoDB directamente al tipo de la columna"""
+    if "S" in value:
+        return value["S"]
+    if "N" in value:
+        if name in decimal_to_float:
+            return float(value["N"])
+        if name in decimal_to_int:
+            return int(Decimal(value["N"]))
+        return Decimal(value["N"])
+    if "NULL" in value:
+        return None
+    if "SS" in value:
+        # Polars no tiene dtype para sets (p.ej. counterparty_set del agregador)
+        return sorted(value["SS"])
+    return _deserializer.deserialize(value)
+
+
+def _scan_segment(
+    table_name: str,
+    segment: int,
+    total_segments: int,
+    decimal_to_float: set,
+    decimal_to_int: set,
+    skip_columns: set,
+) -> Tuple[Dict[str, list], int]:
+    """Escanea un segmento llenando buffers columnares página por página"""
+    client = get_dynamodb_client()
+    columns = {}
+    row_count = 0
+    scan_kwargs = {
+        "TableName": table_name,
+        "Limit": 1000,
+        "Segment": segment,
+        "TotalSegments": total_segments,
+    }
+
+    while True:
+        response = client.scan(**scan_kwargs)
+        for item in response["Items"]:
+            for name, value in item.items():
+                if name in skip_columns:
+                    continue
+                column = columns.get(name)
+                if column is None:
+                    column = columns[name] = [None] * row_count
+                column.append(
+                    convert_attribute_value(
+                        name, value, decimal_to_float, decimal_to_int
+                    )
+                )
+            row_count += 1
+            for column in columns.values():
+                if len(column) < row_count:
+                    column.append(None)
+
+        if "LastEvaluatedKey" not in response:
+            break
+        scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    return columns, row_count
+
+
 def load_dynamodb_table(
-    table_name: str, decimal_to_float: list = None, decimal_to_int: list = None
-) -> list:
-    """Load DynamoDB table with pagination support for large datasets"""
-    dynamodb = boto3.resource("dynamodb")
-    table = dynamodb.Table(table_name)
-    items = []
-    count = 0
-
-    response = table.scan(Limit=1000)
-    items.extend(response["Items"])
-    count += len(response["Items"])
-    print(f"Cargados {count:,} items de {table_name}...")
-
-    while "LastEvaluatedKey" in response:
-        response = table.scan(
-            ExclusiveStartKey=response["LastEvaluatedKey"], Limit=1000
+    table_name: str,
+    decimal_to_float: list = None,
+    decimal_to_int: list = None,
+    total_segments: int = None,
+    skip_columns: list = None,
+) -> Dict[str, list]:
+    """Load DynamoDB table with a parallel segmented scan into columnar buffers"""
+    total_segments = total_segments or DYNAMODB_SCAN_SEGMENTS
+    decimal_to_float = set(decimal_to_float or [])
+    decimal_to_int = set(decimal_to_int or [])
+    skip_columns = set(skip_columns or [])
+
+    with ThreadPoolExecutor(max_workers=total_segments) as executor:
+        segments = list(
+            executor.map(
+                lambda segment: _scan_segment(
+                    table_name,
+                    segment,
+                    total_segments,
+                    decimal_to_float,
+                    decimal_to_int,
+                    skip_columns,
+                ),
+                range(total_segments),
+            )
         )
-        items.extend(response["Items"])
-        count += len(response["Items"])
-        if count % 10000 == 0:
-            print(f"Cargados {count:,} items de {table_name}...")
 
-    for item in items:
-        if decimal_to_float:
-            for field in decimal_to_float:
-                if field in item:
-                    item[field] = float(item[field])
-        if decimal_to_int:
-            for field in decimal_to_int:
-                if field in item:
-                    item[field] = int(item[field])
+    # Unir los buffers de cada segmento rellenando columnas ausentes con None
+    names = []
+    for segment_columns, _ in segments:
+        names.extend(name for name in segment_columns if name not in names)
 
-    print(f"Total cargado de {table_name}: {len(items):,} items")
-    return items
+    columns = {name: [] for name in names}
+    for segment_columns, row_count in segments:
+        for name in names:
+            columns[name].extend(segment_columns.get(name) or [None] * row_count)
+
+    total = sum(row_count for _, row_count in segments)
+    print(
+        f"Total cargado de {table_name}: {total:,} items ({total_segments} segmentos)"
+    )
+    return columns
 
 
 def load_transactions_data():
     """Load transactions from DynamoDB table"""
     try:
-        items = load_dynamodb_table(
+        columns = load_dynamodb_table(
             os.environ.get("TRANSACTIONS_TABLE_NAME"),
             decimal_to_float=["amount", "risk_score"],
         )
-        transactions_df = pl.DataFrame(items).with_columns(
+        transactions_df = pl.DataFrame(columns).with_columns(
             [
                 pl.col("created_at")
                 .str.strptime(pl.Datetime, "%Y-%m-%d %H:%M:%S")
@@ -151,16 +240,110 @@ def load_transactions_data():
         return None
 
 
+def build_clients_df(columns: Dict[str, list]) -> pl.DataFrame:
+    return pl.DataFrame(columns).with_columns(
+        [pl.col("created_at").str.strptime(pl.Datetime, "%Y-%m-%d %H:%M:%S")]
+    )
+
+
+def build_counterparties_df(columns: Dict[str, list]) -> pl.DataFrame:
+    return pl.DataFrame(columns)
+
+
+def build_client_tx_state_df(columns: Dict[str, list]) -> pl.DataFrame:
+    return pl.DataFrame(columns).with_columns(
+        [pl.col("last_tx_timestamp").str.strptime(pl.Datetime, "%Y-%m-%d %H:%M:%S")]
+    )
+
+
+def build_client_recent_activity_df(columns: Dict[str, list]) -> pl.DataFrame:
+    return pl.DataFrame(columns).with_columns(
+        [pl.col("bucket_timestamp").str.strptime(pl.Datetime, "%Y-%m-%dT%H:%M:%S.%f")]
+    )
+
+
+# Tablas usadas por get_dynamic_features: variable de entorno, llave primaria,
+# conversiones de Decimal, atributos que no se cargan y cómo construir su DataFrame
+FEATURE_TABLES = {
+    "clients": {
+        "env": "CLIENTS_TABLE_NAME",
+        "primary_key": "client_id",
+        "decimal_to_float": [],
+        "decimal_to_int": ["risk_level"],
+        "build": build_clients_df,
+        "snapshot_columns": {
+            "client_id": pl.Utf8,
+            "account_id": pl.Utf8,
+            "risk_level": pl.Int64,
+            "country": pl.Utf8,
+        },
+    },
+    "counterparties": {
+        "env": "COUNTERPARTIES_TABLE_NAME",
+        "primary_key": "counterparty_id",
+        "decimal_to_float": [],
+        "decimal_to_int": ["risk_level"],
+        "build": build_counterparties_df,
+        "snapshot_columns": {
+            "counterparty_id": pl.Utf8,
+            "account_id": pl.Utf8,
+            "country": pl.Utf8,
+        },
+    },
+    "client_tx_state": {
+        "env": "CLIENT_TX_STATE_TABLE_NAME",
+        "primary_key": "client_tx_state_id",
+        "decimal_to_float": [
+            "tx_sum",
+            "tx_square_sum",
+            "avg_tx_amount",
+            "std_tx_amount",
+        ],
+        "decimal_to_int": ["tx_count"],
+        # Ids ya aplicados por el agregador: un map con una llave por transacción
+        "skip_columns": ["applied_tx_ids"],
+        "build": build_client_tx_state_df,
+        "snapshot_columns": {
+            "client_tx_state_id": pl.Utf8,
+            "client_account_id": pl.Utf8,
+            "avg_tx_amount": pl.Float64,
+            "std_tx_amount": pl.Float64,
+        },
+    },
+    "client_recent_activity": {
+        "env": "CLIENT_RECENT_ACTIVITY_TABLE_NAME",
+        "primary_key": "client_recent_activity_id",
+        "decimal_to_float": [],
+        "decimal_to_int": ["tx_count", "unique_counterparties_count"],
+        "skip_columns": ["applied_tx_ids"],
+        "build": build_client_recent_activity_df,
+        "snapshot_columns": {
+            "client_recent_activity_id": pl.Utf8,
+            "client_account_id": pl.Utf8,
+            "bucket_timestamp": pl.Datetime("us"),
+            "tx_count": pl.Int64,
+            "unique_counterparties": pl.Utf8,
+        },
+    },
+}
+
+
+def load_feature_table(name: str) -> pl.DataFrame:
+    """Load one of FEATURE_TABLES from DynamoDB"""
+    spec = FEATURE_TABLES[name]
+    columns = load_dynamodb_table(
+        os.environ.get(spec["env"]),
+        decimal_to_float=spec["decimal_to_float"],
+        decimal_to_int=spec["decimal_to_int"],
+        skip_columns=spec.get("skip_columns"),
+    )
+    return spec["build"](columns)
+
+
 def load_clients_data():
     """Load clients from DynamoDB table"""
     try:
-        items = load_dynamodb_table(
-            os.environ.get("CLIENTS_TABLE_NAME"), decimal_to_int=["risk_level"]
-        )
-        clients_df = pl.DataFrame(items).with_columns(
-            [pl.col("created_at").str.strptime(pl.Datetime, "%Y-%m-%d %H:%M:%S")]
-        )
-        return clients_df
+        return load_feature_table("clients")
     except Exception as e:
         print(f"Error cargando clientes: {e}")
         return None
@@ -169,11 +352,7 @@ def load_clients_data():
 def load_counterparties_data():
     """Load counterparties from DynamoDB table"""
     try:
-        items = load_dynamodb_table(
-            os.environ.get("COUNTERPARTIES_TABLE_NAME"), decimal_to_int=["risk_level"]
-        )
-        counterparties_df = pl.DataFrame(items)
-        return counterparties_df
+        return load_feature_table("counterparties")
     except Exception as e:
         print(f"Error cargando contrapartes: {e}")
         return None
@@ -182,20 +361,7 @@ def load_counterparties_data():
 def load_client_tx_state_data():
     """Load client transaction state from DynamoDB table"""
     try:
-        items = load_dynamodb_table(
-            os.environ.get("CLIENT_TX_STATE_TABLE_NAME"),
-            decimal_to_float=[
-                "tx_sum",
-                "tx_square_sum",
-                "avg_tx_amount",
-                "std_tx_amount",
-            ],
-            decimal_to_int=["tx_count"],
-        )
-        client_tx_state_df = pl.DataFrame(items).with_columns(
-            [pl.col("last_tx_timestamp").str.strptime(pl.Datetime, "%Y-%m-%d %H:%M:%S")]
-        )
-        return client_tx_state_df
+        return load_feature_table("client_tx_state")
     except Exception as e:
         print(f"Error cargando client_tx_state: {e}")
         return None
@@ -204,18 +370,7 @@ def load_client_tx_state_data():
 def load_client_recent_activity_data():
     """Load client recent activity from DynamoDB table"""
     try:
-        items = load_dynamodb_table(
-            os.environ.get("CLIENT_RECENT_ACTIVITY_TABLE_NAME"),
-            decimal_to_int=["tx_count", "unique_counterparties_count"],
-        )
-        client_recent_activity_df = pl.DataFrame(items).with_columns(
-            [
-                pl.col("bucket_timestamp").str.strptime(
-                    pl.Datetime, "%Y-%m-%dT%H:%M:%S.%f"
-                )
-            ]
-        )
-        return client_recent_activity_df
+        return load_feature_table("client_recent_activity")
     except Exception as e:
         print(f"Error cargando client_recent_activity: {e}")
         return None
@@ -224,11 +379,22 @@ def load_client_recent_activity_data():
 def load_all_tables():
     """Load all DynamoDB tables"""
     print("Cargando todas las tablas...")
-    transactions_df = load_transactions_data()
-    clients_df = load_clients_data()
-    counterparties_df = load_counterparties_data()
-    client_tx_state_df = load_client_tx_state_data()
-    client_recent_activity_df = load_client_recent_activity_data()
+    loaders = [
+        load_transactions_data,
+        load_clients_data,
+        load_counterparties_data,
+        load_client_tx_state_data,
+        load_client_recent_activity_data,
+    ]
+    with ThreadPoolExecutor(max_workers=len(loaders)) as executor:
+        futures = [executor.submit(loader) for loader in loaders]
+        (
+            transactions_df,
+            clients_df,
+            counterparties_df,
+            client_tx_state_df,
+            client_recent_activity_df,
+        ) = [future.result() for future in futures]
     print("Todas las tablas cargadas exitosamente")
     return (
         transactions_df,
@@ -239,18 +405,82 @@ def load_all_tables():
     )
 
 
-def get_dynamic_features(
-    transaction: Dict[str, Any],
-    client_tx_state_df: pl.DataFrame,
-    client_recent_activity_df: pl.DataFrame,
-    clients_df: pl.DataFrame,
-    counterparties_df: pl.DataFrame,
-    calculate_mean_std: bool = True,
-    logger: Optional[logging.Logger] = None,
+def select_snapshot_columns(name: str, df: pl.DataFrame) -> pl.DataFrame:
+    """Sólo las columnas que usan las features, con su dtype final"""
+    return df.select(
+        pl.col(column).cast(dtype)
+        for column, dtype in FEATURE_TABLES[name]["snapshot_columns"].items()
+    )
+
+
+def build_feature_snapshot(
+    root: str, columns: Optional[Dict[str, Dict[str, list]]] = None
 ) -> Dict[str, Any]:
-    """Prepare Client and Transactions Info for a Inference Job over a transaction record."""
+    """Escribe el snapshot de FEATURE_TABLES; sin columns, escanea DynamoDB"""
+    watermark = datetime.now(timezone.utc)
+    streams = None
+    if columns is None:
+        # Import diferido: stream_refresher importa este módulo
+        from stream_refresher import TableStreamReader
+
+        # Las posiciones se toman antes del scan: el bootstrap reproduce desde ahí
+        # lo escrito durante el scan y después, nunca el stream completo
+        streams = {}
+        for name, spec in FEATURE_TABLES.items():
+            reader = TableStreamReader(os.environ.get(spec["env"]))
+            reader.start_at_tip()
+            streams[name] = reader.positions()
+
+        with ThreadPoolExecutor(max_workers=len(FEATURE_TABLES)) as executor:
+            frames = dict(
+                zip(FEATURE_TABLES, executor.map(load_feature_table, FEATURE_TABLES))
+            )
+    else:
+        frames = {
+            name: spec["build"](columns[name]) for name, spec in FEATURE_TABLES.items()
+        }
+
+    return write_snapshot(
+        root,
+        {name: select_snapshot_columns(name, df) for name, df in frames.items()},
+        watermark,
+        streams,
+    )
+
+
+def load_feature_snapshot(
+    root: str = None,
+) -> Optional[Tuple[Dict[str, pl.DataFrame], Dict[str, Any]]]:
+    """Tablas de features mapeadas desde el snapshot y su manifest, si sirve"""
+    root = root or FEATURE_SNAPSHOT_PATH
+    manifest = read_manifest(root)
+    if manifest is None:
+        print(f"No hay snapshot de features en {root}")
+        return None
+
+    watermark = snapshot_watermark(manifest)
+    age = (datetime.now(timezone.utc) - watermark).total_seconds()
+    if age > FEATURE_SNAPSHOT_MAX_AGE_SECONDS:
+        print(f"Snapshot {manifest['snapshot']} demasiado viejo ({age:,.0f} s)")
+        return None
 
-    DEFAULT_FEATURES = {
+    frames, _ = read_snapshot(root, manifest)
+    for name, spec in FEATURE_TABLES.items():
+        schema = frames.get(name, pl.DataFrame()).schema
+        if dict(schema) != spec["snapshot_columns"]:
+            print(f"Snapshot {manifest['snapshot']}: esquema distinto en {name}")
+            return None
+
+    print(
+        f"Snapshot {manifest['snapshot']} mapeado: "
+        + ", ".join(f"{name} {df.height:,}" for name, df in frames.items())
+    )
+    return frames, manifest
+
+
+def build_default_features(transaction: Dict[str, Any]) -> Dict[str, Any]:
+    """Features por defecto cuando no hay historia disponible para el cliente"""
+    return {
         "client_risk_level": 0.1,
         "client_geo_risk": 0.4,
         "counterparty_geo_risk": 0.4,
@@ -261,12 +491,36 @@ def get_dynamic_features(
         "day_part": "morning",
     }
 
-    print(f"Calculando features dinámicas para la transacción: {transaction}")
-    print("DataFrames recibidos:")
-    print(f"client_tx_state_df: {client_tx_state_df}")
-    print(f"client_recent_activity_df: {client_recent_activity_df}")
-    print(f"clients_df: {clients_df}")
-    print(f"counterparties_df: {counterparties_df}")
+
+def get_dynamic_features(
+    transaction: Dict[str, Any],
+    client_tx_state_df: pl.DataFrame,
+    client_recent_activity_df: pl.DataFrame,
+    clients_df: pl.DataFrame,
+    counterparties_df: pl.DataFrame,
+    calculate_mean_std: bool = True,
+    logger: Optional[logging.Logger] = None,
+) -> Dict[str, Any]:
+    """Prepare Client and Transactions Info for a Inference Job over a transaction record."""
+
+    DEFAULT_FEATURES = build_default_features(transaction)
+
+    # Sólo dimensiones: renderizar los DataFrames completos cuesta CPU y CloudWatch
+    log_message(
+        "Calculando features dinámicas",
+        level="debug",
+        logger=logger,
+        transaction=transaction,
+        frame_rows=lambda: {
+            name: None if df is None else df.height
+            for name, df in [
+                ("client_tx_state", client_tx_state_df),
+                ("client_recent_activity", client_recent_activity_df),
+                ("clients", clients_df),
+                ("counterparties", counterparties_df),
+            ]
+        },
+    )
 
     if (
         client_tx_state_df is None
@@ -311,7 +565,9 @@ def get_dynamic_features(
             if client_info is not None and client_info.shape[0] > 0
             else None
         )
-        print("Client risk level: ", client_risk)
+        log_message(
+            "Client risk level", level="debug", logger=logger, client_risk=client_risk
+        )
         client_country = (
             client_info.select(pl.col("country")).item()
             if client_info is not None and client_info.shape[0] > 0
@@ -391,15 +647,16 @@ def get_dynamic_features(
 
         if client_activity_24h is not None and client_activity_24h.shape[0] > 0:
             # Usar Polars para procesar strings y obtener únicos
-            unique_cp_1d = client_activity_24h.select(
-                pl.col("unique_counterparties")
-                .str.split(",")  # Dividir strings por coma
-                .list.explode()  # Explotar listas a filas individuales
-                .str.strip_chars()  # Limpiar espacios
+            unique_cp_1d = (
+                client_activity_24h.select(
+                    pl.col("unique_counterparties")
+                    .str.split(",")  # Dividir strings por coma
+                    .list.explode()  # Explotar listas a filas individuales
+                    .str.strip_chars()  # Limpiar espacios
+                )
                 .filter(pl.col("unique_counterparties") != "")  # Filtrar vacíos
-            ).n_unique(
-                "unique_counterparties"
-            )  # Contar únicos
+                .n_unique("unique_counterparties")  # Contar únicos
+            )
         else:
             unique_cp_1d = 0
 
@@ -417,8 +674,11 @@ def get_dynamic_features(
         }
 
         log_message(
-            f"Features calculadas para cliente {client_account_id}: {calculated_features}",
+            "Features calculadas",
+            level="debug",
             logger=logger,
+            client_account_id=client_account_id,
+            features=calculated_features,
         )
         return calculated_features
 
@@ -0,0 +1,100 @@
+import json
+import os
+from typing import Any, Dict, List
+import numpy as np
+from feature_encoder import CompiledFeatureEncoder
+from tree_engine import FlatTreeEnsemble
+
+# Artefactos nativos generados por build_artifacts.py, uno por versión de modelo
+MODEL_ARTIFACTS_DIR = os.environ.get(
+    "MODEL_ARTIFACTS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_artifacts"),
+)
+
+MODEL_PREFIX = "xgboost_model_balanced_"
+ARTIFACT_FORMAT_VERSION = 1
+MODEL_FILE = "model.ubj"
+TREES_FILE = "trees.npz"
+SPEC_FILE = "spec.json"
+
+
+class NativeBoosterModel:
+    """Booster guardado con save_model, con la interfaz de XGBClassifier que usa el predictor"""
+
+    def __init__(self, model_path: str, classes: List[int]):
+        self.model_path = model_path
+        self.classes_ = np.asarray(classes)
+        self._booster = None
+
+    def get_booster(self):
+        """Importa XGBoost y carga el booster sólo la primera vez que se necesita"""
+        if self._booster is None:
+            import xgboost
+
+            self._booster = xgboost.Booster(model_file=self.model_path)
+        return self._booster
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        """Mismo formato que XGBClassifier.predict_proba: columnas [clase 0, clase 1]"""
+        if hasattr(X, "to_numpy"):
+            X = X.to_numpy(dtype=np.float32)
+        positive = self.get_booster().inplace_predict(
+            np.ascontiguousarray(X, dtype=np.float32)
+        )
+        return np.column_stack([1.0 - positive, positive])
+
+
+def model_timestamp(model_file: str) -> str:
+    """Timestamp del entrenamiento a partir del nombre del pickle"""
+    return model_file.split(MODEL_PREFIX)[-1].replace(".pkl", "")
+
+
+def artifact_dir_for(model_version: str, root: str = MODEL_ARTIFACTS_DIR) -> str:
+    return os.path.join(root, model_version)
+
+
+def export_artifacts(
+    model, feature_transformer, model_version: str, output_dir: str
+) -> Dict[str, Any]:
+    """Convierte el XGBClassifier y el ColumnTransformer ajustados a artefactos nativos"""
+    os.makedirs(output_dir, exist_ok=True)
+    booster = model.get_booster()
+
+    booster.save_model(os.path.join(output_dir, MODEL_FILE))
+    FlatTreeEnsemble.from_booster(booster).save(os.path.join(output_dir, TREES_FILE))
+    encoder = CompiledFeatureEncoder.from_transformer(feature_transformer)
+
+    spec = {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "model_version": model_version,
+        "classes": [int(value) for value in model.classes_],
+        "booster_feature_names": booster.feature_names,
+        "encoder": encoder.to_spec(),
+    }
+    with open(os.path.join(output_dir, SPEC_FILE), "w") as f:
+        json.dump(spec, f, indent=2)
+
+    return spec
+
+
+def load_artifacts(artifact_dir: str) -> Dict[str, Any]:
+    """Carga spec, encoder y árboles aplanados; el booster queda diferido"""
+    with open(os.path.join(artifact_dir, SPEC_FILE)) as f:
+        spec = json.load(f)
+
+    if spec.get("format_version") != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(
+            f"Formato de artefactos no soportado: {spec.get('format_version')}"
+        )
+
+    return {
+        "spec": spec,
+        "model": NativeBoosterModel(
+            os.path.join(artifact_dir, MODEL_FILE), spec["classes"]
+        ),
+        "feature_encoder": CompiledFeatureEncoder.from_spec(spec["encoder"]),
+        "tree_engine": FlatTreeEnsemble.load(
+            os.path.join(artifact_dir, TREES_FILE),
+            feature_names=spec["booster_feature_names"],
+        ),
+    }
@@ -0,0 +1,203 @@
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+from inference import TransactionRiskPredictor
+from model_artifacts import MODEL_ARTIFACTS_DIR, MODEL_PREFIX
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Versiones disponibles, la activa y los challengers; lo escribe build_artifacts.py
+# durante el build de la imagen y se lee una vez por contenedor. Un modelo nuevo o
+# un cambio de activo/challengers es una imagen nueva
+MODEL_MANIFEST_PATH = os.environ.get(
+    "MODEL_MANIFEST_PATH", os.path.join(MODEL_ARTIFACTS_DIR, "manifest.json")
+)
+# Fuerza la versión activa sin reconstruir la imagen (p. ej. rollback por env; al
+# cambiarla Lambda recicla los contenedores)
+MODEL_VERSION = os.environ.get("MODEL_VERSION")
+# Precalentar el modelo inicial (TreeExplainer e imports) en el init del contenedor
+MODEL_WARM_UP = os.environ.get("MODEL_WARM_UP", "true").lower() == "true"
+
+
+def build_manifest(model_dir: str = SCRIPT_DIR, active: str = None) -> Dict[str, Any]:
+    """Manifest con todos los pickles de model_dir; activo el más reciente"""
+    model_files = sorted(
+        f
+        for f in os.listdir(model_dir)
+        if f.startswith(MODEL_PREFIX) and f.endswith(".pkl")
+    )
+    if not model_files:
+        raise FileNotFoundError(f"No se encontraron modelos en: {model_dir}")
+
+    return {
+        "active": active or model_files[-1],
+        "versions": {
+            model_file: {"model_file": os.path.join(model_dir, model_file)}
+            for model_file in model_files
+        },
+    }
+
+
+class ModelRegistry:
+    """Modelos cargados por versión para todo el proceso; el activo sale del manifest"""
+
+    def __init__(
+        self,
+        manifest_path: str = MODEL_MANIFEST_PATH,
+        warm_up: bool = MODEL_WARM_UP,
+    ):
+        self.manifest_path = manifest_path
+        self.warm_up = warm_up
+        self.manifest = None
+        self._models = {}
+        self._lock = threading.Lock()
+        # (versión, predictor) en una sola referencia
+        self._active = None
+
+    def read_manifest(self) -> Dict[str, Any]:
+        """Lee el manifest; sin archivo, lo arma con los pickles del lambda"""
+        if os.path.isfile(self.manifest_path):
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            base_dir = os.path.dirname(os.path.abspath(self.manifest_path))
+            for entry in manifest["versions"].values():
+                for key in ("model_file", "artifact_dir"):
+                    if key in entry and not os.path.isabs(entry[key]):
+                        entry[key] = os.path.normpath(
+                            os.path.join(base_dir, entry[key])
+                        )
+        else:
+            manifest = build_manifest()
+
+        if MODEL_VERSION:
+            manifest["active"] = MODEL_VERSION
+        if manifest["active"] not in manifest["versions"]:
+            raise KeyError(f"Versión activa desconocida: {manifest['active']}")
+        # Challengers: se puntúan en sombra junto al activo, nunca se publican
+        manifest["challengers"] = [
+            version
+            for version in manifest.get("challengers", [])
+            if version in manifest["versions"] and version != manifest["active"]
+        ]
+        return manifest
+
+    def initialize(self) -> TransactionRiskPredictor:
+        """Carga y calienta el activo, con TreeExplainer, antes de la primera invocación"""
+        loaded = self._load_active()
+        predictor = self._active[1]
+        if loaded:
+            self._prepare(predictor, self.manifest)
+        return predictor
+
+    def current(self) -> TransactionRiskPredictor:
+        """Predictor activo; lo carga en la primera llamada si initialize() no corrió"""
+        if self._active is None:
+            loaded = self._load_active()
+            version, predictor = self._active
+            if loaded:
+                # Sin initialize() el primer request no espera a los challengers ni
+                # importa shap: el TreeExplainer se arma cuando una explicación lo pide
+                if self.warm_up:
+                    self._start(
+                        lambda: self._prepare(predictor, self.manifest, explain=False),
+                        f"warm-{version}",
+                    )
+                else:
+                    self._prepare(predictor, self.manifest)
+            return predictor
+
+        return self._active[1]
+
+    def _load_active(self) -> bool:
+        """Carga la versión activa del manifest; True si esta llamada la cargó"""
+        with self._lock:
+            if self._active is not None:
+                return False
+            self.manifest = self.read_manifest()
+            version = self.manifest["active"]
+            self._active = (version, self._load(version))
+            return True
+
+    @property
+    def active_version(self) -> Optional[str]:
+        return self._active[0] if self._active else None
+
+    def get(self, version: str = None) -> TransactionRiskPredictor:
+        """Predictor de una versión concreta; lo carga si aún no está en el proceso"""
+        if version is None or version == self.active_version:
+            return self.current()
+        if version in self._models:
+            return self._models[version]
+
+        if self.manifest is None:
+            self.manifest = self.read_manifest()
+        if version not in self.manifest["versions"]:
+            raise KeyError(f"Versión desconocida: {version}")
+        with self._lock:
+            if version not in self._models:
+                self._models[version] = self._load(version)
+        return self._models[version]
+
+    def _prepare(
+        self,
+        predictor: TransactionRiskPredictor,
+        manifest: Optional[Dict[str, Any]],
+        explain: bool = True,
+    ) -> None:
+        try:
+            if self.warm_up:
+                predictor.warm_up(explain=explain)
+            if manifest is not None:
+                self._attach_challengers(predictor, manifest)
+        except Exception as e:
+            print(f"[WARNING] Preparación de {predictor.model_version} incompleta: {e}")
+
+    def _attach_challengers(
+        self, predictor: TransactionRiskPredictor, manifest: Dict[str, Any]
+    ) -> None:
+        """Carga y calienta los challengers del manifest y los asigna al campeón"""
+        challengers = []
+        for version in manifest["challengers"]:
+            try:
+                challenger = self._models.get(version) or self._load(version)
+                # Sólo se evalúan sus árboles: no hace falta el TreeExplainer
+                challenger.warm_up(explain=False)
+                challengers.append(challenger)
+            except Exception as e:
+                print(f"[WARNING] Challenger {version} no disponible: {e}")
+        predictor.set_challengers(challengers)
+        if challengers:
+            print(
+                f"[INFO] Challengers de {predictor.model_version}: "
+                f"{[challenger.model_version for challenger in challengers]}"
+            )
+
+    def _load(self, version: str) -> TransactionRiskPredictor:
+        entry = self.manifest["versions"][version]
+        predictor = TransactionRiskPredictor(
+            model_dir=entry["model_file"], artifact_dir=entry.get("artifact_dir")
+        )
+        predictor.load_model()
+        self._models[version] = predictor
+        return predictor
+
+    @staticmethod
+    def _start(target, name: str) -> threading.Thread:
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        return thread
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    """Registry compartido por el proceso"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
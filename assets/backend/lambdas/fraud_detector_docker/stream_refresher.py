@@ -0,0 +1,421 @@
+from typing import Optional, Dict, Any, List, Tuple
+import os
+import time
+import boto3
+import polars as pl
+from botocore.exceptions import BotoCoreError, ClientError
+from feature_store import FeatureStore
+from main import FEATURE_TABLES, convert_attribute_value, get_dynamodb_client
+from structured_logging import log_message
+
+FEATURE_MAX_STALENESS_SECONDS = float(
+    os.environ.get("FEATURE_MAX_STALENESS_SECONDS", "60")
+)
+# Un shard abierto puede devolver páginas vacías antes de su final: sólo se da por
+# alcanzado el final tras varias seguidas (DynamoDB Streams no trae MillisBehindLatest)
+STREAM_EMPTY_PAGES_AT_TIP = int(os.environ.get("STREAM_EMPTY_PAGES_AT_TIP", "3"))
+# Tope de páginas por shard y lectura; lo pendiente se lee en la siguiente
+STREAM_MAX_PAGES_PER_SHARD = int(os.environ.get("STREAM_MAX_PAGES_PER_SHARD", "100"))
+# Tiempo máximo que una invocación dedica a leer los streams antes de predecir
+STREAM_REFRESH_BUDGET_SECONDS = float(
+    os.environ.get("STREAM_REFRESH_BUDGET_SECONDS", "2")
+)
+
+
+def is_at_tip(response: Dict[str, Any]) -> bool:
+    """MillisBehindLatest cuando la API lo trae (Kinesis); DynamoDB Streams no"""
+    return response.get("MillisBehindLatest") == 0
+
+
+class StreamRefreshError(Exception):
+    """El stream ya no garantiza continuidad; hay que recargar las tablas completas"""
+
+
+class TableStreamReader:
+    """Lee los cambios del DynamoDB stream de una tabla desde un punto conocido"""
+
+    def __init__(self, table_name: str, streams_client=None):
+        self.table_name = table_name
+        self.streams = streams_client or boto3.client("dynamodbstreams")
+        self.stream_arn = None
+        # shard_id -> (iterator, último sequence number leído)
+        self.shards = {}
+        self.finished_shards = set()
+        # Resultado de la última lectura: registros leídos, si llegó al final y el
+        # error transitorio que la cortó
+        self.records_read = 0
+        self.caught_up = False
+        self.error = None
+
+    def start(self, positions: Optional[Dict[str, Any]] = None) -> None:
+        """Posiciona la lectura en LATEST; llamar antes del scan completo. Con
+        positions (ver positions()) continúa justo después de lo ya leído; un
+        dict vacío lee todo lo retenido desde TRIM_HORIZON"""
+        table = get_dynamodb_client().describe_table(TableName=self.table_name)
+        self.stream_arn = table["Table"].get("LatestStreamArn")
+        if not self.stream_arn:
+            raise StreamRefreshError(f"{self.table_name} no tiene stream habilitado")
+
+        if (
+            positions
+            and positions.get("stream_arn", self.stream_arn) != self.stream_arn
+        ):
+            raise StreamRefreshError(f"El stream de {self.table_name} cambió")
+
+        self.shards = {}
+        self.finished_shards = set()
+        shards = self._describe_shards()
+        if positions is None:
+            for shard in shards:
+                if "EndingSequenceNumber" in shard["SequenceNumberRange"]:
+                    self.finished_shards.add(shard["ShardId"])
+                else:
+                    self.shards[shard["ShardId"]] = (
+                        self._iterator(shard["ShardId"], "LATEST"),
+                        None,
+                    )
+            return
+
+        read = positions.get("shards", {})
+        self.finished_shards = set(positions.get("finished", []))
+        shard_ids = {shard["ShardId"] for shard in shards}
+        for shard in shards:
+            shard_id = shard["ShardId"]
+            if shard_id in self.finished_shards:
+                continue
+            if read.get(shard_id):
+                self.shards[shard_id] = (
+                    self._iterator(shard_id, "AFTER_SEQUENCE_NUMBER", read[shard_id]),
+                    read[shard_id],
+                )
+            # Shards sin leer: las raíces desde el inicio, los hijos al terminar su padre
+            elif (
+                shard_id in read
+                or shard.get("ParentShardId") not in shard_ids
+                or shard.get("ParentShardId") in self.finished_shards
+            ):
+                self.shards[shard_id] = (self._iterator(shard_id, "TRIM_HORIZON"), None)
+
+    def start_at_tip(self) -> None:
+        """Posiciona cada shard tras su último registro con sequence number, para que
+        positions() sirva en otro proceso. Los shards cerrados se dan por terminados
+        sin leerlos y los abiertos se recorren sin guardar sus registros"""
+        self.start(None)
+        for shard_id in self.shards:
+            self.shards[shard_id] = (self._iterator(shard_id, "TRIM_HORIZON"), None)
+        self.catch_up(keep_records=False)
+
+    def positions(self) -> Dict[str, Any]:
+        """Último sequence number leído por shard, para continuar con start(positions)"""
+        return {
+            "stream_arn": self.stream_arn,
+            "shards": {
+                shard_id: sequence_number
+                for shard_id, (_, sequence_number) in self.shards.items()
+            },
+            "finished": sorted(self.finished_shards),
+        }
+
+    def read_changes(
+        self, deadline: Optional[float] = None, keep_records: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Devuelve los registros del stream publicados desde la lectura anterior; con
+        deadline (time.monotonic()) lo pendiente queda para la siguiente lectura.
+        keep_records=False sólo avanza las posiciones"""
+        records = []
+        self.records_read = 0
+        self.caught_up = False
+        self.error = None
+        try:
+            complete = True
+            for shard_id in list(self.shards):
+                complete = (
+                    self._read_shard(
+                        shard_id, records if keep_records else None, deadline
+                    )
+                    and complete
+                )
+            self._track_child_shards()
+            self.caught_up = complete
+        except (ClientError, BotoCoreError) as e:
+            # Throttling o red: las posiciones sólo avanzan tras cada página leída,
+            # así que lo ya devuelto se aplica y el resto se lee la próxima vez
+            self.error = e
+            log_message(
+                f"Lectura del stream de {self.table_name} interrumpida: {e}",
+                level="warning",
+            )
+        return records
+
+    def catch_up(self, keep_records: bool = True) -> List[Dict[str, Any]]:
+        """Lee hasta el final del stream, incluyendo los shards hijos que aparezcan"""
+        records = []
+        while True:
+            shards = set(self.shards)
+            records.extend(self.read_changes(keep_records=keep_records))
+            if self.error is not None:
+                raise StreamRefreshError(
+                    f"No se pudo leer el stream de {self.table_name}: {self.error}"
+                )
+            if self.caught_up and not self.records_read and set(self.shards) <= shards:
+                return records
+
+    def _read_shard(
+        self,
+        shard_id: str,
+        records: Optional[List[Dict[str, Any]]],
+        deadline: Optional[float],
+    ) -> bool:
+        """Lee un shard hasta su final; False si el tope de páginas o el deadline lo cortan"""
+        iterator, sequence_number = self.shards[shard_id]
+        at_tip = False
+        empty_pages = 0
+        for _ in range(STREAM_MAX_PAGES_PER_SHARD):
+            if not iterator:
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            try:
+                response = self.streams.get_records(ShardIterator=iterator, Limit=1000)
+            except self.streams.exceptions.ExpiredIteratorException:
+                if sequence_number is None:
+                    raise StreamRefreshError(
+                        f"Iterador expirado sin posición conocida en {shard_id}"
+                    )
+                iterator = self._iterator(
+                    shard_id, "AFTER_SEQUENCE_NUMBER", sequence_number
+                )
+                self.shards[shard_id] = (iterator, sequence_number)
+                continue
+            except self.streams.exceptions.TrimmedDataAccessException:
+                raise StreamRefreshError(f"Datos recortados del stream en {shard_id}")
+
+            self.records_read += len(response["Records"])
+            if records is not None:
+                records.extend(response["Records"])
+            if response["Records"]:
+                sequence_number = response["Records"][-1]["dynamodb"]["SequenceNumber"]
+            iterator = response.get("NextShardIterator")
+            self.shards[shard_id] = (iterator, sequence_number)
+            empty_pages = 0 if response["Records"] else empty_pages + 1
+            if is_at_tip(response) or empty_pages >= STREAM_EMPTY_PAGES_AT_TIP:
+                at_tip = True
+                break
+
+        if iterator is None:
+            del self.shards[shard_id]
+            self.finished_shards.add(shard_id)
+            return True
+        return at_tip
+
+    def _track_child_shards(self) -> None:
+        """Empieza a leer desde TRIM_HORIZON los shards hijos de shards terminados"""
+        for shard in self._describe_shards():
+            shard_id = shard["ShardId"]
+            if shard_id in self.shards or shard_id in self.finished_shards:
+                continue
+            parent = shard.get("ParentShardId")
+            if parent is None or parent in self.finished_shards:
+                self.shards[shard_id] = (self._iterator(shard_id, "TRIM_HORIZON"), None)
+
+    def _describe_shards(self) -> List[Dict[str, Any]]:
+        shards = []
+        kwargs = {"StreamArn": self.stream_arn}
+        while True:
+            description = self.streams.describe_stream(**kwargs)["StreamDescription"]
+            shards.extend(description["Shards"])
+            if "LastEvaluatedShardId" not in description:
+                return shards
+            kwargs["ExclusiveStartShardId"] = description["LastEvaluatedShardId"]
+
+    def _iterator(
+        self, shard_id: str, iterator_type: str, sequence_number: str = None
+    ) -> str:
+        kwargs = {
+            "StreamArn": self.stream_arn,
+            "ShardId": shard_id,
+            "ShardIteratorType": iterator_type,
+        }
+        if sequence_number:
+            kwargs["SequenceNumber"] = sequence_number
+        return self.streams.get_shard_iterator(**kwargs)["ShardIterator"]
+
+
+def coalesce_changes(
+    name: str, records: List[Dict[str, Any]]
+) -> Tuple[Dict[Any, Dict[str, Any]], List[Any]]:
+    """Reduce los registros del stream a la última versión de cada llave primaria"""
+    spec = FEATURE_TABLES[name]
+    decimal_to_float = set(spec["decimal_to_float"])
+    decimal_to_int = set(spec["decimal_to_int"])
+    skip_columns = set(spec.get("skip_columns", []))
+
+    latest = {}
+    for record in records:
+        primary_key = record["dynamodb"]["Keys"][spec["primary_key"]]["S"]
+        if record["eventName"] == "REMOVE":
+            latest[primary_key] = None
+        else:
+            latest[primary_key] = {
+                column: convert_attribute_value(
+                    column, value, decimal_to_float, decimal_to_int
+                )
+                for column, value in record["dynamodb"]["NewImage"].items()
+                if column not in skip_columns
+            }
+
+    upserts = {key: row for key, row in latest.items() if row is not None}
+    removed = [key for key, row in latest.items() if row is None]
+    return upserts, removed
+
+
+def apply_changes(
+    name: str,
+    df: pl.DataFrame,
+    feature_store: FeatureStore,
+    upserts: Dict[Any, Dict[str, Any]],
+    removed: List[Any],
+) -> pl.DataFrame:
+    """Reemplaza en el DataFrame y en el FeatureStore sólo las filas que cambiaron"""
+    spec = FEATURE_TABLES[name]
+    primary_key = spec["primary_key"]
+
+    changed_df = None
+    if upserts:
+        names = []
+        for row in upserts.values():
+            names.extend(column for column in row if column not in names)
+        changed_df = spec["build"](
+            {column: [row.get(column) for row in upserts.values()] for column in names}
+        )
+
+    changed_keys = list(upserts) + removed
+    df = df.filter(~pl.col(primary_key).is_in(changed_keys))
+    if changed_df is not None:
+        df = pl.concat([df, changed_df], how="diagonal_relaxed")
+
+    feature_store.remove(name, removed)
+    feature_store.upsert(name, changed_df)
+    return df
+
+
+class FeatureRefresher:
+    """Mantiene frescos los DataFrames de features de un contenedor caliente"""
+
+    def __init__(
+        self, max_staleness_seconds: float = None, budget_seconds: float = None
+    ):
+        self.max_staleness_seconds = (
+            FEATURE_MAX_STALENESS_SECONDS
+            if max_staleness_seconds is None
+            else max_staleness_seconds
+        )
+        self.budget_seconds = (
+            STREAM_REFRESH_BUDGET_SECONDS if budget_seconds is None else budget_seconds
+        )
+        self.readers = {}
+        self.ready = False
+        self.last_refresh = None
+
+    def start(self, positions: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        """Abre los streams de las tablas de features antes de la carga completa; con
+        las posiciones de un snapshot continúa donde quedó su builder"""
+        self.readers = {}
+        self.ready = False
+        # Aunque falle, el bound de staleness cuenta desde la carga completa
+        self.last_refresh = time.monotonic()
+
+        streams_client = boto3.client("dynamodbstreams")
+        readers = {
+            name: TableStreamReader(os.environ.get(spec["env"]), streams_client)
+            for name, spec in FEATURE_TABLES.items()
+        }
+        for name, reader in readers.items():
+            reader.start(None if positions is None else positions.get(name, {}))
+        self.readers = readers
+        self.ready = True
+
+    def is_stale(self) -> bool:
+        return (
+            self.last_refresh is None
+            or time.monotonic() - self.last_refresh >= self.max_staleness_seconds
+        )
+
+    def refresh(
+        self, frames: Dict[str, Optional[pl.DataFrame]], feature_store: FeatureStore
+    ) -> Dict[str, Optional[pl.DataFrame]]:
+        """Aplica los cambios pendientes de cada stream a los frames y al store; lo
+        que no alcanza a leerse dentro del presupuesto queda para la siguiente"""
+        if not self.ready:
+            raise StreamRefreshError("Los streams de las tablas no están abiertos")
+
+        refreshed_at = time.monotonic()
+        deadline = refreshed_at + self.budget_seconds
+        frames = dict(frames)
+        readers = list(self.readers.items())
+        caught_up = True
+        for idx, (name, reader) in enumerate(readers):
+            # Cada stream recibe su parte del tiempo restante; lo que uno no usa
+            # pasa a los siguientes
+            now = time.monotonic()
+            records = reader.read_changes(now + (deadline - now) / (len(readers) - idx))
+            frames[name] = self._apply_records(name, frames, feature_store, records)
+            caught_up = caught_up and reader.caught_up
+
+        if caught_up:
+            self.last_refresh = refreshed_at
+        else:
+            # Sigue vencido: la próxima invocación continúa desde las posiciones actuales
+            log_message(
+                "Refresh incremental incompleto, se continúa en la siguiente invocación",
+                level="warning",
+                pending=[name for name, reader in readers if not reader.caught_up],
+            )
+        return frames
+
+    def replay(
+        self, frames: Dict[str, Optional[pl.DataFrame]], feature_store: FeatureStore
+    ) -> Dict[str, Optional[pl.DataFrame]]:
+        """Pone al día frames de un snapshot leyendo cada stream hasta el final;
+        requiere start con las posiciones del snapshot"""
+        if not self.ready:
+            raise StreamRefreshError("Los streams de las tablas no están abiertos")
+
+        refreshed_at = time.monotonic()
+        frames = dict(frames)
+        for name, reader in self.readers.items():
+            # Reaplicar un cambio ya incluido en el snapshot deja la misma fila
+            frames[name] = self._apply_records(
+                name, frames, feature_store, reader.catch_up()
+            )
+
+        self.last_refresh = refreshed_at
+        return frames
+
+    def _apply_records(
+        self,
+        name: str,
+        frames: Dict[str, Optional[pl.DataFrame]],
+        feature_store: FeatureStore,
+        records: List[Dict[str, Any]],
+    ) -> pl.DataFrame:
+        if frames.get(name) is None:
+            raise StreamRefreshError(f"{name} no está cargada en memoria")
+
+        try:
+            upserts, removed = coalesce_changes(name, records)
+            if not upserts and not removed:
+                return frames[name]
+
+            log_message(
+                f"Refresh incremental de {name}",
+                upserts=len(upserts),
+                removed=len(removed),
+            )
+            return apply_changes(name, frames[name], feature_store, upserts, removed)
+        except Exception as e:
+            # Las posiciones del stream ya avanzaron: sin estos cambios sólo queda
+            # recargar la tabla completa
+            raise StreamRefreshError(
+                f"No se pudieron aplicar los cambios de {name}: {e}"
+            ) from e
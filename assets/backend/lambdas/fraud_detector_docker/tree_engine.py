@@ -0,0 +1,181 @@
+import json
+from typing import Any, List
+import numpy as np
+
+SUPPORTED_OBJECTIVES = {"binary:logistic"}
+
+
+class FlatTreeEnsemble:
+    """Árboles del booster aplanados en arreglos NumPy para evaluar sin XGBoost"""
+
+    def __init__(
+        self,
+        left: np.ndarray,
+        right: np.ndarray,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        default_left: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        max_depth: int,
+        base_margin: float,
+        feature_names: List[str] = None,
+    ):
+        self.left = left
+        self.right = right
+        self.feature = feature
+        self.threshold = threshold
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.base_margin = np.float32(base_margin)
+        self.feature_names = feature_names
+        # children[2 * nodo + 1] es el hijo derecho: un solo gather por nivel
+        self.children = np.stack([left, right], axis=1).ravel()
+
+    @classmethod
+    def from_booster(cls, booster) -> "FlatTreeEnsemble":
+        """Exporta un xgboost.Booster entrenado con binary:logistic y splits numéricos"""
+        model = json.loads(booster.save_raw("json"))
+        learner = model["learner"]
+
+        objective = learner["objective"]["name"]
+        if objective not in SUPPORTED_OBJECTIVES:
+            raise ValueError(f"Objetivo no soportado: {objective}")
+        if learner["gradient_booster"]["name"] != "gbtree":
+            raise ValueError("Sólo se soportan boosters gbtree")
+
+        trees = learner["gradient_booster"]["model"]["trees"]
+        left, right, feature, threshold, default_left, value, roots = (
+            [],
+            [],
+            [],
+            [],
+            [],
+            [],
+            [],
+        )
+        max_depth = 0
+        offset = 0
+        for tree in trees:
+            if any(tree["split_type"]):
+                raise ValueError("Los splits categóricos no están soportados")
+
+            tree_left = np.asarray(tree["left_children"], dtype=np.int32)
+            tree_right = np.asarray(tree["right_children"], dtype=np.int32)
+            is_leaf = tree_left == -1
+
+            # Las hojas apuntan a sí mismas para poder avanzar todos los nodos a la vez
+            node_ids = np.arange(tree_left.size, dtype=np.int32)
+            left.append(np.where(is_leaf, node_ids, tree_left) + offset)
+            right.append(np.where(is_leaf, node_ids, tree_right) + offset)
+            feature.append(np.asarray(tree["split_indices"], dtype=np.int32))
+            conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+            threshold.append(conditions)
+            default_left.append(np.asarray(tree["default_left"], dtype=bool))
+            # En el formato JSON el valor de la hoja vive en split_conditions
+            value.append(np.where(is_leaf, conditions, np.float32(0)))
+            roots.append(offset)
+
+            max_depth = max(max_depth, _tree_depth(tree_left, tree_right))
+            offset += tree_left.size
+
+        base_score = float(
+            learner["learner_model_param"]["base_score"].strip("[]").split(",")[0]
+        )
+        # base_score se guarda como probabilidad; el margen está en logit
+        base_margin = float(np.log(base_score / (1.0 - base_score)))
+
+        return cls(
+            left=np.concatenate(left),
+            right=np.concatenate(right),
+            feature=np.concatenate(feature),
+            threshold=np.concatenate(threshold),
+            default_left=np.concatenate(default_left),
+            value=np.concatenate(value),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            base_margin=base_margin,
+            feature_names=booster.feature_names,
+        )
+
+    def save(self, path: str) -> None:
+        """Guarda los arreglos en un .npz que se carga sin XGBoost"""
+        np.savez(
+            path,
+            left=self.left,
+            right=self.right,
+            feature=self.feature,
+            threshold=self.threshold,
+            default_left=self.default_left,
+            value=self.value,
+            roots=self.roots,
+            max_depth=np.int32(self.max_depth),
+            base_margin=self.base_margin,
+        )
+
+    @classmethod
+    def load(cls, path: str, feature_names: List[str] = None) -> "FlatTreeEnsemble":
+        """Inverso de save()"""
+        with np.load(path) as arrays:
+            return cls(
+                left=arrays["left"],
+                right=arrays["right"],
+                feature=arrays["feature"],
+                threshold=arrays["threshold"],
+                default_left=arrays["default_left"],
+                value=arrays["value"],
+                roots=arrays["roots"],
+                max_depth=int(arrays["max_depth"]),
+                base_margin=float(arrays["base_margin"]),
+                feature_names=feature_names,
+            )
+
+    def predict_margin(self, X: Any) -> np.ndarray:
+        """Suma de hojas más el margen base para cada fila"""
+        X = _as_float32(X)
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.int64) * n_features)[:, None]
+        nodes = np.broadcast_to(self.roots, (n_rows, self.roots.size)).copy()
+
+        # Un paso por nivel: todas las filas y todos los árboles a la vez
+        for _ in range(self.max_depth):
+            values = flat_X[row_offsets + self.feature[nodes]]
+            # NaN < umbral es False, así que sólo hay que corregir los faltantes
+            go_right = ~(values < self.threshold[nodes])
+            missing = np.isnan(values)
+            if missing.any():
+                go_right[missing] = ~self.default_left[nodes[missing]]
+            nodes = self.children[nodes * 2 + go_right]
+
+        return self.value[nodes].sum(axis=1, dtype=np.float32) + self.base_margin
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        """Mismo formato que XGBClassifier.predict_proba: columnas [clase 0, clase 1]"""
+        margin = self.predict_margin(X)
+        positive = (1.0 / (1.0 + np.exp(-margin))).astype(np.float32)
+        return np.column_stack([1.0 - positive, positive])
+
+
+def _as_float32(X: Any) -> np.ndarray:
+    if hasattr(X, "to_numpy"):
+        X = X.to_numpy(dtype=np.float32)
+    return np.ascontiguousarray(X, dtype=np.float32)
+
+
+def _tree_depth(left: np.ndarray, right: np.ndarray) -> int:
+    depth = 0
+    level = [0]
+    while level:
+        children = [
+            child
+            for node in level
+            for child in (left[node], right[node])
+            if child != -1
+        ]
+        if children:
+            depth += 1
+        level = children
+    return depth
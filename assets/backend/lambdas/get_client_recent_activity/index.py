@@ -1,45 +1,32 @@
-import json
 import os
 import boto3
-from decimal import Decimal
+from list_endpoint import list_page, json_response
+from pagination import InvalidPageRequest
 
-dynamodb = boto3.resource("dynamodb")
+dynamodb = boto3.client("dynamodb")
+KEY_ATTRIBUTES = ("client_recent_activity_id",)
 table_name = os.environ["TABLE_NAME"]
-table = dynamodb.Table(table_name)
-
-
-def decimal_default(obj):
-    if isinstance(obj, Decimal):
-        return float(obj)
-    raise TypeError
 
 
 def handler(event, context):
     print(f"Event: {event}")
     print(f"Context: {context}")
     try:
-        response = table.scan()
-        items = response.get("Items", [])
+        page = list_page(
+            dynamodb, table_name, event.get("queryStringParameters"), KEY_ATTRIBUTES
+        )
+        print(f"Returning {len(page['items'])} items from {table_name}")
 
-        return {
-            "statusCode": 200,
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-            },
-            "body": json.dumps(items, default=decimal_default),
-        }
+        return json_response(
+            200,
+            {"client_recent_activity": page["items"], "next_token": page["next_token"]},
+        )
+    except InvalidPageRequest as e:
+        return json_response(400, {"error": str(e)})
     except Exception as e:
         print(f"ERROR: {str(e)}")
         print(f"Event: {event}")
         import traceback
 
         traceback.print_exc()
-        return {
-            "statusCode": 500,
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-            },
-            "body": json.dumps({"error": str(e)}),
-        }
+        return json_response(500, {"error": str(e)})
@@ -1,44 +1,31 @@
-import json
 import os
 import boto3
+from list_endpoint import list_page, json_response
+from pagination import InvalidPageRequest
 
-dynamodb = boto3.resource("dynamodb")
+dynamodb = boto3.client("dynamodb")
+KEY_ATTRIBUTES = ("client_id",)
 table_name = os.environ["CLIENTS_TABLE_NAME"]
-table = dynamodb.Table(table_name)
 
 
 def handler(event, context):
     print(f"Event: {event}")
     print(f"Context: {context}")
     try:
-        response = table.scan(Limit=1000)
-        items = response.get("Items", [])
+        page = list_page(
+            dynamodb, table_name, event.get("queryStringParameters"), KEY_ATTRIBUTES
+        )
+        print(f"Returning {len(page['items'])} items from {table_name}")
 
-        while "LastEvaluatedKey" in response:
-            response = table.scan(
-                Limit=1000, ExclusiveStartKey=response["LastEvaluatedKey"]
-            )
-            items.extend(response.get("Items", []))
-
-        return {
-            "statusCode": 200,
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-            },
-            "body": json.dumps({"clients": items}),
-        }
+        return json_response(
+            200, {"clients": page["items"], "next_token": page["next_token"]}
+        )
+    except InvalidPageRequest as e:
+        return json_response(400, {"error": str(e)})
     except Exception as e:
         print(f"ERROR: {str(e)}")
         print(f"Event: {event}")
         import traceback
 
         traceback.print_exc()
-        return {
-            "statusCode": 500,
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-            },
-            "body": json.dumps({"error": str(e)}),
-        }
+        return json_response(500, {"error": str(e)})
@@ -1,18 +1,23 @@
 import json
 import os
 import boto3
-from boto3.dynamodb.conditions import Attr
-from decimal import Decimal
+from boto3.dynamodb.conditions import Key
+from pagination import (
+    InvalidPageRequest,
+    decimal_default,
+    encode_next_token,
+    page_kwargs,
+)
 
 dynamodb = boto3.resource("dynamodb")
 table_name = os.environ["TRANSACTIONS_TABLE_NAME"]
+account_index_name = os.environ.get(
+    "TRANSACTIONS_ACCOUNT_INDEX_NAME", "client_account_id-created_at-index"
+)
 table = dynamodb.Table(table_name)
-
-
-def decimal_default(obj):
-    if isinstance(obj, Decimal):
-        return int(obj) if obj % 1 == 0 else float(obj)
-    raise TypeError
+# LastEvaluatedKey de cada lectura: la llave de la tabla y, en el GSI, la del índice
+TABLE_KEY = ("transaction_id",)
+ACCOUNT_INDEX_KEY = TABLE_KEY + ("client_account_id", "created_at")
 
 
 def handler(event, context):
@@ -23,15 +28,23 @@ def handler(event, context):
         account_id = query_params.get("account_id")
 
         if account_id:
+            pagination = page_kwargs(query_params, ACCOUNT_INDEX_KEY)
+            start_key = pagination.get("ExclusiveStartKey")
+            if start_key and start_key["client_account_id"] != account_id:
+                raise InvalidPageRequest("next_token no corresponde a account_id")
             print(f"Filtering transactions by account_id: {account_id}")
-            response = table.scan(
-                FilterExpression=Attr("client_account_id").eq(account_id)
+            # Query sobre el GSI: sólo lee las transacciones de la cuenta, más recientes primero
+            response = table.query(
+                IndexName=account_index_name,
+                KeyConditionExpression=Key("client_account_id").eq(account_id),
+                ScanIndexForward=False,
+                **pagination,
             )
             print(
                 f"Found {len(response.get('Items', []))} transactions for account_id: {account_id}"
             )
         else:
-            response = table.scan()
+            response = table.scan(**page_kwargs(query_params, TABLE_KEY))
 
         items = response.get("Items", [])
 
@@ -41,7 +54,22 @@ def handler(event, context):
                 "Content-Type": "application/json",
                 "Access-Control-Allow-Origin": "*",
             },
-            "body": json.dumps({"transactions": items}, default=decimal_default),
+            "body": json.dumps(
+                {
+                    "transactions": items,
+                    "next_token": encode_next_token(response.get("LastEvaluatedKey")),
+                },
+                default=decimal_default,
+            ),
+        }
+    except InvalidPageRequest as e:
+        return {
+            "statusCode": 400,
+            "headers": {
+                "Content-Type": "application/json",
+                "Access-Control-Allow-Origin": "*",
+            },
+            "body": json.dumps({"error": str(e)}),
         }
     except Exception as e:
         print(f"ERROR: {str(e)}")
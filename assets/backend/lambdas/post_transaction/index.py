@@ -1,8 +1,9 @@
 import json
 import os
+from decimal import Decimal
 import boto3
-from datetime import datetime, timezone, timedelta
-from uuid import uuid4
+from instrumentation import metrics
+from transaction_item import build_transaction_item, now_mexico
 
 dynamodb = boto3.resource("dynamodb")
 table_name = os.environ["TRANSACTIONS_TABLE_NAME"]
@@ -13,28 +14,13 @@ def handler(event, context):
     print(f"Event: {event}")
     print(f"Context: {context}")
     try:
-        body = json.loads(event.get("body", "{}"))
+        # DynamoDB no acepta float: los montos se leen como Decimal
+        body = json.loads(event.get("body", "{}"), parse_float=Decimal)
 
-        mexico_tz = timezone(timedelta(hours=-6))
-        now = datetime.now(mexico_tz).strftime("%Y-%m-%d %H:%M:%S")
+        transaction_data = build_transaction_item(body, now_mexico())
 
-        transaction_data = {
-            "transaction_id": body.get("transaction_id") or str(uuid4()),
-            "movement_type": body.get("movement_type"),
-            "tx_type": body.get("tx_type"),
-            "client_account_id": body.get("client_account_id"),
-            "counterparty_account_id": body.get("counterparty_account_id"),
-            "amount": body.get("amount"),
-            "created_at": body.get("created_at") or now,
-            "updated_at": now,
-            "risk_score": body.get("risk_score"),
-            "explanation": body.get("explanation"),
-            "status": body.get("status", "STARTED"),
-            "last_status_at": body.get("last_status_at") or now,
-            "risk_prediction": body.get("risk_prediction", False),
-        }
-
-        table.put_item(Item=transaction_data)
+        with metrics.span("dynamodb_put"):
+            table.put_item(Item=transaction_data)
 
         return {
             "statusCode": 200,
@@ -63,3 +49,5 @@ def handler(event, context):
             },
             "body": json.dumps({"error": str(e)}),
         }
+    finally:
+        metrics.flush()
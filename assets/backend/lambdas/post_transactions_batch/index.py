@@ -0,0 +1,208 @@
+import base64
+import json
+import os
+import random
+import time
+import boto3
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+from typing import Optional, Dict, Any, List, Tuple
+from list_endpoint import json_response
+from structured_logging import begin_invocation, configure_logging, log_message
+from transaction_item import build_transaction_item, now_mexico
+
+MAX_BATCH_ITEMS = int(os.environ.get("MAX_BATCH_ITEMS", "5000"))
+BATCH_WRITE_WORKERS = int(os.environ.get("BATCH_WRITE_WORKERS", "4"))
+BATCH_WRITE_MAX_ATTEMPTS = int(os.environ.get("BATCH_WRITE_MAX_ATTEMPTS", "8"))
+BATCH_WRITE_CHUNK_SIZE = 25
+
+REQUIRED_FIELDS = ("client_account_id", "counterparty_account_id", "amount")
+# Errores de capacidad con los que se reintenta el chunk completo
+THROTTLING_ERROR_CODES = {
+    "ProvisionedThroughputExceededException",
+    "ThrottlingException",
+    "RequestLimitExceeded",
+    "TooManyRequestsException",
+}
+
+dynamodb = boto3.resource("dynamodb")
+table_name = os.environ["TRANSACTIONS_TABLE_NAME"]
+executor = ThreadPoolExecutor(max_workers=BATCH_WRITE_WORKERS)
+logger = configure_logging()
+
+
+class InvalidBatch(ValueError):
+    """El body completo no se puede interpretar como un batch"""
+
+
+def parse_body(event: Dict[str, Any]) -> List[Any]:
+    """Acepta un arreglo JSON o NDJSON (una transacción por línea)"""
+    body = event.get("body") or ""
+    if event.get("isBase64Encoded"):
+        body = base64.b64decode(body).decode("utf-8")
+    body = body.strip()
+    if not body:
+        raise InvalidBatch("El body está vacío")
+
+    try:
+        if body.startswith("["):
+            rows = json.loads(body, parse_float=Decimal)
+        else:
+            rows = [
+                json.loads(line, parse_float=Decimal)
+                for line in body.splitlines()
+                if line.strip()
+            ]
+    except ValueError as e:
+        raise InvalidBatch(f"JSON inválido: {e}")
+
+    if len(rows) > MAX_BATCH_ITEMS:
+        raise InvalidBatch(
+            f"El batch tiene {len(rows)} transacciones, el máximo es {MAX_BATCH_ITEMS}"
+        )
+    return rows
+
+
+def validate_row(row: Any) -> Optional[str]:
+    if not isinstance(row, dict):
+        return "La transacción debe ser un objeto"
+    missing = [field for field in REQUIRED_FIELDS if row.get(field) in (None, "")]
+    if missing:
+        return f"Faltan campos: {', '.join(missing)}"
+    # Es la llave de la tabla: un número u objeto no se puede escribir ni comparar
+    transaction_id = row.get("transaction_id")
+    if transaction_id is not None and (
+        not isinstance(transaction_id, str) or not transaction_id.strip()
+    ):
+        return "transaction_id debe ser un string no vacío"
+    try:
+        if parse_amount(row["amount"]).is_finite():
+            return None
+    except InvalidOperation:
+        pass
+    return "amount no es numérico"
+
+
+def parse_amount(value: Any) -> Decimal:
+    """amount como Decimal; "150.50" se guarda como número, no como string"""
+    return Decimal(str(value).strip())
+
+
+def prepare_items(rows: List[Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Valida todo el batch en una pasada; devuelve items a escribir y resultados"""
+    now = now_mexico()
+    results = []
+    items = []
+    seen_ids = {}
+
+    for idx, row in enumerate(rows):
+        error = validate_row(row)
+        item = None
+        if error is None:
+            item = build_transaction_item(
+                {**row, "amount": parse_amount(row["amount"])}, now
+            )
+            # BatchWriteItem rechaza el chunk completo si una llave se repite
+            if item["transaction_id"] in seen_ids:
+                error = f"transaction_id duplicado con el índice {seen_ids[item['transaction_id']]}"
+            else:
+                seen_ids[item["transaction_id"]] = idx
+
+        results.append(
+            {
+                "index": idx,
+                "transaction_id": item["transaction_id"] if item else None,
+                "status": "INVALID" if error else "CREATED",
+                **({"error": error} if error else {}),
+            }
+        )
+        if error is None:
+            items.append(item)
+
+    return items, results
+
+
+def write_chunk(items: List[Dict[str, Any]]) -> List[str]:
+    """Escribe hasta 25 items y reintenta UnprocessedItems con backoff exponencial"""
+    requests = [{"PutRequest": {"Item": item}} for item in items]
+    for attempt in range(BATCH_WRITE_MAX_ATTEMPTS):
+        if attempt:
+            time.sleep(min(2.0, 0.05 * 2**attempt) * random.uniform(0.5, 1.0))
+        try:
+            response = dynamodb.meta.client.batch_write_item(
+                RequestItems={table_name: requests}
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES:
+                continue
+            raise
+        requests = response.get("UnprocessedItems", {}).get(table_name, [])
+        if not requests:
+            return []
+
+    return [request["PutRequest"]["Item"]["transaction_id"] for request in requests]
+
+
+def write_items(items: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Reparte los chunks entre threads; devuelve transaction_id -> error"""
+    chunks = [
+        items[start : start + BATCH_WRITE_CHUNK_SIZE]
+        for start in range(0, len(items), BATCH_WRITE_CHUNK_SIZE)
+    ]
+    failures = {}
+    futures = [(chunk, executor.submit(write_chunk, chunk)) for chunk in chunks]
+    for chunk, future in futures:
+        try:
+            for transaction_id in future.result():
+                failures[transaction_id] = "Sin procesar tras los reintentos"
+        except Exception as e:
+            log_message(
+                f"Error escribiendo chunk: {e}",
+                level="error",
+                exc_info=True,
+                items=len(chunk),
+            )
+            for item in chunk:
+                failures[item["transaction_id"]] = str(e)
+    return failures
+
+
+def handler(event, context):
+    begin_invocation(getattr(context, "aws_request_id", None))
+    try:
+        rows = parse_body(event)
+        items, results = prepare_items(rows)
+        log_message("Batch recibido", rows=len(rows), valid=len(items))
+
+        failures = write_items(items)
+        for result in results:
+            error = failures.get(result["transaction_id"])
+            if result["status"] == "CREATED" and error:
+                result["status"] = "FAILED"
+                result["error"] = error
+
+        summary = {
+            status: sum(1 for result in results if result["status"] == status)
+            for status in ("CREATED", "INVALID", "FAILED")
+        }
+        log_message(
+            "Resultado del batch",
+            **{status.lower(): count for status, count in summary.items()},
+        )
+
+        return json_response(
+            200,
+            {
+                "message": "Transactions processed",
+                "created": summary["CREATED"],
+                "invalid": summary["INVALID"],
+                "failed": summary["FAILED"],
+                "results": results,
+            },
+        )
+    except InvalidBatch as e:
+        return json_response(400, {"error": str(e)})
+    except Exception as e:
+        log_message(f"ERROR: {e}", level="error", exc_info=True)
+        return json_response(500, {"error": str(e)})
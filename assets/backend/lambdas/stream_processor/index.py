@@ -1,6 +1,13 @@
 import json
 import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
 import boto3
+from broadcaster import Broadcaster
+from instrumentation import metrics
+from structured_logging import begin_invocation, configure_logging, log_message
 
 sqs = boto3.client("sqs")
 apigateway = boto3.client(
@@ -10,95 +17,201 @@ dynamodb = boto3.resource("dynamodb")
 connections_table = dynamodb.Table(os.environ["CONNECTIONS_TABLE_NAME"])
 
 queue_url = os.environ["SQS_QUEUE_URL"]
+broadcaster = Broadcaster(connections_table, apigateway)
 
+# Límites de SendMessageBatch
+SQS_BATCH_MAX_ENTRIES = 10
+SQS_BATCH_MAX_BYTES = 256 * 1024
+SEND_BATCH_MAX_ATTEMPTS = int(os.environ.get("SEND_BATCH_MAX_ATTEMPTS", "5"))
+SEND_BATCH_WORKERS = int(os.environ.get("SEND_BATCH_WORKERS", "4"))
 
-def handler(event, context):
-    print(f"Event: {event}")
-    print(f"Context: {context}")
-    try:
-        for record in event["Records"]:
-            if record["eventName"] == "INSERT":
-                new_image = record["dynamodb"]["NewImage"]
-
-                # Debug: Print the amount field
-                print(f"Amount field from DynamoDB: {new_image.get('amount', {})}")
-
-                transaction_data = {
-                    "transaction_id": new_image["transaction_id"]["S"],
-                    "movement_type": new_image.get("movement_type", {}).get("S", ""),
-                    "tx_type": new_image.get("tx_type", {}).get("S", ""),
-                    "client_account_id": new_image.get("client_account_id", {}).get(
-                        "S", ""
-                    ),
-                    "counterparty_account_id": new_image.get(
-                        "counterparty_account_id", {}
-                    ).get("S", ""),
-                    "amount": float(new_image.get("amount", {}).get("N", "0")),
-                    "created_at": new_image.get("created_at", {}).get("S", ""),
-                    "risk_score": float(new_image.get("risk_score", {}).get("N", "0")),
-                    "risk_prediction": new_image.get("risk_prediction", {}).get(
-                        "S", ""
-                    ),
-                }
-
-                # Debug: Print parsed amount
-                print(f"Parsed amount: {transaction_data['amount']}")
-                transaction_data["status"] = (
-                    "ANALYZED" if transaction_data["risk_prediction"] else "STARTED"
-                )
+executor = ThreadPoolExecutor(max_workers=SEND_BATCH_WORKERS)
+logger = configure_logging()
 
-                # Send to SQS
-                if transaction_data["status"] == "STARTED":
-                    sqs.send_message(
-                        QueueUrl=queue_url,
-                        MessageBody=json.dumps(transaction_data),
-                        MessageGroupId=transaction_data["transaction_id"],
-                        MessageDeduplicationId=transaction_data["transaction_id"],
-                    )
-
-                    # Broadcast to WebSocket clients
-                    broadcast_message = {
-                        "type": "new_transaction",
-                        "status": "STARTED",
-                        "transaction_id": transaction_data["transaction_id"],
-                        "amount": transaction_data["amount"],
-                        "client_account_id": transaction_data["client_account_id"],
-                        "counterparty_account_id": transaction_data[
-                            "counterparty_account_id"
-                        ],
-                        "created_at": transaction_data["created_at"],
-                        "movement_type": transaction_data["movement_type"],
-                        "tx_type": transaction_data["tx_type"],
-                    }
 
-                    # Debug: Print broadcast message
-                    print(f"Broadcasting message: {json.dumps(broadcast_message)}")
-                    broadcast_to_clients(broadcast_message)
+def build_transaction_data(new_image: Dict[str, Any]) -> Dict[str, Any]:
+    """Mensaje para el fraud detector a partir de la imagen nueva del stream"""
+    transaction_data = {
+        "transaction_id": new_image["transaction_id"]["S"],
+        "movement_type": new_image.get("movement_type", {}).get("S", ""),
+        "tx_type": new_image.get("tx_type", {}).get("S", ""),
+        "client_account_id": new_image.get("client_account_id", {}).get("S", ""),
+        "counterparty_account_id": new_image.get("counterparty_account_id", {}).get(
+            "S", ""
+        ),
+        "amount": float(new_image.get("amount", {}).get("N", "0")),
+        "created_at": new_image.get("created_at", {}).get("S", ""),
+        "risk_score": float(new_image.get("risk_score", {}).get("N", "0")),
+        "risk_prediction": new_image.get("risk_prediction", {}).get("S", ""),
+    }
+    transaction_data["status"] = (
+        "ANALYZED" if transaction_data["risk_prediction"] else "STARTED"
+    )
+    return transaction_data
 
-        return {"statusCode": 200}
-    except Exception as e:
-        print(f"ERROR: {e}")
-        print(f"Event: {event}")
-        import traceback
 
-        traceback.print_exc()
-        return {"statusCode": 500}
+def build_broadcast_message(transaction_data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "type": "new_transaction",
+        "status": "STARTED",
+        "transaction_id": transaction_data["transaction_id"],
+        "amount": transaction_data["amount"],
+        "client_account_id": transaction_data["client_account_id"],
+        "counterparty_account_id": transaction_data["counterparty_account_id"],
+        "created_at": transaction_data["created_at"],
+        "movement_type": transaction_data["movement_type"],
+        "tx_type": transaction_data["tx_type"],
+    }
 
 
-def broadcast_to_clients(message):
-    try:
-        response = connections_table.scan()
-        connections = response.get("Items", [])
+def chunk_entries(entries: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Agrupa entries en lotes de hasta 10 mensajes y 256 KB de cuerpo"""
+    chunks = []
+    current = []
+    current_bytes = 0
+    for entry in entries:
+        size = len(entry["MessageBody"].encode("utf-8"))
+        if current and (
+            len(current) == SQS_BATCH_MAX_ENTRIES
+            or current_bytes + size > SQS_BATCH_MAX_BYTES
+        ):
+            chunks.append(current)
+            current = []
+            current_bytes = 0
+        current.append(entry)
+        current_bytes += size
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def send_chunk(entries: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Envía un lote y reintenta sólo las entries fallidas; devuelve Id -> error"""
+    failures = {}
+    pending = entries
+    last_error = "Sin enviar tras los reintentos"
+    for attempt in range(SEND_BATCH_MAX_ATTEMPTS):
+        if attempt:
+            time.sleep(min(2.0, 0.05 * 2**attempt) * random.uniform(0.5, 1.0))
+        try:
+            response = sqs.send_message_batch(QueueUrl=queue_url, Entries=pending)
+        except Exception as e:
+            # Throttling o error de red: se reintenta el lote completo
+            last_error = str(e)
+            continue
+
+        by_id = {entry["Id"]: entry for entry in pending}
+        pending = []
+        for failed in response.get("Failed", []):
+            if failed.get("SenderFault"):
+                # Error del mensaje (tamaño, formato): reintentar no lo arregla
+                failures[failed["Id"]] = failed.get("Message", failed["Code"])
+            else:
+                pending.append(by_id[failed["Id"]])
+        if not pending:
+            return failures
+
+    for entry in pending:
+        failures[entry["Id"]] = last_error
+    return failures
 
-        for connection in connections:
+
+def handler(event, context):
+    records = event.get("Records", [])
+    begin_invocation(getattr(context, "aws_request_id", None))
+    # Sólo el tamaño: el batch completo (hasta 200 registros) sale en las muestreadas
+    log_message("Batch recibido", records=len(records))
+    log_message("Evento completo", level="debug", event=event)
+    failed_sequence_numbers = set()
+    try:
+        entries = []
+        sent = {}
+        for idx, record in enumerate(records):
+            if record["eventName"] != "INSERT":
+                continue
+            sequence_number = record["dynamodb"]["SequenceNumber"]
             try:
-                apigateway.post_to_connection(
-                    ConnectionId=connection["connectionId"],
-                    Data=json.dumps(message).encode("utf-8"),
+                transaction_data = build_transaction_data(
+                    record["dynamodb"]["NewImage"]
+                )
+            except Exception as e:
+                log_message(
+                    f"Registro inválido: {e}",
+                    level="error",
+                    sequence_number=sequence_number,
+                )
+                failed_sequence_numbers.add(sequence_number)
+                continue
+
+            if transaction_data["status"] == "STARTED":
+                # Id único dentro del lote; el índice también ubica el registro
+                entry_id = str(idx)
+                entries.append(
+                    {
+                        "Id": entry_id,
+                        "MessageBody": json.dumps(transaction_data),
+                        "MessageGroupId": transaction_data["transaction_id"],
+                        "MessageDeduplicationId": transaction_data["transaction_id"],
+                    }
                 )
-            except Exception:
-                connections_table.delete_item(
-                    Key={"connectionId": connection["connectionId"]}
+                sent[entry_id] = (sequence_number, transaction_data)
+
+        # Send to SQS: lotes de SendMessageBatch en paralelo
+        failures = {}
+        with metrics.span("sqs_send_batch"):
+            for chunk_failures in executor.map(send_chunk, chunk_entries(entries)):
+                failures.update(chunk_failures)
+        for entry_id, error in failures.items():
+            sequence_number, transaction_data = sent.pop(entry_id)
+            log_message(
+                f"Error enviando a la cola: {error}",
+                level="error",
+                transaction_id=transaction_data["transaction_id"],
+            )
+            failed_sequence_numbers.add(sequence_number)
+        log_message(
+            "Transacciones enviadas a la cola", sent=len(sent), total=len(entries)
+        )
+        metrics.count("records", len(records))
+        metrics.count("enqueued", len(sent))
+        metrics.count("failed_records", len(failed_sequence_numbers))
+        for _, transaction_data in sent.values():
+            metrics.record_lag("enqueue_lag", transaction_data["created_at"])
+
+        # Broadcast to WebSocket clients
+        if sent:
+            with metrics.span("broadcast"):
+                broadcaster.broadcast_many(
+                    [
+                        build_broadcast_message(transaction_data)
+                        for _, transaction_data in sent.values()
+                    ]
                 )
+
+        # El stream reintenta desde el primer registro fallido; los que ya se
+        # enviaron los absorbe el MessageDeduplicationId de la cola FIFO
+        return {
+            "batchItemFailures": [
+                {"itemIdentifier": record["dynamodb"]["SequenceNumber"]}
+                for record in records
+                if record["dynamodb"]["SequenceNumber"] in failed_sequence_numbers
+            ]
+        }
     except Exception as e:
-        print(f"Broadcast error: {e}")
+        log_message(
+            f"ERROR: {e}",
+            level="error",
+            exc_info=True,
+            sequence_numbers=lambda: [
+                record["dynamodb"]["SequenceNumber"] for record in records
+            ],
+        )
+        # Sin información por registro: se reintenta el batch completo
+        return {
+            "batchItemFailures": [
+                {"itemIdentifier": record["dynamodb"]["SequenceNumber"]}
+                for record in records[:1]
+            ]
+        }
+    finally:
+        metrics.flush()
@@ -1,91 +1,88 @@
 import json
 import os
 import boto3
-from datetime import datetime, timezone, timedelta
-from decimal import Decimal
+from broadcaster import Broadcaster
+from instrumentation import metrics
+from structured_logging import begin_invocation, configure_logging, log_message
 
 dynamodb = boto3.resource("dynamodb")
-transactions_table = dynamodb.Table(os.environ["TRANSACTIONS_TABLE_NAME"])
 connections_table = dynamodb.Table(os.environ["CONNECTIONS_TABLE_NAME"])
 
 apigateway = boto3.client(
     "apigatewaymanagementapi", endpoint_url=os.environ["WEBSOCKET_ENDPOINT"]
 )
+broadcaster = Broadcaster(connections_table, apigateway)
 
+BROADCAST_RISK_THRESHOLD = float(os.environ.get("BROADCAST_RISK_THRESHOLD", "0.5"))
+logger = configure_logging()
 
-def handler(event, context):
-    print(f"Event: {event}")
-    print(f"Context: {context}")
-    try:
-        for record in event["Records"]:
-            result = json.loads(record["body"])
 
-            mexico_tz = timezone(timedelta(hours=-6))
-            now = datetime.now(mexico_tz).strftime("%Y-%m-%d %H:%M:%S")
+def build_broadcast_message(result: dict) -> dict:
+    return {
+        "type": "analyzed_transaction",
+        "status": "ANALYZED",
+        "transaction_id": result["transaction_id"],
+        "risk_score": result["risk_score"],
+        "risk_prediction": result["risk_prediction"],
+        "client_account_id": result.get("client_account_id", ""),
+        "amount": float(result.get("amount", 0)),
+    }
 
-            # Get transaction details to include client_account_id
-            tx_response = transactions_table.get_item(
-                Key={"transaction_id": result["transaction_id"]}
-            )
-            transaction = tx_response.get("Item", {})
-
-            # Update transaction in DynamoDB
-            transactions_table.update_item(
-                Key={"transaction_id": result["transaction_id"]},
-                UpdateExpression="SET #status = :status, risk_score = :score, risk_prediction = :prediction, explanation = :explanation, updated_at = :updated_at, last_status_at = :last_status_at",
-                ExpressionAttributeNames={"#status": "status"},
-                ExpressionAttributeValues={
-                    ":status": "ANALYZED",
-                    ":score": Decimal(str(result["risk_score"])),
-                    ":prediction": result["risk_prediction"],
-                    ":explanation": result["explanation"],
-                    ":updated_at": now,
-                    ":last_status_at": now,
-                },
-            )
-
-            # Broadcast to WebSocket clients only if risk_score >= 0.5
-            if result["risk_score"] >= 0.5:
-                broadcast_message = {
-                    "type": "analyzed_transaction",
-                    "status": "ANALYZED",
-                    "transaction_id": result["transaction_id"],
-                    "risk_score": result["risk_score"],
-                    "risk_prediction": result["risk_prediction"],
-                    "client_account_id": transaction.get("client_account_id", ""),
-                    "amount": float(transaction.get("amount", 0)),
-                }
-                broadcast_to_clients(broadcast_message)
-
-            else:
-                print(
-                    f"Transaction {result['transaction_id']} has risk_score < 0.5, not broadcasting"
-                )
-
-        return {"statusCode": 200}
-    except Exception as e:
-        print(f"ERROR: {e}")
-        print(f"Event: {event}")
-        import traceback
-
-        traceback.print_exc()
-        return {"statusCode": 500}
 
+def handler(event, context):
+    """Notifica resultados al dashboard; el fraud detector ya los guardó en la tabla"""
+    records = event.get("Records", [])
+    begin_invocation(getattr(context, "aws_request_id", None))
+    log_message("Batch recibido", batch_size=len(records))
+    log_message("Evento completo", level="debug", event=event)
 
-def broadcast_to_clients(message):
+    batch_item_failures = []
+    messages = []
     try:
-        response = connections_table.scan()
-        connections = response.get("Items", [])
-
-        for connection in connections:
+        for record in records:
             try:
-                apigateway.post_to_connection(
-                    ConnectionId=connection["connectionId"],
-                    Data=json.dumps(message).encode("utf-8"),
-                )
-            except Exception:
-                connections_table.delete_item(
-                    Key={"connectionId": connection["connectionId"]}
+                result = json.loads(record["body"])
+                # Broadcast to WebSocket clients only if risk_score >= 0.5
+                if result["risk_score"] >= BROADCAST_RISK_THRESHOLD:
+                    messages.append(build_broadcast_message(result))
+                else:
+                    log_message(
+                        "Risk score bajo el umbral, sin broadcast",
+                        level="debug",
+                        transaction_id=result["transaction_id"],
+                        threshold=BROADCAST_RISK_THRESHOLD,
+                    )
+            except Exception as e:
+                log_message(
+                    f"Resultado inválido: {e}",
+                    level="error",
+                    message_id=record.get("messageId"),
                 )
+                batch_item_failures.append({"itemIdentifier": record["messageId"]})
+
+        # Un scan de conexiones y un pool acotado para todo el batch
+        if messages:
+            with metrics.span("broadcast"):
+                delivered = broadcaster.broadcast_many(messages)
+            log_message(
+                "Broadcast de resultados", messages=len(messages), delivered=delivered
+            )
+
+        metrics.count("records", len(records))
+        metrics.count("broadcast_messages", len(messages))
+        return {"statusCode": 200, "batchItemFailures": batch_item_failures}
     except Exception as e:
-        print(f"Broadcast error: {e}")
+        log_message(
+            f"ERROR: {e}",
+            level="error",
+            exc_info=True,
+            message_ids=[record.get("messageId") for record in records],
+        )
+        return {
+            "statusCode": 500,
+            "batchItemFailures": [
+                {"itemIdentifier": record["messageId"]} for record in records
+            ],
+        }
+    finally:
+        metrics.flush()
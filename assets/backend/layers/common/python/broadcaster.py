@@ -0,0 +1,111 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BROADCAST_CACHE_TTL_SECONDS = float(os.environ.get("BROADCAST_CACHE_TTL_SECONDS", "5"))
+BROADCAST_MAX_WORKERS = int(os.environ.get("BROADCAST_MAX_WORKERS", "16"))
+
+
+class Broadcaster:
+    """Envía mensajes a todas las conexiones WebSocket registradas"""
+
+    def __init__(
+        self,
+        connections_table,
+        apigateway,
+        cache_ttl_seconds: float = BROADCAST_CACHE_TTL_SECONDS,
+        max_workers: int = BROADCAST_MAX_WORKERS,
+    ):
+        self.connections_table = connections_table
+        self.apigateway = apigateway
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._connections = None
+        self._loaded_at = 0.0
+
+    def get_connections(self) -> list:
+        """Ids de conexión, escaneados con paginación y cacheados por un TTL corto"""
+        if (
+            self._connections is None
+            or time.monotonic() - self._loaded_at >= self.cache_ttl_seconds
+        ):
+            connections = []
+            scan_kwargs = {"ProjectionExpression": "connectionId"}
+            while True:
+                response = self.connections_table.scan(**scan_kwargs)
+                connections.extend(
+                    item["connectionId"] for item in response.get("Items", [])
+                )
+                if "LastEvaluatedKey" not in response:
+                    break
+                scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+            self._connections = connections
+            self._loaded_at = time.monotonic()
+        return self._connections
+
+    def broadcast(self, message: dict) -> int:
+        """Publica el mensaje en paralelo y elimina las conexiones que ya no existen"""
+        return self.broadcast_many([message])
+
+    def broadcast_many(self, messages: list) -> int:
+        """Publica varios mensajes con un solo scan y un solo pool para todos los envíos"""
+        try:
+            connections = self.get_connections()
+            if not connections or not messages:
+                return 0
+
+            payloads = [json.dumps(message).encode("utf-8") for message in messages]
+            # Cada conexión recibe los mensajes en orden; las conexiones van en paralelo
+            results = list(
+                self.executor.map(
+                    lambda connection_id: self._post_all(connection_id, payloads),
+                    connections,
+                )
+            )
+
+            gone = [
+                connection_id
+                for connection_id, delivered in zip(connections, results)
+                if delivered is None
+            ]
+            if gone:
+                self._remove_connections(gone)
+
+            return sum(delivered for delivered in results if delivered)
+        except Exception as e:
+            print(f"Broadcast error: {e}")
+            return 0
+
+    def _post_all(self, connection_id: str, payloads: list):
+        """Mensajes entregados a la conexión, o None si ya no existe (410)"""
+        delivered = 0
+        for data in payloads:
+            result = self._post(connection_id, data)
+            if result is None:
+                return None
+            delivered += int(result)
+        return delivered
+
+    def _post(self, connection_id: str, data: bytes):
+        """True si se entregó, None si la conexión ya no existe (410), False si falló"""
+        try:
+            self.apigateway.post_to_connection(ConnectionId=connection_id, Data=data)
+            return True
+        except self.apigateway.exceptions.GoneException:
+            return None
+        except Exception as e:
+            print(f"Error enviando a {connection_id}: {e}")
+            return False
+
+    def _remove_connections(self, connection_ids: list) -> None:
+        gone = set(connection_ids)
+        self._connections = [
+            connection_id
+            for connection_id in self._connections
+            if connection_id not in gone
+        ]
+        with self.connections_table.batch_writer() as batch:
+            for connection_id in gone:
+                batch.delete_item(Key={"connectionId": connection_id})
+        print(f"Eliminadas {len(gone)} conexiones inactivas")
@@ -0,0 +1,160 @@
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "FraudDetector")
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+
+# Los tiempos se agrupan a 2 cifras significativas (~5% de error): los Values/Counts
+# de EMF se mantienen chicos y CloudWatch calcula p50/p99 sobre la distribución
+HISTOGRAM_SIGNIFICANT_DIGITS = int(os.environ.get("HISTOGRAM_SIGNIFICANT_DIGITS", "2"))
+
+# Límites de EMF: 100 métricas por documento y 100 valores por métrica
+EMF_MAX_METRICS = 100
+EMF_MAX_VALUES = 100
+
+# created_at se guarda en hora de México sin zona (ver transaction_item.now_mexico)
+MEXICO_TZ = timezone(timedelta(hours=-6))
+CREATED_AT_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+MILLISECONDS = "Milliseconds"
+COUNT = "Count"
+
+
+def bucket(value: float, digits: int = HISTOGRAM_SIGNIFICANT_DIGITS) -> float:
+    """Redondea a un número fijo de cifras significativas"""
+    if value <= 0:
+        return 0.0
+    return round(value, digits - 1 - int(math.floor(math.log10(value))))
+
+
+def lag_ms(created_at: str, now: Optional[datetime] = None) -> Optional[float]:
+    """Milisegundos desde created_at; None si no se puede interpretar"""
+    try:
+        created = datetime.fromisoformat(created_at)
+    except (TypeError, ValueError):
+        try:
+            created = datetime.strptime(created_at, CREATED_AT_FORMAT)
+        except (TypeError, ValueError):
+            return None
+    if created.tzinfo is None:
+        created = created.replace(tzinfo=MEXICO_TZ)
+    now = now or datetime.now(timezone.utc)
+    return max(0.0, (now - created).total_seconds() * 1000)
+
+
+class Metrics:
+    """Spans y métricas de una invocación, emitidos como CloudWatch Embedded Metric Format"""
+
+    def __init__(
+        self,
+        service: str,
+        namespace: str = METRICS_NAMESPACE,
+        emit: Callable[[str], None] = print,
+        enabled: bool = METRICS_ENABLED,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.service = service
+        self.namespace = namespace
+        self.emit = emit
+        self.enabled = enabled
+        self.clock = clock
+        self._histograms: Dict[Tuple[str, str], Dict[float, int]] = {}
+        self._properties: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str):
+        """Mide el bloque en milisegundos, también si termina con excepción"""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.record(name, (self.clock() - start) * 1000)
+
+    def record(self, name: str, value: float, unit: str = MILLISECONDS) -> None:
+        if not self.enabled or value is None:
+            return
+        if unit == MILLISECONDS:
+            value = bucket(value)
+        with self._lock:
+            histogram = self._histograms.setdefault((name, unit), {})
+            histogram[value] = histogram.get(value, 0) + 1
+
+    def count(self, name: str, value: int = 1) -> None:
+        self.record(name, value, COUNT)
+
+    def record_lag(self, name: str, created_at: str) -> None:
+        """Latencia de punta a punta desde el created_at de la transacción"""
+        self.record(name, lag_ms(created_at))
+
+    def put_property(self, key: str, value: Any) -> None:
+        """Campo sin métrica en el documento, útil para buscar en Logs Insights"""
+        with self._lock:
+            self._properties[key] = value
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """Emite lo acumulado como documentos EMF y reinicia; devuelve los documentos"""
+        with self._lock:
+            histograms, self._histograms = self._histograms, {}
+            properties, self._properties = self._properties, {}
+        if not histograms:
+            return []
+
+        documents = self._documents(histograms, properties)
+        for document in documents:
+            self.emit(json.dumps(document, separators=(",", ":")))
+        return documents
+
+    def _documents(
+        self,
+        histograms: Dict[Tuple[str, str], Dict[float, int]],
+        properties: Dict[str, Any],
+    ) -> List[Dict[str, Any]]:
+        # Una métrica con más de 100 valores distintos se reparte en varios documentos
+        chunks: List[List[Tuple[str, str, List[float], List[int]]]] = []
+        for (name, unit), histogram in sorted(histograms.items()):
+            values = sorted(histogram)
+            for idx, start in enumerate(range(0, len(values), EMF_MAX_VALUES)):
+                part = values[start : start + EMF_MAX_VALUES]
+                while len(chunks) <= idx:
+                    chunks.append([])
+                chunks[idx].append(
+                    (name, unit, part, [histogram[value] for value in part])
+                )
+
+        documents = []
+        timestamp = int(time.time() * 1000)
+        for chunk in chunks:
+            for start in range(0, len(chunk), EMF_MAX_METRICS):
+                metrics = chunk[start : start + EMF_MAX_METRICS]
+                document = {
+                    "_aws": {
+                        "Timestamp": timestamp,
+                        "CloudWatchMetrics": [
+                            {
+                                "Namespace": self.namespace,
+                                "Dimensions": [["Service"]],
+                                "Metrics": [
+                                    {"Name": name, "Unit": unit}
+                                    for name, unit, _, _ in metrics
+                                ],
+                            }
+                        ],
+                    },
+                    **properties,
+                    "Service": self.service,
+                }
+                for name, _, values, counts in metrics:
+                    document[name] = {"Values": values, "Counts": counts}
+                documents.append(document)
+        return documents
+
+
+# Instancia por proceso; cada handler llama flush() al terminar la invocación
+metrics = Metrics(os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "local"))
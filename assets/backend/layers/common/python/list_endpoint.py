@@ -0,0 +1,102 @@
+import base64
+import json
+import re
+from typing import Optional, Dict, Any, List, Sequence
+from pagination import InvalidPageRequest, encode_next_token, page_kwargs
+
+FIELD_NAME_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+JSON_HEADERS = {
+    "Content-Type": "application/json",
+    "Access-Control-Allow-Origin": "*",
+}
+
+
+def _number(value: str):
+    """Número de DynamoDB directo a int/float, sin pasar por Decimal"""
+    if "." in value or "e" in value or "E" in value:
+        return float(value)
+    return int(value)
+
+
+def deserialize_value(value: Dict[str, Any]) -> Any:
+    """Convierte un AttributeValue del wire format a tipos nativos de JSON"""
+    if "S" in value:
+        return value["S"]
+    if "N" in value:
+        return _number(value["N"])
+    if "BOOL" in value:
+        return value["BOOL"]
+    if "NULL" in value:
+        return None
+    if "M" in value:
+        return deserialize_item(value["M"])
+    if "L" in value:
+        return [deserialize_value(element) for element in value["L"]]
+    if "SS" in value:
+        return sorted(value["SS"])
+    if "NS" in value:
+        return sorted(_number(number) for number in value["NS"])
+    if "B" in value:
+        return base64.b64encode(value["B"]).decode("ascii")
+    if "BS" in value:
+        return [base64.b64encode(binary).decode("ascii") for binary in value["BS"]]
+    raise TypeError(f"Tipo de AttributeValue no soportado: {list(value)}")
+
+
+def deserialize_item(item: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    return {name: deserialize_value(value) for name, value in item.items()}
+
+
+def parse_fields(value: Optional[str]) -> List[str]:
+    """Lista de atributos pedidos en fields=a,b,c; vacía significa todos"""
+    if not value:
+        return []
+    fields = []
+    for field in value.split(","):
+        field = field.strip()
+        if not field:
+            continue
+        if not FIELD_NAME_PATTERN.match(field):
+            raise InvalidPageRequest(f"Campo inválido en fields: {field}")
+        if field not in fields:
+            fields.append(field)
+    return fields
+
+
+def projection_kwargs(fields: List[str]) -> Dict[str, Any]:
+    """ProjectionExpression con placeholders para no chocar con palabras reservadas"""
+    if not fields:
+        return {}
+    names = {f"#f{idx}": field for idx, field in enumerate(fields)}
+    return {
+        "ProjectionExpression": ", ".join(names),
+        "ExpressionAttributeNames": names,
+    }
+
+
+def list_page(
+    dynamodb_client,
+    table_name: str,
+    query_params: Optional[Dict[str, Any]],
+    key_attributes: Sequence[str],
+) -> Dict[str, Any]:
+    """Lee una página del Scan respetando limit, next_token y fields"""
+    query_params = query_params or {}
+    response = dynamodb_client.scan(
+        TableName=table_name,
+        **page_kwargs(query_params, key_attributes, wire_format=True),
+        **projection_kwargs(parse_fields(query_params.get("fields"))),
+    )
+    return {
+        "items": [deserialize_item(item) for item in response.get("Items", [])],
+        "next_token": encode_next_token(response.get("LastEvaluatedKey")),
+    }
+
+
+def json_response(status_code: int, body: Any) -> Dict[str, Any]:
+    return {
+        "statusCode": status_code,
+        "headers": JSON_HEADERS,
+        "body": json.dumps(body, separators=(",", ":")),
+    }
@@ -0,0 +1,109 @@
+import base64
+import binascii
+import json
+from decimal import Decimal
+from typing import Optional, Dict, Any, Sequence
+
+MAX_PAGE_LIMIT = 1000
+# Tipos que DynamoDB admite en atributos de llave (B nunca se usa en estas tablas)
+KEY_ATTRIBUTE_TYPES = ("S", "N")
+
+
+class InvalidPageRequest(ValueError):
+    """Parámetros de paginación inválidos; se responde con 400"""
+
+
+def decimal_default(obj):
+    """default= de json.dumps para los Decimal que devuelve boto3"""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    raise TypeError
+
+
+def encode_next_token(last_evaluated_key: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Convierte el LastEvaluatedKey de DynamoDB en un token opaco para la URL"""
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps(last_evaluated_key, default=decimal_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _is_number(value: Any) -> bool:
+    try:
+        return Decimal(value).is_finite()
+    except (ArithmeticError, TypeError, ValueError):
+        return False
+
+
+def _is_key_value(value: Any, wire_format: bool) -> bool:
+    """Valor de llave válido: {"S": "..."} / {"N": "..."} en el cliente, nativo en el resource"""
+    if wire_format:
+        if not isinstance(value, dict) or len(value) != 1:
+            return False
+        ((value_type, raw),) = value.items()
+        if value_type not in KEY_ATTRIBUTE_TYPES or not isinstance(raw, str):
+            return False
+        return bool(raw) if value_type == "S" else _is_number(raw)
+    if isinstance(value, str):
+        return bool(value)
+    return isinstance(value, (int, Decimal)) and not isinstance(value, bool)
+
+
+def decode_next_token(
+    token: Optional[str], key_attributes: Sequence[str], wire_format: bool = False
+) -> Optional[Dict[str, Any]]:
+    """Recupera el ExclusiveStartKey a partir del token recibido
+
+    Un token que decodifica pero no tiene la forma de la llave esperada se rechaza
+    aquí: si llega a DynamoDB termina en un ValidationException y un 500.
+    """
+    if not token:
+        return None
+    try:
+        start_key = json.loads(
+            base64.urlsafe_b64decode(token.encode("ascii")), parse_float=Decimal
+        )
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidPageRequest("next_token inválido")
+    if (
+        not isinstance(start_key, dict)
+        or set(start_key) != set(key_attributes)
+        or not all(_is_key_value(value, wire_format) for value in start_key.values())
+    ):
+        raise InvalidPageRequest("next_token inválido")
+    return start_key
+
+
+def parse_limit(value: Optional[str]) -> Optional[int]:
+    """Valida el parámetro limit; None deja que DynamoDB pagine por 1 MB"""
+    if value in (None, ""):
+        return None
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise InvalidPageRequest("limit debe ser un entero")
+    if limit < 1:
+        raise InvalidPageRequest("limit debe ser mayor a 0")
+    return min(limit, MAX_PAGE_LIMIT)
+
+
+def page_kwargs(
+    query_params: Dict[str, Any],
+    key_attributes: Sequence[str],
+    wire_format: bool = False,
+) -> Dict[str, Any]:
+    """Argumentos Limit/ExclusiveStartKey para un Query o Scan paginado
+
+    key_attributes son los atributos del LastEvaluatedKey: la llave de la tabla
+    y, en un Query sobre un GSI, también la del índice.
+    """
+    kwargs = {}
+    limit = parse_limit(query_params.get("limit"))
+    if limit is not None:
+        kwargs["Limit"] = limit
+    start_key = decode_next_token(
+        query_params.get("next_token"), key_attributes, wire_format
+    )
+    if start_key is not None:
+        kwargs["ExclusiveStartKey"] = start_key
+    return kwargs
@@ -0,0 +1,100 @@
+import json
+import logging
+import os
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional, Union
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+
+# Fracción de invocaciones que emiten también los mensajes debug (eventos, features,
+# SHAP); el resto no los formatea. 0 los apaga, 1 los emite siempre
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get("LOG_DEBUG_SAMPLE_RATE", "0.01"))
+
+# Un logger por función; fuera de Lambda (benchmarks, pruebas) el del fraud detector
+LOGGER_NAME = os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "fraud_detector")
+
+Message = Union[str, Callable[[], str]]
+
+_invocation = {"request_id": None, "sampled": False}
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro, con los campos extra en el primer nivel"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if _invocation["request_id"]:
+            entry["request_id"] = _invocation["request_id"]
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, separators=(",", ":"))
+
+
+def configure_logging(level_name: str = None) -> logging.Logger:
+    """Formato JSON en los handlers del root; reutiliza el handler del runtime de Lambda"""
+    level_name = (level_name or LOG_LEVEL).upper()
+
+    root = logging.getLogger()
+    if not root.handlers:
+        root.addHandler(logging.StreamHandler())
+    for handler in root.handlers:
+        handler.setFormatter(JsonFormatter())
+    root.setLevel(level_name)
+
+    return logging.getLogger(LOGGER_NAME)
+
+
+def begin_invocation(request_id: Optional[str] = None) -> bool:
+    """Decide una vez por invocación si se emiten los mensajes debug muestreados"""
+    _invocation["request_id"] = request_id
+    _invocation["sampled"] = random.random() < LOG_DEBUG_SAMPLE_RATE
+    return _invocation["sampled"]
+
+
+def log_message(
+    message: Message,
+    level: str = "info",
+    logger: Optional[logging.Logger] = None,
+    exc_info: bool = False,
+    **fields: Any,
+) -> None:
+    """Registro estructurado; message y fields pueden ser callables que sólo se
+    evalúan si el mensaje se emite"""
+    logger = logger or logging.getLogger(LOGGER_NAME)
+    levelno = logging.getLevelName(level.upper())
+    if not isinstance(levelno, int):
+        levelno = logging.INFO
+
+    if not logger.isEnabledFor(levelno):
+        # Los debug de una invocación muestreada pasan aunque el nivel sea INFO
+        if levelno != logging.DEBUG or not _invocation["sampled"]:
+            return
+
+    if callable(message):
+        message = message()
+    record = logger.makeRecord(
+        logger.name,
+        levelno,
+        "(unknown file)",
+        0,
+        message,
+        None,
+        sys.exc_info() if exc_info else None,
+        extra={
+            "fields": {
+                key: value() if callable(value) else value
+                for key, value in fields.items()
+            }
+        },
+    )
+    logger.handle(record)
@@ -0,0 +1,28 @@
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any
+from uuid import uuid4
+
+MEXICO_TZ = timezone(timedelta(hours=-6))
+
+
+def now_mexico() -> str:
+    return datetime.now(MEXICO_TZ).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def build_transaction_item(body: Dict[str, Any], now: str) -> Dict[str, Any]:
+    """Item de la tabla de transacciones a partir del body recibido por la API"""
+    return {
+        "transaction_id": body.get("transaction_id") or str(uuid4()),
+        "movement_type": body.get("movement_type"),
+        "tx_type": body.get("tx_type"),
+        "client_account_id": body.get("client_account_id"),
+        "counterparty_account_id": body.get("counterparty_account_id"),
+        "amount": body.get("amount"),
+        "created_at": body.get("created_at") or now,
+        "updated_at": now,
+        "risk_score": body.get("risk_score"),
+        "explanation": body.get("explanation"),
+        "status": body.get("status", "STARTED"),
+        "last_status_at": body.get("last_status_at") or now,
+        "risk_prediction": body.get("risk_prediction", False),
+    }
@@ -0,0 +1,14 @@
+"""Rutas del repo para los benchmarks; importarlo agrega el detector y el layer común a sys.path"""
+
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+LAMBDAS_DIR = os.path.join(ROOT, "assets", "backend", "lambdas")
+DETECTOR_DIR = os.path.join(LAMBDAS_DIR, "fraud_detector_docker")
+# Módulos compartidos que en la imagen Docker se copian desde el layer común
+COMMON_LAYER_DIR = os.path.join(ROOT, "assets", "backend", "layers", "common", "python")
+
+for path in (COMMON_LAYER_DIR, DETECTOR_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,83 @@
+"""Overhead of shadow challengers on predict_risk.
+
+Loads the shipped model as champion and N copies of it as challengers that share
+its feature encoder, then times predict_risk (SHAP disabled) with 0 and N
+challengers. The extra cost per challenger is compared with a bare
+tree-evaluation call on the same matrix, which is the floor the shared transform
+should reach.
+
+    python benchmarks/bench_challengers.py --challengers 3 --batch-sizes 1 10 100
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+
+import _paths  # noqa: F401
+from bench_shap_explanation import build_features
+from inference import TransactionRiskPredictor
+
+
+def best_time(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--challengers", type=int, default=3)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        champion = TransactionRiskPredictor(shap_threshold=1.1, backend="numpy")
+        champion.load_model()
+        challengers = []
+        for idx in range(args.challengers):
+            challenger = TransactionRiskPredictor(backend="numpy")
+            challenger.load_model()
+            # Misma versión que el campeón: se renombra para que no se descarte
+            challenger.model_version = f"challenger-{idx}"
+            challengers.append(challenger)
+
+    rng = np.random.default_rng(args.seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        rows = champion._feature_rows(build_features(rng, 1000).to_dict("records"))
+    transactions = [
+        {**row, "transaction_id": f"tx-{idx}"} for idx, row in enumerate(rows)
+    ]
+
+    print(
+        f"{'batch':>6} {'champion':>10} {f'+{args.challengers} challengers':>17} "
+        f"{'per challenger':>15} {'tree eval':>10}   (µs/call)"
+    )
+    for batch_size in args.batch_sizes:
+        batch = transactions[:batch_size]
+        X = champion._transform(rows[:batch_size])
+        with contextlib.redirect_stdout(io.StringIO()):
+            champion.set_challengers([])
+            alone = best_time(lambda: champion.predict_risk(batch), args.repeat)
+            champion.set_challengers(challengers)
+            assert all(shares for _, shares in champion.challengers)
+            shadowed = best_time(lambda: champion.predict_risk(batch), args.repeat)
+        tree_eval = best_time(
+            lambda: challengers[0]._predict_proba(X, batch_size), args.repeat
+        )
+        per_challenger = (shadowed - alone) / max(1, args.challengers)
+        print(
+            f"{batch_size:>6} {alone * 1e6:>10.1f} {shadowed * 1e6:>17.1f} "
+            f"{per_challenger * 1e6:>15.1f} {tree_eval * 1e6:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
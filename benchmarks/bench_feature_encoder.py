@@ -0,0 +1,107 @@
+"""Parity and latency of the compiled feature encoder vs pandas + feature_transformer.
+
+Builds CompiledFeatureEncoder from the shipped ColumnTransformer and checks, on random
+transactions, that it writes exactly the float32 matrix the model would receive from
+feature_transformer.transform, that unknown categories fail the same way, and that
+predict_risk returns the same scores with and without it. Then times both paths per
+batch size.
+
+    python benchmarks/bench_feature_encoder.py --batch-sizes 1 10 100 1000
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+import _paths  # noqa: F401
+from bench_shap_explanation import build_features
+from feature_encoder import CompiledFeatureEncoder
+from inference import TransactionRiskPredictor
+
+
+def check_parity(predictor: TransactionRiskPredictor, rows: list) -> None:
+    encoder = predictor.feature_encoder
+    transformer = predictor.feature_transformer
+
+    expected = np.asarray(transformer.transform(pd.DataFrame(rows)), dtype=np.float32)
+    actual = encoder.transform(rows)
+    np.testing.assert_array_equal(actual, expected)
+    assert encoder.feature_names_out == list(transformer.get_feature_names_out())
+
+    # Valores por defecto de _feature_rows: categorías desconocidas para el modelo
+    unknown = predictor._feature_rows([{"amount": 10}])
+    for transform in (
+        lambda: transformer.transform(pd.DataFrame(unknown)),
+        lambda: encoder.transform(unknown),
+    ):
+        try:
+            transform()
+        except ValueError:
+            continue
+        raise AssertionError("Se esperaba ValueError por categoría desconocida")
+
+    transactions = [
+        {**row, "transaction_id": f"tx-{idx}"} for idx, row in enumerate(rows[:200])
+    ]
+    with contextlib.redirect_stdout(io.StringIO()):
+        compiled = predictor.predict_risk(transactions)
+        predictor.feature_encoder = None
+        reference = predictor.predict_risk(transactions)
+        predictor.feature_encoder = encoder
+    for left, right in zip(compiled, reference):
+        assert left["risk_probability"] == right["risk_probability"]
+        assert left["shap_explanation"] == right["shap_explanation"]
+
+
+def best_time(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000]
+    )
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    predictor = TransactionRiskPredictor(
+        shap_threshold=0.0, backend="xgboost", use_artifacts=False
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictor.load_model()
+    assert isinstance(predictor.feature_encoder, CompiledFeatureEncoder)
+
+    rng = np.random.default_rng(args.seed)
+    rows = predictor._feature_rows(build_features(rng, 5000).to_dict("records"))
+    check_parity(predictor, rows)
+    print(f"parity: identical float32 matrix on {len(rows):,} rows\n")
+
+    print(f"{'batch':>6} {'pandas+sklearn':>15} {'compiled':>10} {'speedup':>8}   (µs)")
+    for batch_size in args.batch_sizes:
+        batch = rows[:batch_size]
+        reference = best_time(
+            lambda: predictor.feature_transformer.transform(pd.DataFrame(batch)),
+            args.repeat,
+        )
+        compiled = best_time(
+            lambda: predictor.feature_encoder.transform(batch), args.repeat
+        )
+        print(
+            f"{batch_size:>6} {reference * 1e6:>15.1f} {compiled * 1e6:>10.1f} "
+            f"{reference / compiled:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
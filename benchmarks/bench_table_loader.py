@@ -0,0 +1,226 @@
+"""Cold-start benchmark: serial scan vs parallel segmented scan of the fraud detector tables.
+
+Uses an in-process DynamoDB stand-in that serves wire-format Scan pages
+(honouring Limit, ExclusiveStartKey, Segment and TotalSegments) and sleeps
+--latency-ms per page to emulate the network round trip, which is what
+dominates the load in AWS. moto works too but its own per-page CPU cost
+swamps the effect being measured.
+
+    python benchmarks/bench_table_loader.py --rows 50000 --segments 4 --latency-ms 40
+"""
+
+import argparse
+import os
+import time
+import uuid
+import zlib
+from decimal import Decimal
+
+import _paths  # noqa: F401
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+import polars as pl  # noqa: E402
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer  # noqa: E402
+
+import main as fraud_main  # noqa: E402
+
+TABLES = {
+    "TRANSACTIONS_TABLE_NAME": "transaction_id",
+    "CLIENTS_TABLE_NAME": "client_id",
+    "COUNTERPARTIES_TABLE_NAME": "counterparty_id",
+    "CLIENT_TX_STATE_TABLE_NAME": "client_tx_state_id",
+    "CLIENT_RECENT_ACTIVITY_TABLE_NAME": "client_recent_activity_id",
+}
+
+# Conversiones que aplica cada load_*_data de main.py
+CONVERSIONS = {
+    "TRANSACTIONS_TABLE_NAME": (["amount", "risk_score"], []),
+    "CLIENTS_TABLE_NAME": ([], ["risk_level"]),
+    "COUNTERPARTIES_TABLE_NAME": ([], ["risk_level"]),
+    "CLIENT_TX_STATE_TABLE_NAME": (
+        ["tx_sum", "tx_square_sum", "avg_tx_amount", "std_tx_amount"],
+        ["tx_count"],
+    ),
+    "CLIENT_RECENT_ACTIVITY_TABLE_NAME": (
+        [],
+        ["tx_count", "unique_counterparties_count"],
+    ),
+}
+
+
+def build_item(env_name: str, idx: int) -> dict:
+    account_id = f"ACC{idx % 5000:06d}"
+    if env_name == "TRANSACTIONS_TABLE_NAME":
+        return {
+            "transaction_id": str(uuid.uuid4()),
+            "client_account_id": account_id,
+            "counterparty_account_id": f"CP{idx % 3000:06d}",
+            "movement_type": "OUT",
+            "tx_type": "SPEI",
+            "amount": Decimal(str(round(idx * 1.37, 2))),
+            "risk_score": Decimal("0"),
+            "status": "ANALYZED",
+            "created_at": "2025-06-15 17:22:27",
+        }
+    if env_name == "CLIENTS_TABLE_NAME":
+        return {
+            "client_id": str(uuid.uuid4()),
+            "account_id": account_id,
+            "risk_level": idx % 5 + 1,
+            "country": "Mexico",
+            "created_at": "2025-06-15 17:22:27",
+        }
+    if env_name == "COUNTERPARTIES_TABLE_NAME":
+        return {
+            "counterparty_id": str(uuid.uuid4()),
+            "account_id": f"CP{idx:06d}",
+            "risk_level": idx % 5 + 1,
+            "country": "Canada",
+        }
+    if env_name == "CLIENT_TX_STATE_TABLE_NAME":
+        return {
+            "client_tx_state_id": str(uuid.uuid4()),
+            "client_account_id": account_id,
+            "tx_count": idx % 50,
+            "tx_sum": Decimal("1000.5"),
+            "tx_square_sum": Decimal("50000.25"),
+            "avg_tx_amount": Decimal("100.05"),
+            "std_tx_amount": Decimal("12.5"),
+            "last_tx_timestamp": "2025-06-15 17:22:27",
+        }
+    return {
+        "client_recent_activity_id": str(uuid.uuid4()),
+        "client_account_id": account_id,
+        "bucket_timestamp": "2025-06-15T17:00:00.000000",
+        "tx_count": idx % 7,
+        "unique_counterparties_count": 2,
+        "unique_counterparties": "CP000001,CP000002",
+    }
+
+
+class LocalDynamoDB:
+    """Stand-in mínimo del cliente low-level de DynamoDB para Scan"""
+
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000
+        self.tables = {}
+        self._segments = {}
+
+    def create_table(self, table_name: str, key: str, items: list) -> None:
+        serializer = TypeSerializer()
+        wire_items = [
+            {name: serializer.serialize(value) for name, value in item.items()}
+            for item in items
+        ]
+        self.tables[table_name] = (key, wire_items)
+
+    def scan(
+        self,
+        TableName,
+        Limit=1000,
+        ExclusiveStartKey=None,
+        Segment=0,
+        TotalSegments=1,
+    ):
+        time.sleep(self.latency)
+        key, items = self.tables[TableName]
+        # Igual que DynamoDB: cada segmento cubre un rango del hash de la llave
+        cache_key = (TableName, Segment, TotalSegments)
+        if cache_key not in self._segments:
+            self._segments[cache_key] = [
+                item
+                for item in items
+                if zlib.crc32(item[key]["S"].encode()) % TotalSegments == Segment
+            ]
+        segment_items = self._segments[cache_key]
+        start = 0
+        if ExclusiveStartKey is not None:
+            start = (
+                next(
+                    idx
+                    for idx, item in enumerate(segment_items)
+                    if item[key] == ExclusiveStartKey[key]
+                )
+                + 1
+            )
+        page = segment_items[start : start + Limit]
+        response = {"Items": page, "Count": len(page)}
+        if start + Limit < len(segment_items):
+            response["LastEvaluatedKey"] = {key: page[-1][key]}
+        return response
+
+
+def serial_load_all_tables(local_dynamodb: LocalDynamoDB) -> None:
+    """Baseline: el loader serial original (scan paginado + lista de dicts)"""
+    deserializer = TypeDeserializer()
+    for env_name in TABLES:
+        table_name = os.environ[env_name]
+        response = local_dynamodb.scan(TableName=table_name, Limit=1000)
+        items = list(response["Items"])
+        while "LastEvaluatedKey" in response:
+            response = local_dynamodb.scan(
+                TableName=table_name,
+                ExclusiveStartKey=response["LastEvaluatedKey"],
+                Limit=1000,
+            )
+            items.extend(response["Items"])
+
+        # boto3.resource deserializa cada atributo a Decimal/str antes de devolverlo
+        items = [
+            {name: deserializer.deserialize(value) for name, value in item.items()}
+            for item in items
+        ]
+        decimal_to_float, decimal_to_int = CONVERSIONS[env_name]
+        for item in items:
+            for field in decimal_to_float:
+                if field in item:
+                    item[field] = float(item[field])
+            for field in decimal_to_int:
+                if field in item:
+                    item[field] = int(item[field])
+        pl.DataFrame(items)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000, help="rows per table")
+    parser.add_argument("--segments", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    local_dynamodb = LocalDynamoDB(args.latency_ms)
+    for env_name in TABLES:
+        table_name = env_name.lower()
+        os.environ[env_name] = table_name
+        local_dynamodb.create_table(
+            table_name,
+            TABLES[env_name],
+            [build_item(env_name, idx) for idx in range(args.rows)],
+        )
+    fraud_main._dynamodb_client = local_dynamodb
+    fraud_main.DYNAMODB_SCAN_SEGMENTS = args.segments
+
+    results = {}
+    for name, loader in [
+        ("serial", lambda: serial_load_all_tables(local_dynamodb)),
+        (f"parallel x{args.segments}", fraud_main.load_all_tables),
+    ]:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            loader()
+            timings.append(time.perf_counter() - start)
+        results[name] = min(timings)
+
+    print(
+        f"\n{args.rows:,} rows/table, {args.latency_ms} ms/page, best of {args.repeat}"
+    )
+    baseline = results["serial"]
+    for name, seconds in results.items():
+        print(f"{name:>14}: {seconds:8.3f} s  ({baseline / seconds:5.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Latency of XGBClassifier.predict_proba vs the flat NumPy tree engine.
+
+Exports the shipped booster with FlatTreeEnsemble.from_booster, checks that both
+backends agree on random transactions (including missing values) and reports p50/p99
+latency of the probability call for a single row and for larger batches. The
+transform step is excluded so only the tree evaluation is compared.
+
+    python benchmarks/bench_tree_engine.py --batch-sizes 1 10 100 1000 --iterations 2000
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+
+import _paths  # noqa: F401
+from bench_shap_explanation import build_features
+from inference import TransactionRiskPredictor
+from tree_engine import FlatTreeEnsemble
+
+
+def percentiles(fn, iterations: int):
+    timings = np.empty(iterations)
+    for idx in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings[idx] = time.perf_counter() - start
+    return np.percentile(timings, 50) * 1e6, np.percentile(timings, 99) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000]
+    )
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    predictor = TransactionRiskPredictor(backend="xgboost", use_artifacts=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictor.load_model()
+    engine = FlatTreeEnsemble.from_booster(predictor.model.get_booster())
+    rng = np.random.default_rng(args.seed)
+
+    X = predictor.feature_transformer.transform(build_features(rng, 20000))
+    X_missing = X.copy()
+    X_missing.iloc[::13, 3] = np.nan
+    X_missing.iloc[::29, 9] = np.nan
+    for frame in (X, X_missing):
+        expected = predictor.model.predict_proba(frame)
+        actual = engine.predict_proba(frame)
+        max_diff = float(np.abs(expected - actual).max())
+        assert max_diff < 1e-5, f"Diferencia máxima {max_diff}"
+        assert ((expected[:, 1] > 0.5) == (actual[:, 1] > 0.5)).all()
+    print(
+        f"parity: max |Δp| = {max_diff:.2e} on {len(X):,} rows, "
+        f"{engine.roots.size} trees, depth {engine.max_depth}\n"
+    )
+
+    print(
+        f"{'batch':>6} {'xgboost p50':>12} {'p99':>10} {'numpy p50':>12} "
+        f"{'p99':>10} {'p50 speedup':>12}   (µs/call)"
+    )
+    for batch_size in args.batch_sizes:
+        batch = X.iloc[:batch_size]
+        iterations = max(20, args.iterations // max(1, batch_size // 10))
+        xgb_p50, xgb_p99 = percentiles(
+            lambda: predictor.model.predict_proba(batch), iterations
+        )
+        np_p50, np_p99 = percentiles(lambda: engine.predict_proba(batch), iterations)
+        print(
+            f"{batch_size:>6} {xgb_p50:>12.1f} {xgb_p99:>10.1f} {np_p50:>12.1f} "
+            f"{np_p99:>10.1f} {xgb_p50 / np_p50:>11.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+"""End-to-end local load test of the fraud scoring pipeline.
+
+Runs the real handlers in-process against moto: post_transaction writes to the
+transactions table, stream_processor consumes the table's stream and enqueues,
+the fraud detector (lambda_function.handler) scores from the input queue and
+transaction_updater broadcasts from the output queue to fake WebSocket
+connections. Feature tables are seeded with synthetic_data before the run.
+
+Stages run one after another, so each one is measured in isolation. For each
+stage it reports throughput and p50/p95/p99 per invocation. It also reports the
+spans the handlers emit through instrumentation (feature_lookup, predict, shap,
+...). The first fraud detector invocation is reported apart as the cold start.
+
+Run it at several table sizes to see how get_dynamic_features scales:
+
+    python benchmarks/load_test.py --clients 1000 --counterparties 500 --buckets 12 --transactions 300
+    python benchmarks/load_test.py --clients 20000 --counterparties 5000 --buckets 12 --transactions 300
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from _paths import LAMBDAS_DIR
+
+
+TABLES = {
+    "TRANSACTIONS_TABLE_NAME": ("transactions", "transaction_id"),
+    "CLIENTS_TABLE_NAME": ("clients", "client_id"),
+    "COUNTERPARTIES_TABLE_NAME": ("counterparties", "counterparty_id"),
+    "CLIENT_TX_STATE_TABLE_NAME": ("client_tx_state", "client_tx_state_id"),
+    "CLIENT_RECENT_ACTIVITY_TABLE_NAME": (
+        "client_recent_activity",
+        "client_recent_activity_id",
+    ),
+    "CONNECTIONS_TABLE_NAME": ("connections", "connectionId"),
+}
+
+PERCENTILES = [50, 95, 99]
+
+
+class FakeApiGateway:
+    """post_to_connection sin red; cuenta los mensajes entregados"""
+
+    class exceptions:
+        class GoneException(Exception):
+            pass
+
+    def __init__(self):
+        self.posts = 0
+
+    def post_to_connection(self, ConnectionId, Data):
+        self.posts += 1
+
+
+class StageStats:
+    def __init__(self):
+        self.invocations = []
+        self.records = 0
+        self.failures = 0
+        self.spans = defaultdict(list)
+
+    def add_span_document(self, document: dict) -> None:
+        """Expande los Values/Counts de un documento EMF"""
+        for metric in document["_aws"]["CloudWatchMetrics"][0]["Metrics"]:
+            if metric["Unit"] != "Milliseconds":
+                continue
+            values = document[metric["Name"]]
+            self.spans[metric["Name"]].extend(
+                np.repeat(values["Values"], values["Counts"]).tolist()
+            )
+
+
+def load_handler(name: str, path: str):
+    """Carga un index.py con nombre propio: todas las Lambdas usan el mismo módulo"""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def create_resources(args) -> dict:
+    import boto3
+
+    dynamodb = boto3.client("dynamodb")
+    for env_name, (table_name, key) in TABLES.items():
+        kwargs = {}
+        if env_name != "CONNECTIONS_TABLE_NAME":
+            kwargs["StreamSpecification"] = {
+                "StreamEnabled": True,
+                "StreamViewType": "NEW_AND_OLD_IMAGES",
+            }
+        dynamodb.create_table(
+            TableName=table_name,
+            KeySchema=[{"AttributeName": key, "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": key, "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+            **kwargs,
+        )
+        os.environ[env_name] = table_name
+
+    sqs = boto3.client("sqs")
+    for env_name, queue_name in [
+        ("SQS_QUEUE_URL", "input.fifo"),
+        ("OUTPUT_QUEUE_URL", "output.fifo"),
+    ]:
+        os.environ[env_name] = sqs.create_queue(
+            QueueName=queue_name, Attributes={"FifoQueue": "true"}
+        )["QueueUrl"]
+    return {"dynamodb": dynamodb, "sqs": sqs}
+
+
+def seed_tables(args) -> dict:
+    import boto3
+    from synthetic_data import TABLES as SYNTHETIC_TABLES
+    from synthetic_data import SyntheticData, write_dynamodb
+
+    data = SyntheticData(args.clients, args.counterparties, seed=args.seed)
+    resource = boto3.resource("dynamodb")
+    rows = {}
+    for name, frames in data.tables(args.buckets).items():
+        env_name = SYNTHETIC_TABLES[name]
+        rows[name] = write_dynamodb(frames, resource.Table(os.environ[env_name]))
+        print(f"  {TABLES[env_name][0]:<24} {rows[name]:>10,} items")
+
+    with resource.Table(os.environ["CONNECTIONS_TABLE_NAME"]).batch_writer() as batch:
+        for idx in range(args.connections):
+            batch.put_item(Item={"connectionId": f"conn-{idx}"})
+
+    return {"rows": rows, "bodies": data.transaction_bodies(args.transactions)}
+
+
+def timed(stats: StageStats, handler, event) -> dict:
+    start = time.perf_counter()
+    response = handler(event, None)
+    stats.invocations.append(time.perf_counter() - start)
+    return response
+
+
+def receive_batch(sqs, queue_url: str) -> list:
+    messages = sqs.receive_message(
+        QueueUrl=queue_url,
+        MaxNumberOfMessages=10,
+        AttributeNames=["ApproximateReceiveCount"],
+    ).get("Messages", [])
+    return [
+        {
+            "messageId": message["MessageId"],
+            "receiptHandle": message["ReceiptHandle"],
+            "body": message["Body"],
+            "attributes": message.get("Attributes", {}),
+        }
+        for message in messages
+    ]
+
+
+def drain_queue(
+    sqs, queue_url: str, handler, stats: StageStats, cold: StageStats = None
+):
+    """Entrega la cola en batches de 10 como el event source mapping FIFO; la
+    primera invocación va a cold si se indica"""
+    while True:
+        records = receive_batch(sqs, queue_url)
+        if not records:
+            return
+        target = cold if cold is not None and not cold.invocations else stats
+        response = timed(target, handler, {"Records": records})
+        failed = {item["itemIdentifier"] for item in response["batchItemFailures"]}
+        target.records += len(records)
+        target.failures += len(failed)
+        done = [record for record in records if record["messageId"] not in failed]
+        if done:
+            sqs.delete_message_batch(
+                QueueUrl=queue_url,
+                Entries=[
+                    {"Id": str(idx), "ReceiptHandle": record["receiptHandle"]}
+                    for idx, record in enumerate(done)
+                ],
+            )
+        if failed:
+            # Sin visibility timeout real, un reintento volvería de inmediato
+            print(
+                f"  {len(failed)} registros fallidos en {handler.__module__}",
+                file=sys.stderr,
+            )
+            sqs.delete_message_batch(
+                QueueUrl=queue_url,
+                Entries=[
+                    {"Id": str(idx), "ReceiptHandle": record["receiptHandle"]}
+                    for idx, record in enumerate(records)
+                    if record["messageId"] in failed
+                ],
+            )
+
+
+def read_stream(table_name: str, batch_size: int):
+    """Registros del stream de la tabla en batches, como el DynamoEventSource"""
+    import boto3
+
+    streams = boto3.client("dynamodbstreams")
+    stream_arn = boto3.client("dynamodb").describe_table(TableName=table_name)["Table"][
+        "LatestStreamArn"
+    ]
+    shards = streams.describe_stream(StreamArn=stream_arn)["StreamDescription"][
+        "Shards"
+    ]
+    for shard in shards:
+        iterator = streams.get_shard_iterator(
+            StreamArn=stream_arn,
+            ShardId=shard["ShardId"],
+            ShardIteratorType="TRIM_HORIZON",
+        )["ShardIterator"]
+        while iterator:
+            response = streams.get_records(ShardIterator=iterator, Limit=batch_size)
+            records = [
+                record
+                for record in response["Records"]
+                if record["eventName"] == "INSERT"
+            ]
+            if not records:
+                break
+            yield records
+            iterator = response.get("NextShardIterator")
+
+
+def percentiles_ms(seconds: list) -> list:
+    if not seconds:
+        return [float("nan")] * len(PERCENTILES)
+    return [value * 1000 for value in np.percentile(seconds, PERCENTILES)]
+
+
+def report(stages: dict) -> None:
+    print(
+        f"\n{'stage':<22} {'calls':>6} {'records':>8} {'fail':>5} {'wall s':>8} "
+        f"{'rec/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    )
+    for name, stats in stages.items():
+        wall = sum(stats.invocations)
+        p50, p95, p99 = percentiles_ms(stats.invocations)
+        throughput = stats.records / wall if wall else float("nan")
+        print(
+            f"{name:<22} {len(stats.invocations):>6} {stats.records:>8} "
+            f"{stats.failures:>5} {wall:>8.2f} {throughput:>9.1f} "
+            f"{p50:>9.2f} {p95:>9.2f} {p99:>9.2f}"
+        )
+
+    print(f"\n{'span':<36} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, stats in stages.items():
+        for span, values in sorted(stats.spans.items()):
+            if span.endswith("_lag"):
+                continue
+            p50, p95, p99 = np.percentile(values, PERCENTILES)
+            print(
+                f"{name + '.' + span:<36} {len(values):>6} "
+                f"{p50:>9.3f} {p95:>9.3f} {p99:>9.3f}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--counterparties", type=int, default=500)
+    parser.add_argument(
+        "--buckets", type=int, default=12, help="mean buckets per client"
+    )
+    parser.add_argument("--transactions", type=int, default=300)
+    parser.add_argument("--connections", type=int, default=5)
+    parser.add_argument("--stream-batch-size", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ.update(
+        AWS_DEFAULT_REGION="us-east-1",
+        AWS_ACCESS_KEY_ID="testing",
+        AWS_SECRET_ACCESS_KEY="testing",
+        WEBSOCKET_ENDPOINT="https://localhost",
+        LOG_LEVEL=os.environ.get("LOG_LEVEL", "WARNING"),
+        LOG_DEBUG_SAMPLE_RATE="0",
+    )
+
+    from moto import mock_aws
+
+    with mock_aws():
+        resources = create_resources(args)
+        print("Seeding tables...")
+        seeded = seed_tables(args)
+
+        post_transaction = load_handler(
+            "post_transaction_index",
+            os.path.join(LAMBDAS_DIR, "post_transaction", "index.py"),
+        )
+        stream_processor = load_handler(
+            "stream_processor_index",
+            os.path.join(LAMBDAS_DIR, "stream_processor", "index.py"),
+        )
+        transaction_updater = load_handler(
+            "transaction_updater_index",
+            os.path.join(LAMBDAS_DIR, "transaction_updater", "index.py"),
+        )
+        import instrumentation
+        import lambda_function
+
+        api = FakeApiGateway()
+        stream_processor.broadcaster.apigateway = api
+        transaction_updater.broadcaster.apigateway = api
+
+        stages = {
+            name: StageStats()
+            for name in [
+                "post_transaction",
+                "stream_processor",
+                "fraud_detector (cold)",
+                "fraud_detector",
+                "transaction_updater",
+            ]
+        }
+        cold = stages["fraud_detector (cold)"]
+
+        # Los spans de cada invocación se atribuyen a la etapa en curso
+        current = {"stage": None}
+
+        def emit(line: str) -> None:
+            stage = current["stage"]
+            if stage == "fraud_detector" and len(cold.invocations) == 0:
+                stage = "fraud_detector (cold)"
+            stages[stage].add_span_document(json.loads(line))
+
+        instrumentation.metrics.emit = emit
+
+        # Los prints de los handlers no son parte de la medición
+        devnull = open(os.devnull, "w")
+        stdout = sys.stdout
+        sys.stdout = devnull
+        try:
+            current["stage"] = "post_transaction"
+            stats = stages["post_transaction"]
+            for body in seeded["bodies"]:
+                response = timed(
+                    stats, post_transaction.handler, {"body": json.dumps(body)}
+                )
+                stats.records += 1
+                stats.failures += int(response["statusCode"] != 200)
+
+            current["stage"] = "stream_processor"
+            stats = stages["stream_processor"]
+            for records in read_stream(
+                os.environ["TRANSACTIONS_TABLE_NAME"], args.stream_batch_size
+            ):
+                response = timed(stats, stream_processor.handler, {"Records": records})
+                stats.records += len(records)
+                stats.failures += len(response["batchItemFailures"])
+
+            # La primera invocación carga tablas y modelo; se reporta aparte
+            current["stage"] = "fraud_detector"
+            drain_queue(
+                resources["sqs"],
+                os.environ["SQS_QUEUE_URL"],
+                lambda_function.handler,
+                stages["fraud_detector"],
+                cold=cold,
+            )
+
+            current["stage"] = "transaction_updater"
+            drain_queue(
+                resources["sqs"],
+                os.environ["OUTPUT_QUEUE_URL"],
+                transaction_updater.handler,
+                stages["transaction_updater"],
+            )
+        finally:
+            sys.stdout = stdout
+            devnull.close()
+
+    print(
+        f"\n{args.clients:,} clients, {args.counterparties:,} counterparties, "
+        f"{seeded['rows']['client_recent_activity']:,} activity buckets, "
+        f"{args.transactions:,} transactions, {api.posts:,} WebSocket posts"
+    )
+    report(stages)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Cold start of the fraud detector: pickles vs native model artifacts.
+
+Each mode runs in a fresh interpreter so nothing is cached between measurements.
+For each one it reports the time to import inference, load the model, score the
+first transaction (no SHAP) and build the first explanation, and which heavy
+modules are already imported before the explanation. Then it prints the slowest
+modules from `python -X importtime` for the native path.
+
+Native artifacts must exist first:
+
+    python assets/backend/lambdas/fraud_detector_docker/build_artifacts.py
+    python benchmarks/profile_cold_start.py --top 15
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from _paths import COMMON_LAYER_DIR, DETECTOR_DIR
+
+HEAVY_MODULES = ["pandas", "sklearn", "xgboost", "shap", "joblib", "scipy"]
+
+SAMPLE_TRANSACTION = {
+    "transaction_id": "cold-start",
+    "movement_type": "OUT",
+    "tx_type": "SPEI",
+    "amount": 2500.0,
+    "client_risk_level": 0.3,
+    "mean_amount": 1800.0,
+    "std_amount": 400.0,
+    "client_geo_risk": 0.2,
+    "counterparty_geo_risk": 0.4,
+    "tx_count_1h": 2,
+    "unique_cp_1d": 1,
+    "day_part": "night",
+}
+
+
+def child(use_artifacts: bool) -> None:
+    """Se ejecuta en un intérprete nuevo e imprime los tiempos como JSON"""
+    import contextlib
+    import io
+
+    timings = {}
+
+    start = time.perf_counter()
+    from inference import TransactionRiskPredictor
+
+    timings["import"] = time.perf_counter() - start
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        predictor = TransactionRiskPredictor(
+            shap_threshold=1.1, backend="numpy", use_artifacts=use_artifacts
+        )
+        predictor.load_model()
+        timings["load_model"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = predictor.predict_risk([SAMPLE_TRANSACTION])
+        timings["first_predict"] = time.perf_counter() - start
+        loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+
+        start = time.perf_counter()
+        predictor.explain([result[0]["model_features"]])
+        timings["first_explanation"] = time.perf_counter() - start
+
+    print(
+        json.dumps(
+            {
+                "timings": timings,
+                "loaded_before_explanation": loaded,
+                "model": type(predictor.model).__name__,
+            }
+        )
+    )
+
+
+def run_child(use_artifacts: bool) -> dict:
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", "native" if use_artifacts else "pickle"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def import_profile(top: int) -> list:
+    """Módulos con mayor tiempo acumulado de import según -X importtime"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import inference"],
+        cwd=DETECTOR_DIR,
+        env={**os.environ, "PYTHONPATH": COMMON_LAYER_DIR},
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:") :].split("|")
+        rows.append((int(cumulative), module.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--child", choices=["native", "pickle"])
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child == "native")
+        return
+
+    print(
+        f"{'mode':>7} {'model':>20} {'import':>8} {'load':>8} {'predict':>8} "
+        f"{'cold total':>11} {'1st SHAP':>9}   (ms)  loaded before SHAP"
+    )
+    for use_artifacts in (False, True):
+        result = run_child(use_artifacts)
+        timings = {key: value * 1e3 for key, value in result["timings"].items()}
+        cold_total = (
+            timings["import"] + timings["load_model"] + timings["first_predict"]
+        )
+        print(
+            f"{'native' if use_artifacts else 'pickle':>7} {result['model']:>20} "
+            f"{timings['import']:>8.1f} {timings['load_model']:>8.1f} "
+            f"{timings['first_predict']:>8.1f} {cold_total:>11.1f} "
+            f"{timings['first_explanation']:>9.1f}   "
+            f"{', '.join(result['loaded_before_explanation']) or '-'}"
+        )
+
+    print(f"\nimport inference, slowest {args.top} modules (cumulative ms):")
+    for cumulative, module in import_profile(args.top):
+        print(f"{cumulative / 1e3:>9.1f}  {module}")
+
+
+if __name__ == "__main__":
+    main()
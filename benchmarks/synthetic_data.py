@@ -0,0 +1,560 @@
+"""Seeded synthetic rows for the fraud detector tables, at scale.
+
+Rows follow the schemas written by post_client, post_counterparty,
+post_client_tx_state, post_client_recent_activity and post_transaction. That
+includes the comma-separated unique_counterparties and the
+%Y-%m-%dT%H:%M:%S.%f bucket timestamps. Generation is vectorized with NumPy and
+Polars and streamed in chunks, so millions of rows never sit in memory at once.
+
+Distributions are skewed on purpose:
+- A Zipf-like activity weight makes a few heavy-hitter clients and counterparties
+  dominate volume.
+- Bucket and transaction times follow a diurnal profile with a few burst windows.
+- A --fraud-rate share of clients behaves like fraud: bursts of activity in the
+  last hour, fan-out to many risky counterparties, and amounts far above their
+  own mean, often at night over SWIFT.
+
+The same seed and chunk size always produce the same rows.
+
+    python benchmarks/synthetic_data.py --clients 1000000 --counterparties 200000 \\
+        --buckets 24 --transactions 2000000 --format parquet --output /tmp/synthetic
+    python benchmarks/synthetic_data.py --clients 50000 --format dynamodb \\
+        --endpoint-url http://localhost:8000 --create-tables
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import polars as pl
+
+MEXICO_TZ = timezone(timedelta(hours=-6))
+# Formatos de chrono (Polars) equivalentes a los de strptime en main.py
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+BUCKET_FORMAT = "%Y-%m-%dT%H:%M:%S%.6f"
+
+BUCKET_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // BUCKET_MINUTES
+
+COUNTRIES = np.array(
+    ["Mexico", "US", "Canada", "Spain", "Brazil", "Germany", "Japan"]
+    + ["Venezuela", "Nigeria", "Russia", "Ukraine", "China"]
+)
+COUNTRY_WEIGHTS = np.array([70, 10, 4, 4, 3, 2, 2, 1, 1, 1, 1, 1], dtype=float)
+# Los países de alto riesgo de main.build_geo_risk_map
+HIGH_RISK_COUNTRIES = np.flatnonzero(
+    np.isin(COUNTRIES, ["Venezuela", "Nigeria", "Russia", "Ukraine", "China"])
+)
+CITIES = np.array(
+    ["CDMX", "Guadalajara", "Monterrey", "Puebla", "Tijuana", "Leon", "Merida"]
+)
+STATES = np.array(["CDMX", "Jalisco", "Nuevo Leon", "Puebla", "Baja California"])
+FIRST_NAMES = np.array(["Ana", "Luis", "Maria", "Jose", "Sofia", "Carlos", "Elena"])
+LAST_NAMES = np.array(["Garcia", "Lopez", "Martinez", "Hernandez", "Perez", "Ruiz"])
+OCUPATIONS = np.array(["Empleado", "Comerciante", "Profesionista", "Estudiante"])
+INDUSTRIES = np.array(["Retail", "Servicios", "Manufactura", "Financiero", "Gobierno"])
+# Categorías que conoce el encoder del modelo
+MOVEMENT_TYPES = np.array(["IN", "OUT"])
+TX_TYPES = np.array(["SPEI", "SWIFT"])
+
+# Perfil diurno: poca actividad de madrugada, picos a mediodía y en la tarde
+HOURLY_WEIGHTS = np.array(
+    [2, 1, 1, 1, 1, 2, 4, 7, 9, 10, 11, 12, 13, 12, 11, 11, 12, 13, 12, 10, 8, 6, 4, 3],
+    dtype=float,
+)
+BURST_WINDOWS = 3
+BURST_FACTOR = 6.0
+
+TABLES = {
+    "clients": "CLIENTS_TABLE_NAME",
+    "counterparties": "COUNTERPARTIES_TABLE_NAME",
+    "client_tx_state": "CLIENT_TX_STATE_TABLE_NAME",
+    "client_recent_activity": "CLIENT_RECENT_ACTIVITY_TABLE_NAME",
+    "transactions": "TRANSACTIONS_TABLE_NAME",
+}
+PRIMARY_KEYS = {
+    "clients": "client_id",
+    "counterparties": "counterparty_id",
+    "client_tx_state": "client_tx_state_id",
+    "client_recent_activity": "client_recent_activity_id",
+    "transactions": "transaction_id",
+}
+TABLE_SEEDS = {name: idx for idx, name in enumerate(TABLES)}
+
+
+def zipf_weights(rng: np.random.Generator, n: int, exponent: float) -> np.ndarray:
+    """Pesos 1/rank^a normalizados, con el rank asignado al azar"""
+    weights = 1.0 / np.arange(1, n + 1, dtype=float) ** exponent
+    return rng.permutation(weights / weights.sum())
+
+
+def uuid4_series(rng: np.random.Generator, n: int) -> pl.Series:
+    """UUID4 en texto sin un objeto uuid por fila"""
+    raw = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    hex_ids = pl.Series(np.frombuffer(raw.tobytes().hex().encode(), dtype="S32"))
+    hex_ids = hex_ids.cast(pl.Binary).cast(pl.Utf8)
+    return pl.select(
+        pl.concat_str(
+            [
+                hex_ids.str.slice(0, 8),
+                hex_ids.str.slice(8, 4),
+                hex_ids.str.slice(12, 4),
+                hex_ids.str.slice(16, 4),
+                hex_ids.str.slice(20, 12),
+            ],
+            separator="-",
+        )
+    ).to_series()
+
+
+def account_ids(prefix: str, idx: np.ndarray) -> pl.Series:
+    return (prefix + pl.Series(idx).cast(pl.Utf8).str.zfill(8)).alias("account_id")
+
+
+def random_letters(rng: np.random.Generator, n: int, width: int) -> np.ndarray:
+    letters = rng.integers(ord("A"), ord("Z") + 1, size=(n, width), dtype=np.uint8)
+    return letters.view(f"S{width}").ravel().astype(str)
+
+
+class SyntheticData:
+    """Generador reproducible por tabla y chunk: misma semilla, mismas filas"""
+
+    def __init__(
+        self,
+        n_clients: int,
+        n_counterparties: int,
+        seed: int = 7,
+        now: Optional[datetime] = None,
+        fraud_rate: float = 0.01,
+        chunk_size: int = 100_000,
+    ):
+        self.n_clients = n_clients
+        self.n_counterparties = n_counterparties
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.now = now or datetime.now(MEXICO_TZ).replace(tzinfo=None)
+        self.now = self.now.replace(microsecond=0)
+
+        # Atributos por entidad que comparten todas las tablas
+        rng = np.random.default_rng([seed, len(TABLES)])
+        self.client_weight = zipf_weights(rng, n_clients, 1.1)
+        self.fraud_client = rng.random(n_clients) < fraud_rate
+        self.client_mean_amount = rng.lognormal(7.5, 1.0, n_clients)
+        self.client_std_ratio = rng.uniform(0.1, 0.6, n_clients)
+        self.client_risk = rng.choice(
+            np.arange(1, 6), size=n_clients, p=[0.35, 0.3, 0.2, 0.1, 0.05]
+        )
+        self.client_risk[self.fraud_client] = rng.integers(
+            3, 6, self.fraud_client.sum()
+        )
+        self.counterparty_weight = zipf_weights(rng, n_counterparties, 1.0)
+        self.counterparty_country = rng.choice(
+            len(COUNTRIES),
+            size=n_counterparties,
+            p=COUNTRY_WEIGHTS / COUNTRY_WEIGHTS.sum(),
+        )
+        self.risky_counterparties = np.flatnonzero(
+            np.isin(self.counterparty_country, HIGH_RISK_COUNTRIES)
+        )
+        if self.risky_counterparties.size == 0:
+            self.risky_counterparties = np.arange(min(10, n_counterparties))
+        self.slot_weights = self._slot_weights(rng)
+
+    def _rng(self, table: str, chunk: int) -> np.random.Generator:
+        return np.random.default_rng([self.seed, TABLE_SEEDS[table], chunk])
+
+    def _chunks(self, table: str, n: int) -> Iterator:
+        for chunk, start in enumerate(range(0, n, self.chunk_size)):
+            yield self._rng(table, chunk), np.arange(
+                start, min(n, start + self.chunk_size)
+            )
+
+    def _slot_weights(self, rng: np.random.Generator) -> np.ndarray:
+        """Probabilidad de cada bucket de 5 min del último día (slot 0 = el más reciente)"""
+        slots = np.arange(SLOTS_PER_DAY)
+        hours = (self.now.hour - (slots * BUCKET_MINUTES) // 60) % 24
+        weights = HOURLY_WEIGHTS[hours].copy()
+        for start in rng.integers(0, SLOTS_PER_DAY - 6, BURST_WINDOWS):
+            weights[start : start + 6] *= BURST_FACTOR
+        return weights / weights.sum()
+
+    def _timestamps(self, minutes_ago: np.ndarray, fmt: str) -> pl.Series:
+        now = np.datetime64(self.now, "us")
+        return pl.Series(now - minutes_ago.astype("timedelta64[m]")).dt.strftime(fmt)
+
+    def _days_ago(self, rng: np.random.Generator, n: int, low: int, high: int):
+        return self._timestamps(
+            rng.integers(low * 1440, high * 1440, n), TIMESTAMP_FORMAT
+        )
+
+    def clients(self) -> Iterator[pl.DataFrame]:
+        for rng, idx in self._chunks("clients", self.n_clients):
+            n = idx.size
+            mean = self.client_mean_amount[idx]
+            volume = rng.gamma(2.0, 2.0, n) * self.client_weight[idx] * self.n_clients
+            created_at = self._days_ago(rng, n, 30, 1500)
+            yield pl.DataFrame(
+                {
+                    "client_id": uuid4_series(rng, n),
+                    "rfc": np.char.add(
+                        random_letters(rng, n, 4),
+                        rng.integers(0, 10**9, n).astype(str),
+                    ),
+                    "ocupation": rng.choice(OCUPATIONS, n),
+                    "risk_level": self.client_risk[idx],
+                    "person_type": rng.choice(["PF", "PM"], n, p=[0.85, 0.15]),
+                    "first_name": rng.choice(FIRST_NAMES, n),
+                    "last_name": rng.choice(LAST_NAMES, n),
+                    "city": rng.choice(CITIES, n),
+                    "state": rng.choice(STATES, n),
+                    "country": COUNTRIES[
+                        rng.choice(
+                            len(COUNTRIES), n, p=COUNTRY_WEIGHTS / COUNTRY_WEIGHTS.sum()
+                        )
+                    ],
+                    "account_id": account_ids("ACC", idx),
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                    "mean_amount_tx": mean.round(2),
+                    "std_amount_tx": (mean * self.client_std_ratio[idx]).round(2),
+                    "mean_volume_per_day_tx": volume.round(2),
+                    "std_volume_per_day_tx": (volume * rng.uniform(0.1, 0.8, n)).round(
+                        2
+                    ),
+                }
+            )
+
+    def counterparties(self) -> Iterator[pl.DataFrame]:
+        for rng, idx in self._chunks("counterparties", self.n_counterparties):
+            n = idx.size
+            country = self.counterparty_country[idx]
+            risky = np.isin(country, HIGH_RISK_COUNTRIES)
+            risk_level = rng.choice(np.arange(1, 6), n, p=[0.3, 0.3, 0.2, 0.15, 0.05])
+            risk_level[risky] = rng.integers(4, 6, risky.sum())
+            created_at = self._days_ago(rng, n, 30, 1500)
+            yield pl.DataFrame(
+                {
+                    "counterparty_id": uuid4_series(rng, n),
+                    "person_type": rng.choice(["PF", "PM"], n, p=[0.6, 0.4]),
+                    "account_id": account_ids("CP", idx),
+                    "country": COUNTRIES[country],
+                    "city": rng.choice(CITIES, n),
+                    "state": rng.choice(STATES, n),
+                    "industry": rng.choice(INDUSTRIES, n),
+                    "risk_level": risk_level,
+                    "is_client": rng.random(n) < 0.1,
+                    "name": np.char.add(
+                        np.char.add(rng.choice(FIRST_NAMES, n), " "),
+                        rng.choice(LAST_NAMES, n),
+                    ),
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                }
+            )
+
+    def client_tx_state(self) -> Iterator[pl.DataFrame]:
+        for rng, idx in self._chunks("client_tx_state", self.n_clients):
+            n = idx.size
+            expected = 200 * self.client_weight[idx] * self.n_clients
+            tx_count = 1 + rng.poisson(expected)
+            mean = self.client_mean_amount[idx] * rng.uniform(0.9, 1.1, n)
+            std = mean * self.client_std_ratio[idx]
+            # Fraude: montos muy dispersos respecto a su propia media
+            std[self.fraud_client[idx]] *= 3
+            now = self._timestamps(np.zeros(n, dtype=np.int64), TIMESTAMP_FORMAT)
+            yield pl.DataFrame(
+                {
+                    "client_tx_state_id": uuid4_series(rng, n),
+                    "client_account_id": account_ids("ACC", idx),
+                    "last_tx_timestamp": self._timestamps(
+                        rng.exponential(600, n).astype(np.int64), TIMESTAMP_FORMAT
+                    ),
+                    "tx_count": tx_count,
+                    "tx_sum": (mean * tx_count).round(2),
+                    "tx_square_sum": ((std**2 + mean**2) * tx_count).round(2),
+                    "avg_tx_amount": mean.round(2),
+                    "std_tx_amount": std.round(2),
+                    "created_at": now,
+                    "updated_at": now,
+                }
+            )
+
+    def client_recent_activity(self, buckets: int) -> Iterator[pl.DataFrame]:
+        """Buckets de 5 min del último día, como los escribe client_state_aggregator"""
+        for rng, idx in self._chunks("client_recent_activity", self.n_clients):
+            expected = buckets * self.client_weight[idx] * self.n_clients
+            n_buckets = np.minimum(rng.poisson(expected), SLOTS_PER_DAY)
+            client = np.repeat(idx, n_buckets)
+            slot = rng.choice(SLOTS_PER_DAY, client.size, p=self.slot_weights)
+            tx_count = 1 + rng.poisson(1 + self.client_weight[client] * self.n_clients)
+            fraud = np.zeros(client.size, dtype=bool)
+
+            # Fraude: ráfaga en la última hora con muchas contrapartes distintas
+            fraud_idx = idx[self.fraud_client[idx]]
+            if fraud_idx.size:
+                burst = rng.integers(6, 13, fraud_idx.size)
+                burst_client = np.repeat(fraud_idx, burst)
+                client = np.concatenate([client, burst_client])
+                slot = np.concatenate([slot, rng.integers(0, 12, burst_client.size)])
+                tx_count = np.concatenate(
+                    [tx_count, 3 + rng.poisson(4, burst_client.size)]
+                )
+                fraud = np.concatenate([fraud, np.ones(burst_client.size, dtype=bool)])
+
+            rows = pl.DataFrame(
+                {"client": client, "slot": slot, "tx_count": tx_count, "fraud": fraud}
+            ).unique(subset=["client", "slot"], keep="last", maintain_order=True)
+            rows = rows.with_row_index("row")
+            n = rows.height
+
+            # Contrapartes por bucket: populares (Zipf) o, en fraude, de alto riesgo
+            tx_count = rows["tx_count"].to_numpy()
+            fraud = rows["fraud"].to_numpy()
+            wanted = np.where(
+                fraud, tx_count, np.minimum(tx_count, 1 + rng.poisson(0.5, n))
+            )
+            row = np.repeat(np.arange(n), wanted)
+            is_fraud = np.repeat(fraud, wanted)
+            counterparty = rng.choice(
+                self.n_counterparties, row.size, p=self.counterparty_weight
+            )
+            counterparty[is_fraud] = rng.choice(
+                self.risky_counterparties, is_fraud.sum()
+            )
+            unique_cps = (
+                pl.DataFrame({"row": row, "cp": account_ids("CP", counterparty)})
+                .unique(maintain_order=True)
+                .group_by("row", maintain_order=True)
+                .agg(
+                    pl.col("cp").str.join(",").alias("unique_counterparties"),
+                    pl.len().cast(pl.Int64).alias("unique_counterparties_count"),
+                )
+            )
+
+            now = self._timestamps(np.zeros(n, dtype=np.int64), TIMESTAMP_FORMAT)
+            floor = self.now.minute % BUCKET_MINUTES
+            minutes_ago = floor + rows["slot"].to_numpy() * BUCKET_MINUTES
+            bucket_now = np.datetime64(self.now.replace(second=0), "us")
+            yield (
+                rows.join(
+                    unique_cps.with_columns(pl.col("row").cast(pl.UInt32)),
+                    on="row",
+                    how="left",
+                ).select(
+                    pl.Series("client_recent_activity_id", uuid4_series(rng, n)),
+                    account_ids("ACC", rows["client"].to_numpy()).alias(
+                        "client_account_id"
+                    ),
+                    pl.Series(
+                        "bucket_timestamp",
+                        bucket_now - minutes_ago.astype("timedelta64[m]"),
+                    ).dt.strftime(BUCKET_FORMAT),
+                    pl.col("tx_count").cast(pl.Int64),
+                    pl.col("unique_counterparties_count"),
+                    pl.col("unique_counterparties"),
+                    pl.Series("created_at", now),
+                    pl.Series("updated_at", now),
+                )
+            )
+
+    def transactions(self, n_transactions: int, labels: bool = False):
+        """Historial de transacciones del último día con el esquema de post_transaction"""
+        for rng, idx in self._chunks("transactions", n_transactions):
+            n = idx.size
+            client = rng.choice(self.n_clients, n, p=self.client_weight)
+            fraud = self.fraud_client[client] & (rng.random(n) < 0.5)
+            mean = self.client_mean_amount[client]
+            amount = rng.normal(mean, mean * self.client_std_ratio[client])
+            amount = np.abs(amount) + 1
+            amount[fraud] = mean[fraud] * rng.uniform(3, 10, fraud.sum())
+            counterparty = rng.choice(
+                self.n_counterparties, n, p=self.counterparty_weight
+            )
+            counterparty[fraud] = rng.choice(self.risky_counterparties, fraud.sum())
+            tx_type = TX_TYPES[(rng.random(n) < 0.1).astype(int)]
+            tx_type[fraud] = "SWIFT"
+            minutes_ago = rng.choice(
+                SLOTS_PER_DAY, n, p=self.slot_weights
+            ) * BUCKET_MINUTES + rng.integers(0, BUCKET_MINUTES, n)
+            # Fraude de madrugada: entre 1 y 5 am hora local
+            night = (self.now.hour - rng.integers(1, 5, fraud.sum())) % 24
+            minutes_ago[fraud] = night * 60 + rng.integers(0, 60, fraud.sum())
+            created_at = self._timestamps(minutes_ago, TIMESTAMP_FORMAT)
+            frame = pl.DataFrame(
+                {
+                    "transaction_id": uuid4_series(rng, n),
+                    "movement_type": rng.choice(MOVEMENT_TYPES, n, p=[0.4, 0.6]),
+                    "tx_type": tx_type,
+                    "client_account_id": account_ids("ACC", client),
+                    "counterparty_account_id": account_ids("CP", counterparty),
+                    "amount": amount.round(2),
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                    "risk_score": pl.Series([None] * n, dtype=pl.Float64),
+                    "explanation": pl.Series([None] * n, dtype=pl.Utf8),
+                    "status": np.full(n, "STARTED"),
+                    "last_status_at": created_at,
+                    "risk_prediction": np.zeros(n, dtype=bool),
+                }
+            )
+            if labels:
+                frame = frame.with_columns(pl.Series("synthetic_fraud", fraud))
+            yield frame
+
+    def transaction_bodies(self, n_transactions: int) -> List[Dict[str, Any]]:
+        """Bodies para POST /transactions; created_at lo pone el handler"""
+        bodies = []
+        for frame in self.transactions(n_transactions):
+            bodies.extend(
+                frame.select(
+                    "movement_type",
+                    "tx_type",
+                    "client_account_id",
+                    "counterparty_account_id",
+                    "amount",
+                ).to_dicts()
+            )
+        return bodies
+
+    def tables(self, buckets: int, n_transactions: int = 0, labels: bool = False):
+        """Nombre de tabla -> iterador de chunks"""
+        tables = {
+            "clients": self.clients(),
+            "counterparties": self.counterparties(),
+            "client_tx_state": self.client_tx_state(),
+            "client_recent_activity": self.client_recent_activity(buckets),
+        }
+        if n_transactions:
+            tables["transactions"] = self.transactions(n_transactions, labels)
+        return tables
+
+
+def to_items(frame: pl.DataFrame) -> List[Dict[str, Any]]:
+    """Filas con los tipos de DynamoDB: float -> Decimal"""
+    floats = [name for name, dtype in frame.schema.items() if dtype == pl.Float64]
+    items = frame.to_dicts()
+    for item in items:
+        for name in floats:
+            if item[name] is not None:
+                item[name] = Decimal(str(item[name]))
+    return items
+
+
+def write_parquet(frames: Iterator[pl.DataFrame], directory: str) -> int:
+    os.makedirs(directory, exist_ok=True)
+    rows = 0
+    for part, frame in enumerate(frames):
+        frame.write_parquet(os.path.join(directory, f"part-{part:05d}.parquet"))
+        rows += frame.height
+    return rows
+
+
+def write_ndjson(frames: Iterator[pl.DataFrame], path: str) -> int:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    rows = 0
+    with open(path, "wb") as output:
+        for frame in frames:
+            frame.write_ndjson(output)
+            rows += frame.height
+    return rows
+
+
+def write_dynamodb(frames: Iterator[pl.DataFrame], table, workers: int = 1) -> int:
+    """batch_writer por hilo; cada chunk se reparte entre los hilos"""
+
+    def write(items: List[Dict[str, Any]]) -> None:
+        with table.batch_writer() as batch:
+            for item in items:
+                batch.put_item(Item=item)
+
+    rows = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for frame in frames:
+            items = to_items(frame)
+            step = -(-len(items) // workers)
+            list(
+                executor.map(
+                    write,
+                    [
+                        items[start : start + step]
+                        for start in range(0, len(items), step)
+                    ],
+                )
+            )
+            rows += len(items)
+    return rows
+
+
+def create_table(client, table_name: str, key: str) -> None:
+    client.create_table(
+        TableName=table_name,
+        KeySchema=[{"AttributeName": key, "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": key, "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+        StreamSpecification={
+            "StreamEnabled": True,
+            "StreamViewType": "NEW_AND_OLD_IMAGES",
+        },
+    )
+    client.get_waiter("table_exists").wait(TableName=table_name)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=100_000)
+    parser.add_argument("--counterparties", type=int, default=20_000)
+    parser.add_argument("--buckets", type=int, default=12, help="buckets per client")
+    parser.add_argument("--transactions", type=int, default=0)
+    parser.add_argument("--fraud-rate", type=float, default=0.01)
+    parser.add_argument("--labels", action="store_true", help="add synthetic_fraud")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument(
+        "--format", choices=["parquet", "ndjson", "dynamodb"], default="parquet"
+    )
+    parser.add_argument("--output", default="synthetic_data")
+    parser.add_argument("--endpoint-url", help="DynamoDB Local, e.g. localhost:8000")
+    parser.add_argument("--create-tables", action="store_true")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    data = SyntheticData(
+        args.clients,
+        args.counterparties,
+        seed=args.seed,
+        fraud_rate=args.fraud_rate,
+        chunk_size=args.chunk_size,
+    )
+    if args.format == "dynamodb":
+        import boto3
+
+        resource = boto3.resource("dynamodb", endpoint_url=args.endpoint_url)
+
+    print(f"{'table':<24} {'rows':>12} {'seconds':>9} {'rows/s':>12}")
+    for name, frames in data.tables(
+        args.buckets, args.transactions, args.labels
+    ).items():
+        start = time.perf_counter()
+        if args.format == "parquet":
+            rows = write_parquet(frames, os.path.join(args.output, name))
+        elif args.format == "ndjson":
+            rows = write_ndjson(frames, os.path.join(args.output, f"{name}.ndjson"))
+        else:
+            # Mismos nombres de tabla que usan las Lambdas
+            table_name = os.environ.get(TABLES[name], name)
+            if args.create_tables:
+                create_table(resource.meta.client, table_name, PRIMARY_KEYS[name])
+            rows = write_dynamodb(frames, resource.Table(table_name), args.workers)
+        seconds = time.perf_counter() - start
+        print(f"{name:<24} {rows:>12,} {seconds:>9.2f} {rows / seconds:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from aws_cdk import (
     Stack,
+    Duration,
     aws_lambda as _lambda,
     aws_lambda_event_sources as lambda_event_sources,
     aws_dynamodb as dynamodb,
@@ -19,35 +20,71 @@ class EventSourceMappingStack(Stack):
         stream_processor_lambda: _lambda.Function,
         fraud_detector_lambda: _lambda.DockerImageFunction,
         transaction_updater_lambda: _lambda.Function,
+        client_state_aggregator_lambda: _lambda.Function,
         transactions_table: dynamodb.TableV2,
         input_queue: sqs.Queue,
         output_queue: sqs.Queue,
+        stream_processor_batch_size: int = 200,
+        fraud_detector_batch_size: int = 10,
+        transaction_updater_batch_size: int = 10,
         **kwargs,
     ) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
         # DynamoDB Stream → Stream Processor Lambda
+        # Sólo INSERT: los MODIFY del resultado y de las explicaciones se descartan
+        # en el event source mapping sin invocar la Lambda
         stream_processor_lambda.add_event_source(
             lambda_event_sources.DynamoEventSource(
                 table=transactions_table,
                 starting_position=_lambda.StartingPosition.LATEST,
-                batch_size=10,
+                # El publish va en lotes de SendMessageBatch: el costo no crece
+                # por registro, así que el batch puede ser grande
+                batch_size=stream_processor_batch_size,
                 retry_attempts=2,
+                report_batch_item_failures=True,
+                bisect_batch_on_error=True,
+                filters=[
+                    _lambda.FilterCriteria.filter(
+                        {"eventName": _lambda.FilterRule.is_equal("INSERT")}
+                    ),
+                ],
+            )
+        )
+
+        # DynamoDB Stream → Client State Aggregator Lambda
+        client_state_aggregator_lambda.add_event_source(
+            lambda_event_sources.DynamoEventSource(
+                table=transactions_table,
+                starting_position=_lambda.StartingPosition.LATEST,
+                batch_size=500,
+                max_batching_window=Duration.seconds(5),
+                retry_attempts=5,
+                report_batch_item_failures=True,
+                filters=[
+                    _lambda.FilterCriteria.filter(
+                        {"eventName": _lambda.FilterRule.is_equal("INSERT")}
+                    ),
+                ],
             )
         )
 
         # SQS Input Queue → Fraud Detector Lambda
+        # Colas FIFO admiten como máximo 10 mensajes por batch
         fraud_detector_lambda.add_event_source(
             lambda_event_sources.SqsEventSource(
                 queue=input_queue,
-                batch_size=1,
+                batch_size=fraud_detector_batch_size,
+                report_batch_item_failures=True,
             )
         )
 
         # SQS Output Queue → Transaction Updater Lambda
+        # También FIFO: hasta 10 resultados por invocación, fallas por mensaje
         transaction_updater_lambda.add_event_source(
             lambda_event_sources.SqsEventSource(
                 queue=output_queue,
-                batch_size=1,
+                batch_size=transaction_updater_batch_size,
+                report_batch_item_failures=True,
             )
         )
@@ -24,6 +24,15 @@ class LambdaStack(Stack):
     ) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
+        # Shared Lambda Layer (pagination, list endpoints)
+        common_layer = _lambda.LayerVersion(
+            self,
+            "ApiCommonLayer",
+            code=_lambda.Code.from_asset("assets/backend/layers/common"),
+            compatible_runtimes=[_lambda.Runtime.PYTHON_3_12],
+            layer_version_name=f"{project_prefix}-api-common-{environment}".lower(),
+        )
+
         # POST Client Lambda
         post_client_lambda = _lambda.Function(
             self,
@@ -49,6 +58,7 @@ class LambdaStack(Stack):
             function_name=f"{project_prefix}-get-clients-{environment}".lower(),
             timeout=Duration.seconds(60),
             memory_size=1024,
+            layers=[common_layer],
             environment={
                 "CLIENTS_TABLE_NAME": clients_table_name,
                 "ENVIRONMENT": environment,
@@ -64,12 +74,35 @@ class LambdaStack(Stack):
             code=_lambda.Code.from_asset("assets/backend/lambdas/post_transaction"),
             function_name=f"{project_prefix}-post-transaction-{environment}".lower(),
             timeout=Duration.seconds(30),
+            layers=[common_layer],
             environment={
                 "TRANSACTIONS_TABLE_NAME": transactions_table_name,
                 "ENVIRONMENT": environment,
             },
         )
 
+        # POST Transactions Batch Lambda
+        post_transactions_batch_lambda = _lambda.Function(
+            self,
+            "PostTransactionsBatchFunction",
+            runtime=_lambda.Runtime.PYTHON_3_12,
+            handler="index.handler",
+            code=_lambda.Code.from_asset(
+                "assets/backend/lambdas/post_transactions_batch"
+            ),
+            function_name=f"{project_prefix}-post-transactions-batch-{environment}".lower(),
+            timeout=Duration.seconds(120),
+            memory_size=1024,
+            layers=[common_layer],
+            environment={
+                "TRANSACTIONS_TABLE_NAME": transactions_table_name,
+                "MAX_BATCH_ITEMS": "5000",
+                "BATCH_WRITE_WORKERS": "4",
+                "LOG_LEVEL": "INFO",
+                "ENVIRONMENT": environment,
+            },
+        )
+
         # GET Transactions Lambda
         get_transactions_lambda = _lambda.Function(
             self,
@@ -80,8 +113,10 @@ class LambdaStack(Stack):
             function_name=f"{project_prefix}-get-transactions-{environment}".lower(),
             timeout=Duration.seconds(60),
             memory_size=1024,
+            layers=[common_layer],
             environment={
                 "TRANSACTIONS_TABLE_NAME": transactions_table_name,
+                "TRANSACTIONS_ACCOUNT_INDEX_NAME": "client_account_id-created_at-index",
                 "ENVIRONMENT": environment,
             },
         )
@@ -108,10 +143,17 @@ class LambdaStack(Stack):
             )
         )
 
+        post_transactions_batch_lambda.add_to_role_policy(
+            iam.PolicyStatement(
+                actions=["dynamodb:BatchWriteItem"],
+                resources=[transactions_table_arn],
+            )
+        )
+
         get_transactions_lambda.add_to_role_policy(
             iam.PolicyStatement(
                 actions=["dynamodb:Scan", "dynamodb:Query"],
-                resources=[transactions_table_arn],
+                resources=[transactions_table_arn, f"{transactions_table_arn}/index/*"],
             )
         )
 
@@ -140,6 +182,7 @@ class LambdaStack(Stack):
             function_name=f"{project_prefix}-get-counterparties-{environment}".lower(),
             timeout=Duration.seconds(60),
             memory_size=1024,
+            layers=[common_layer],
             environment={
                 "COUNTERPARTIES_TABLE_NAME": counterparties_table_name,
                 "ENVIRONMENT": environment,
@@ -184,6 +227,7 @@ class LambdaStack(Stack):
             code=_lambda.Code.from_asset("assets/backend/lambdas/get_clients_tx_state"),
             function_name=f"{project_prefix}-get-clients-tx-state-{environment}".lower(),
             timeout=Duration.seconds(30),
+            layers=[common_layer],
             environment={
                 "TABLE_NAME": clients_tx_state_table_name,
                 "ENVIRONMENT": environment,
@@ -232,6 +276,7 @@ class LambdaStack(Stack):
             ),
             function_name=f"{project_prefix}-get-client-recent-activity-{environment}".lower(),
             timeout=Duration.seconds(30),
+            layers=[common_layer],
             environment={
                 "TABLE_NAME": client_recent_activity_table_name,
                 "ENVIRONMENT": environment,
@@ -255,6 +300,7 @@ class LambdaStack(Stack):
         self.post_client_lambda = post_client_lambda
         self.get_clients_lambda = get_clients_lambda
         self.post_transaction_lambda = post_transaction_lambda
+        self.post_transactions_batch_lambda = post_transactions_batch_lambda
         self.get_transactions_lambda = get_transactions_lambda
         self.post_counterparty_lambda = post_counterparty_lambda
         self.get_counterparties_lambda = get_counterparties_lambda
@@ -7,6 +7,16 @@ from aws_cdk import (
 )
 from constructs import Construct
 
+# La imagen del fraud detector se construye desde assets/backend; sólo entran su
+# carpeta y los módulos del layer que copia, así otros cambios no la reconstruyen
+FRAUD_DETECTOR_IMAGE_EXCLUDE = [
+    "**",
+    "!lambdas/fraud_detector_docker",
+    "!layers/common/python/instrumentation.py",
+    "!layers/common/python/structured_logging.py",
+    "**/__pycache__",
+]
+
 
 class WebSocketLambdaStack(Stack):
     def __init__(
@@ -78,6 +88,15 @@ class WebSocketLambdaStack(Stack):
             timeout=Duration.seconds(30),
         )
 
+        # Shared Lambda Layer (broadcaster)
+        common_layer = _lambda.LayerVersion(
+            self,
+            "CommonLayer",
+            code=_lambda.Code.from_asset("assets/backend/layers/common"),
+            compatible_runtimes=[_lambda.Runtime.PYTHON_3_12],
+            layer_version_name=f"{project_prefix}-common-{environment}".lower(),
+        )
+
         # DynamoDB Stream Processor Lambda
         stream_processor_lambda = _lambda.Function(
             self,
@@ -87,6 +106,7 @@ class WebSocketLambdaStack(Stack):
             code=_lambda.Code.from_asset("assets/backend/lambdas/stream_processor"),
             function_name=f"{project_prefix}-stream-processor-{environment}".lower(),
             timeout=Duration.seconds(60),
+            layers=[common_layer],
             environment={
                 "SQS_QUEUE_URL": input_queue_url,
                 "WEBSOCKET_ENDPOINT": websocket_endpoint,
@@ -97,8 +117,11 @@ class WebSocketLambdaStack(Stack):
         fraud_detector_lambda = _lambda.DockerImageFunction(
             self,
             "FraudDetectorFunction",
+            # Contexto assets/backend: la imagen copia módulos del layer común
             code=_lambda.DockerImageCode.from_image_asset(
-                "assets/backend/lambdas/fraud_detector_docker"
+                "assets/backend",
+                file="lambdas/fraud_detector_docker/Dockerfile",
+                exclude=FRAUD_DETECTOR_IMAGE_EXCLUDE,
             ),
             function_name=f"{project_prefix}-fraud-detector-{environment}".lower(),
             timeout=Duration.seconds(900),
@@ -112,6 +135,33 @@ class WebSocketLambdaStack(Stack):
                 "COUNTERPARTIES_TABLE_NAME": counterparties_table_name,
                 "CLIENT_TX_STATE_TABLE_NAME": clients_tx_state_table_name,
                 "CLIENT_RECENT_ACTIVITY_TABLE_NAME": client_recent_activity_table_name,
+                "DYNAMODB_SCAN_SEGMENTS": "4",
+                "FEATURE_MAX_STALENESS_SECONDS": "60",
+                "SHAP_INLINE_THRESHOLD": "0.5",
+                "INFERENCE_BACKEND": "numpy",
+                "DECISION_CACHE_MAX_ENTRIES": "10000",
+                "DECISION_CACHE_TTL_SECONDS": "900",
+                "LOG_LEVEL": "INFO",
+                "LOG_DEBUG_SAMPLE_RATE": "0.01",
+            },
+        )
+
+        # Explicaciones SHAP bajo demanda, misma imagen con otro handler
+        fraud_explanation_lambda = _lambda.DockerImageFunction(
+            self,
+            "FraudExplanationFunction",
+            code=_lambda.DockerImageCode.from_image_asset(
+                "assets/backend",
+                file="lambdas/fraud_detector_docker/Dockerfile",
+                exclude=FRAUD_DETECTOR_IMAGE_EXCLUDE,
+                cmd=["explanation_function.handler"],
+            ),
+            function_name=f"{project_prefix}-fraud-explanation-{environment}".lower(),
+            timeout=Duration.seconds(60),
+            architecture=_lambda.Architecture.ARM_64,
+            memory_size=2048,
+            environment={
+                "TRANSACTIONS_TABLE_NAME": transactions_table_name,
             },
         )
 
@@ -124,10 +174,33 @@ class WebSocketLambdaStack(Stack):
             code=_lambda.Code.from_asset("assets/backend/lambdas/transaction_updater"),
             function_name=f"{project_prefix}-transaction-updater-{environment}".lower(),
             timeout=Duration.seconds(60),
+            layers=[common_layer],
+            # Sólo notifica: el fraud detector hace la única escritura del resultado
             environment={
-                "TRANSACTIONS_TABLE_NAME": transactions_table_name,
                 "CONNECTIONS_TABLE_NAME": connections_table_name,
                 "WEBSOCKET_ENDPOINT": websocket_endpoint,
+                "LOG_LEVEL": "INFO",
+            },
+        )
+
+        # Client State Aggregator Lambda
+        client_state_aggregator_lambda = _lambda.Function(
+            self,
+            "ClientStateAggregatorFunction",
+            runtime=_lambda.Runtime.PYTHON_3_12,
+            handler="index.handler",
+            code=_lambda.Code.from_asset(
+                "assets/backend/lambdas/client_state_aggregator"
+            ),
+            function_name=f"{project_prefix}-client-state-aggregator-{environment}".lower(),
+            timeout=Duration.seconds(60),
+            layers=[common_layer],
+            environment={
+                "CLIENT_TX_STATE_TABLE_NAME": clients_tx_state_table_name,
+                "CLIENT_TX_STATE_INDEX_NAME": "client_account_id-index",
+                "CLIENT_RECENT_ACTIVITY_TABLE_NAME": client_recent_activity_table_name,
+                "ACTIVITY_BUCKET_MINUTES": "5",
+                "LOG_LEVEL": "INFO",
             },
         )
 
@@ -154,7 +227,11 @@ class WebSocketLambdaStack(Stack):
         )
         stream_processor_lambda.add_to_role_policy(
             iam.PolicyStatement(
-                actions=["dynamodb:Scan", "dynamodb:DeleteItem"],
+                actions=[
+                    "dynamodb:Scan",
+                    "dynamodb:DeleteItem",
+                    "dynamodb:BatchWriteItem",
+                ],
                 resources=[connections_table_arn],
             )
         )
@@ -185,22 +262,71 @@ class WebSocketLambdaStack(Stack):
                 ],
             )
         )
+        # BatchGetItem: decisiones ya guardadas de mensajes reentregados
         fraud_detector_lambda.add_to_role_policy(
             iam.PolicyStatement(
-                actions=["dynamodb:UpdateItem"],
+                actions=["dynamodb:UpdateItem", "dynamodb:BatchGetItem"],
                 resources=[transactions_table_arn],
             )
         )
+        # Refresh incremental de las tablas de features desde sus streams
+        fraud_detector_lambda.add_to_role_policy(
+            iam.PolicyStatement(
+                actions=["dynamodb:DescribeTable"],
+                resources=[
+                    clients_table_arn,
+                    counterparties_table_arn,
+                    clients_tx_state_table_arn,
+                    client_recent_activity_table_arn,
+                ],
+            )
+        )
+        fraud_detector_lambda.add_to_role_policy(
+            iam.PolicyStatement(
+                actions=[
+                    "dynamodb:DescribeStream",
+                    "dynamodb:GetShardIterator",
+                    "dynamodb:GetRecords",
+                ],
+                resources=[
+                    f"{clients_table_arn}/stream/*",
+                    f"{counterparties_table_arn}/stream/*",
+                    f"{clients_tx_state_table_arn}/stream/*",
+                    f"{client_recent_activity_table_arn}/stream/*",
+                ],
+            )
+        )
 
-        transaction_updater_lambda.add_to_role_policy(
+        fraud_explanation_lambda.add_to_role_policy(
             iam.PolicyStatement(
-                actions=["dynamodb:UpdateItem", "dynamodb:GetItem"],
+                actions=["dynamodb:GetItem", "dynamodb:UpdateItem"],
                 resources=[transactions_table_arn],
             )
         )
+
+        client_state_aggregator_lambda.add_to_role_policy(
+            iam.PolicyStatement(
+                actions=["dynamodb:GetItem", "dynamodb:UpdateItem"],
+                resources=[
+                    clients_tx_state_table_arn,
+                    client_recent_activity_table_arn,
+                ],
+            )
+        )
+        client_state_aggregator_lambda.add_to_role_policy(
+            iam.PolicyStatement(
+                actions=["dynamodb:Query"],
+                resources=[f"{clients_tx_state_table_arn}/index/*"],
+            )
+        )
+
         transaction_updater_lambda.add_to_role_policy(
             iam.PolicyStatement(
-                actions=["dynamodb:Scan", "dynamodb:DeleteItem"],
+                actions=[
+                    "dynamodb:Scan",
+                    "dynamodb:DeleteItem",
+                    "dynamodb:BatchWriteItem",
+                ],
                 resources=[connections_table_arn],
             )
         )
@@ -218,4 +344,6 @@ class WebSocketLambdaStack(Stack):
         self.default_lambda = default_lambda
         self.stream_processor_lambda = stream_processor_lambda
         self.fraud_detector_lambda = fraud_detector_lambda
+        self.fraud_explanation_lambda = fraud_explanation_lambda
         self.transaction_updater_lambda = transaction_updater_lambda
+        self.client_state_aggregator_lambda = client_state_aggregator_lambda
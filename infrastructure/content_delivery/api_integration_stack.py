@@ -19,7 +19,9 @@ class ApiIntegrationStack(Stack):
         post_client_lambda: _lambda.Function,
         get_clients_lambda: _lambda.Function,
         post_transaction_lambda: _lambda.Function,
+        post_transactions_batch_lambda: _lambda.Function,
         get_transactions_lambda: _lambda.Function,
+        fraud_explanation_lambda: _lambda.Function,
         post_counterparty_lambda: _lambda.Function,
         get_counterparties_lambda: _lambda.Function,
         post_client_tx_state_lambda: _lambda.Function,
@@ -96,6 +98,28 @@ class ApiIntegrationStack(Stack):
             source_arn=f"arn:aws:execute-api:{self.region}:{self.account}:{http_api_id}/*/*",
         )
 
+        # POST /transactions/batch
+        post_transactions_batch_integration = apigwv2.CfnIntegration(
+            self,
+            "PostTransactionsBatchIntegration",
+            api_id=http_api_id,
+            integration_type="AWS_PROXY",
+            integration_uri=post_transactions_batch_lambda.function_arn,
+            payload_format_version="2.0",
+        )
+        apigwv2.CfnRoute(
+            self,
+            "PostTransactionsBatchRoute",
+            api_id=http_api_id,
+            route_key="POST /transactions/batch",
+            target=f"integrations/{post_transactions_batch_integration.ref}",
+        )
+        post_transactions_batch_lambda.add_permission(
+            "ApiGatewayInvoke",
+            principal=iam.ServicePrincipal("apigateway.amazonaws.com"),
+            source_arn=f"arn:aws:execute-api:{self.region}:{self.account}:{http_api_id}/*/*",
+        )
+
         # GET /transactions
         get_transactions_integration = apigwv2.CfnIntegration(
             self,
@@ -118,6 +142,28 @@ class ApiIntegrationStack(Stack):
             source_arn=f"arn:aws:execute-api:{self.region}:{self.account}:{http_api_id}/*/*",
         )
 
+        # GET /transactions/{transaction_id}/explanation
+        fraud_explanation_integration = apigwv2.CfnIntegration(
+            self,
+            "GetTransactionExplanationIntegration",
+            api_id=http_api_id,
+            integration_type="AWS_PROXY",
+            integration_uri=fraud_explanation_lambda.function_arn,
+            payload_format_version="2.0",
+        )
+        apigwv2.CfnRoute(
+            self,
+            "GetTransactionExplanationRoute",
+            api_id=http_api_id,
+            route_key="GET /transactions/{transaction_id}/explanation",
+            target=f"integrations/{fraud_explanation_integration.ref}",
+        )
+        fraud_explanation_lambda.add_permission(
+            "ApiGatewayInvoke",
+            principal=iam.ServicePrincipal("apigateway.amazonaws.com"),
+            source_arn=f"arn:aws:execute-api:{self.region}:{self.account}:{http_api_id}/*/*",
+        )
+
         # POST /counterparties
         post_counterparty_integration = apigwv2.CfnIntegration(
             self,
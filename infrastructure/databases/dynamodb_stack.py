@@ -36,6 +36,19 @@ class DynamoDBStack(Stack):
             table_name=f"{project_prefix}-transactions-{environment}".lower(),
             deletion_protection=False,
             dynamo_stream=dynamodb.StreamViewType.NEW_AND_OLD_IMAGES,
+            global_secondary_indexes=[
+                dynamodb.GlobalSecondaryIndexPropsV2(
+                    index_name="client_account_id-created_at-index",
+                    partition_key=dynamodb.Attribute(
+                        name="client_account_id",
+                        type=dynamodb.AttributeType.STRING,
+                    ),
+                    sort_key=dynamodb.Attribute(
+                        name="created_at",
+                        type=dynamodb.AttributeType.STRING,
+                    ),
+                )
+            ],
         )
 
         counterparties_table = dynamodb.TableV2(
@@ -60,6 +73,16 @@ class DynamoDBStack(Stack):
             table_name=f"{project_prefix}-clients-tx-state-{environment}".lower(),
             deletion_protection=False,
             dynamo_stream=dynamodb.StreamViewType.NEW_AND_OLD_IMAGES,
+            global_secondary_indexes=[
+                dynamodb.GlobalSecondaryIndexPropsV2(
+                    index_name="client_account_id-index",
+                    partition_key=dynamodb.Attribute(
+                        name="client_account_id",
+                        type=dynamodb.AttributeType.STRING,
+                    ),
+                    projection_type=dynamodb.ProjectionType.KEYS_ONLY,
+                )
+            ],
         )
 
         client_recent_activity_table = dynamodb.TableV2(
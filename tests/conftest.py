@@ -0,0 +1,10 @@
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+LAMBDAS_DIR = os.path.join(ROOT, "assets", "backend", "lambdas")
+DETECTOR_DIR = os.path.join(LAMBDAS_DIR, "fraud_detector_docker")
+# Módulos compartidos que en la imagen Docker se copian desde el layer común
+COMMON_LAYER_DIR = os.path.join(ROOT, "assets", "backend", "layers", "common", "python")
+
+sys.path[:0] = [DETECTOR_DIR, COMMON_LAYER_DIR]
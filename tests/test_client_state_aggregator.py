@@ -0,0 +1,236 @@
+import importlib.util
+import math
+import os
+import random
+import statistics
+
+import pytest
+
+from conftest import LAMBDAS_DIR
+
+boto3 = pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+CREATED_AT = "2025-01-10 12:03:00"
+BUCKET_ID = "acc-1#2025-01-10T12:00:00.000000"
+
+
+@pytest.fixture
+def aggregator(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("CLIENT_TX_STATE_TABLE_NAME", "client-tx-state")
+    monkeypatch.setenv("CLIENT_RECENT_ACTIVITY_TABLE_NAME", "client-recent-activity")
+
+    with moto.mock_aws():
+        dynamodb = boto3.resource("dynamodb")
+        dynamodb.create_table(
+            TableName="client-tx-state",
+            KeySchema=[{"AttributeName": "client_tx_state_id", "KeyType": "HASH"}],
+            AttributeDefinitions=[
+                {"AttributeName": "client_tx_state_id", "AttributeType": "S"},
+                {"AttributeName": "client_account_id", "AttributeType": "S"},
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    "IndexName": "client_account_id-index",
+                    "KeySchema": [
+                        {"AttributeName": "client_account_id", "KeyType": "HASH"}
+                    ],
+                    "Projection": {"ProjectionType": "KEYS_ONLY"},
+                }
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        dynamodb.create_table(
+            TableName="client-recent-activity",
+            KeySchema=[
+                {"AttributeName": "client_recent_activity_id", "KeyType": "HASH"}
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "client_recent_activity_id", "AttributeType": "S"}
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+
+        spec = importlib.util.spec_from_file_location(
+            "client_state_aggregator_index",
+            os.path.join(LAMBDAS_DIR, "client_state_aggregator", "index.py"),
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        yield module
+
+
+def record(transaction_id, sequence_number, amount, counterparty="cp-1"):
+    return {
+        "eventName": "INSERT",
+        "dynamodb": {
+            "SequenceNumber": str(sequence_number),
+            "Keys": {"transaction_id": {"S": transaction_id}},
+            "NewImage": {
+                "transaction_id": {"S": transaction_id},
+                "client_account_id": {"S": "acc-1"},
+                "counterparty_account_id": {"S": counterparty},
+                "amount": {"N": str(amount)},
+                "created_at": {"S": CREATED_AT},
+            },
+        },
+    }
+
+
+def batch(prefix, first_sequence_number, amounts, counterparty="cp-1"):
+    return {
+        "Records": [
+            record(f"{prefix}-{idx}", first_sequence_number + idx, amount, counterparty)
+            for idx, amount in enumerate(amounts)
+        ]
+    }
+
+
+def tx_state(aggregator):
+    return aggregator.tx_state_table.get_item(Key={"client_tx_state_id": "acc-1"}).get(
+        "Item"
+    )
+
+
+def bucket(aggregator):
+    return aggregator.recent_activity_table.get_item(
+        Key={"client_recent_activity_id": BUCKET_ID}
+    ).get("Item")
+
+
+def assert_stats(item, amounts):
+    assert int(item["tx_count"]) == len(amounts)
+    assert math.isclose(
+        float(item["avg_tx_amount"]), statistics.fmean(amounts), rel_tol=1e-12
+    )
+    assert math.isclose(
+        float(item["std_tx_amount"]), statistics.stdev(amounts), rel_tol=1e-9
+    )
+
+
+def test_batches_from_other_shards_count_in_any_order(aggregator):
+    # El segundo shard tiene sequence numbers más bajos y llega después
+    later_shard = batch("b", 900_000, [10, 20, 30])
+    earlier_shard = batch("a", 100, [40, 50], counterparty="cp-2")
+
+    assert aggregator.handler(later_shard, None) == {"batchItemFailures": []}
+    assert aggregator.handler(earlier_shard, None) == {"batchItemFailures": []}
+
+    assert_stats(tx_state(aggregator), [10, 20, 30, 40, 50])
+    activity = bucket(aggregator)
+    assert activity["tx_count"] == 5
+    assert activity["unique_counterparties"] == "cp-1,cp-2"
+    assert activity["unique_counterparties_count"] == 2
+
+
+def test_merged_stats_match_full_recomputation(aggregator):
+    rng = random.Random(11)
+    # Montos grandes con poca varianza: donde sum/square_sum pierde precisión
+    amounts = [1e9 + rng.uniform(0, 100) for _ in range(60)]
+    for start in range(0, len(amounts), 7):
+        aggregator.handler(batch(f"t{start}", start, amounts[start : start + 7]), None)
+
+    assert_stats(tx_state(aggregator), amounts)
+
+
+def test_legacy_state_without_m2_is_merged(aggregator):
+    aggregator.tx_state_table.put_item(
+        Item={
+            "client_tx_state_id": "acc-1",
+            "client_account_id": "acc-1",
+            "tx_count": 2,
+            "tx_sum": 300,
+            "tx_square_sum": 50000,
+            "avg_tx_amount": 150,
+        }
+    )
+    aggregator.handler(batch("new", 1, [400]), None)
+
+    assert_stats(tx_state(aggregator), [100, 200, 400])
+
+
+def test_redelivered_batch_is_not_double_counted(aggregator):
+    first = batch("t", 1, [10, 20, 30])
+    aggregator.handler(first, None)
+    aggregator.handler(first, None)
+    # Reintento desde la mitad del batch con registros nuevos al final
+    retry = {"Records": first["Records"][1:] + batch("u", 4, [60])["Records"]}
+    aggregator.handler(retry, None)
+
+    assert_stats(tx_state(aggregator), [10, 20, 30, 60])
+    assert bucket(aggregator)["tx_count"] == 4
+
+
+def racing_get_item(aggregator, get_item, races):
+    """get_item tras el cual otro batch escribe antes que éste, races veces"""
+    state = {"remaining": races, "inside": False}
+
+    def wrapper(**kwargs):
+        item = get_item(**kwargs)
+        if state["remaining"] and not state["inside"]:
+            state["remaining"] -= 1
+            state["inside"] = True
+            try:
+                other = batch(f"race{state['remaining']}", 500, [70, 80])
+                aggregator.handler(other, None)
+            finally:
+                state["inside"] = False
+        return item
+
+    return wrapper
+
+
+def test_lost_tx_state_race_is_retried(aggregator, monkeypatch):
+    table = aggregator.tx_state_table
+    monkeypatch.setattr(
+        table, "get_item", racing_get_item(aggregator, table.get_item, races=1)
+    )
+    aggregator.handler(batch("t", 1, [10, 20]), None)
+
+    assert_stats(tx_state(aggregator), [10, 20, 70, 80])
+    assert bucket(aggregator)["tx_count"] == 4
+
+
+def test_lost_bucket_race_is_retried(aggregator, monkeypatch):
+    table = aggregator.recent_activity_table
+    monkeypatch.setattr(
+        table, "get_item", racing_get_item(aggregator, table.get_item, races=1)
+    )
+    aggregator.handler(batch("t", 1, [5], counterparty="cp-3"), None)
+
+    activity = bucket(aggregator)
+    assert activity["tx_count"] == 3
+    assert activity["unique_counterparties"] == "cp-1,cp-3"
+    assert activity["applied_tx_ids"] == {"t-0", "race0-0", "race0-1"}
+    assert_stats(tx_state(aggregator), [5, 70, 80])
+
+
+def test_write_race_that_never_settles_fails_the_records(aggregator, monkeypatch):
+    monkeypatch.setattr(aggregator, "MAX_WRITE_ATTEMPTS", 2)
+    table = aggregator.tx_state_table
+    monkeypatch.setattr(
+        table, "get_item", racing_get_item(aggregator, table.get_item, races=2)
+    )
+    response = aggregator.handler(batch("t", 7, [10, 20]), None)
+
+    assert response == {"batchItemFailures": [{"itemIdentifier": "7"}]}
+    # Los dos batches que ganaron la carrera quedaron aplicados una sola vez
+    assert_stats(tx_state(aggregator), [70, 80, 70, 80])
+
+
+def test_applied_ids_are_pruned_by_age_and_size(aggregator, monkeypatch):
+    monkeypatch.setattr(aggregator, "MAX_APPLIED_TX_IDS", 2)
+    applied = {
+        "old": "2025-01-08 12:00:00",
+        "a": "2025-01-10 11:00:00",
+        "b": "2025-01-10 11:30:00",
+        "c": "2025-01-10 11:45:00",
+    }
+
+    assert aggregator.prune_applied(applied, "2025-01-10 12:00:00") == {
+        "c": "2025-01-10 11:45:00",
+        "b": "2025-01-10 11:30:00",
+    }
@@ -0,0 +1,250 @@
+import importlib.util
+import json
+import os
+from decimal import Decimal
+
+import pytest
+
+from conftest import DETECTOR_DIR
+
+boto3 = pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+pytest.importorskip("polars")
+
+import main  # noqa: E402
+from decision_cache import DecisionCache, decision_from_item  # noqa: E402
+
+MODEL_VERSION = "v1"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = DecisionCache(max_entries=10, ttl_seconds=60, clock=clock)
+    cache.put("t1", MODEL_VERSION, {"transaction_id": "t1"})
+
+    clock.now = 59
+    assert cache.get("t1", MODEL_VERSION) == {"transaction_id": "t1"}
+    assert cache.get("t1", "v2") is None
+    clock.now = 60
+    assert cache.get("t1", MODEL_VERSION) is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = DecisionCache(max_entries=2, ttl_seconds=60, clock=FakeClock())
+    cache.put("t1", MODEL_VERSION, {"transaction_id": "t1"})
+    cache.put("t2", MODEL_VERSION, {"transaction_id": "t2"})
+    # Leer t1 lo vuelve el más reciente: sale t2
+    cache.get("t1", MODEL_VERSION)
+    cache.put("t3", MODEL_VERSION, {"transaction_id": "t3"})
+
+    assert cache.get("t2", MODEL_VERSION) is None
+    assert cache.get("t1", MODEL_VERSION) is not None
+    assert cache.get("t3", MODEL_VERSION) is not None
+    assert len(cache) == 2
+
+
+def stored_item(**overrides):
+    item = {
+        "transaction_id": "t1",
+        "status": "ANALYZED",
+        "risk_score": Decimal("0.82"),
+        "risk_prediction": True,
+        "explanation": json.dumps({"amount": 0.4}),
+        "model_features": json.dumps({"amount": 900.0}),
+        "model_version": MODEL_VERSION,
+        "client_account_id": "acc-1",
+        "amount": Decimal("900.5"),
+    }
+    item.update(overrides)
+    return item
+
+
+def test_decision_from_item_rebuilds_the_prediction():
+    assert decision_from_item(stored_item(), MODEL_VERSION) == {
+        "transaction_id": "t1",
+        "risk_probability": 0.82,
+        "risk_prediction": True,
+        "shap_explanation": {"amount": 0.4},
+        "model_features": {"amount": 900.0},
+        "model_version": MODEL_VERSION,
+        "client_account_id": "acc-1",
+        "amount": 900.5,
+    }
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [
+        {"status": "PENDING"},
+        {"model_version": "v0"},
+        {"risk_score": None},
+    ],
+)
+def test_decision_from_item_ignores_other_decisions(overrides):
+    assert decision_from_item(stored_item(**overrides), MODEL_VERSION) is None
+
+
+@pytest.fixture
+def detector(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("TRANSACTIONS_TABLE_NAME", "transactions")
+    # Sin modelo: el predictor del test reemplaza al registry
+    monkeypatch.setattr(main, "MODEL_WARM_UP", False)
+
+    with moto.mock_aws():
+        boto3.resource("dynamodb").create_table(
+            TableName="transactions",
+            KeySchema=[{"AttributeName": "transaction_id", "KeyType": "HASH"}],
+            AttributeDefinitions=[
+                {"AttributeName": "transaction_id", "AttributeType": "S"}
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        queue_url = boto3.client("sqs").create_queue(
+            QueueName="results.fifo", Attributes={"FifoQueue": "true"}
+        )["QueueUrl"]
+        monkeypatch.setenv("OUTPUT_QUEUE_URL", queue_url)
+
+        spec = importlib.util.spec_from_file_location(
+            "fraud_detector_lambda_function",
+            os.path.join(DETECTOR_DIR, "lambda_function.py"),
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        module.predictor = FakePredictor()
+        module.feature_store = FakeFeatureStore()
+        yield module
+
+
+class FakePredictor:
+    model_version = MODEL_VERSION
+
+    def __init__(self):
+        self.scored = []
+
+    def predict_risk(self, transactions):
+        self.scored.extend(t["transaction_id"] for t in transactions)
+        return [
+            {
+                "transaction_id": transaction["transaction_id"],
+                "risk_probability": 0.25,
+                "risk_prediction": False,
+                "shap_explanation": {},
+                "model_features": {},
+                "model_version": MODEL_VERSION,
+            }
+            for transaction in transactions
+        ]
+
+
+class FakeFeatureStore:
+    def get_dynamic_features(self, transaction):
+        return {}
+
+
+def put_transaction(detector, transaction_id, **attributes):
+    detector.transactions_table.put_item(
+        Item={"status": "PENDING", **attributes, "transaction_id": transaction_id}
+    )
+
+
+def sqs_record(transaction_id, receive_count=1):
+    return {
+        "messageId": f"msg-{transaction_id}",
+        "body": json.dumps({"transaction_id": transaction_id, "amount": 10}),
+        "attributes": {"ApproximateReceiveCount": str(receive_count)},
+    }
+
+
+def published(detector):
+    messages = detector.sqs.receive_message(
+        QueueUrl=detector.output_queue_url, MaxNumberOfMessages=10
+    ).get("Messages", [])
+    return sorted(json.loads(message["Body"])["transaction_id"] for message in messages)
+
+
+def count_batch_gets(detector, monkeypatch):
+    calls = []
+    batch_get_item = detector.dynamodb.batch_get_item
+
+    def counting_batch_get_item(**kwargs):
+        calls.append(kwargs)
+        return batch_get_item(**kwargs)
+
+    monkeypatch.setattr(detector.dynamodb, "batch_get_item", counting_batch_get_item)
+    return calls
+
+
+def test_cached_decision_skips_scoring_on_first_delivery(detector, monkeypatch):
+    put_transaction(detector, "t2")
+    detector.decision_cache.put(
+        "t1", MODEL_VERSION, decision_from_item(stored_item(), MODEL_VERSION)
+    )
+    batch_gets = count_batch_gets(detector, monkeypatch)
+
+    failures = detector.process_records([sqs_record("t1"), sqs_record("t2")])
+
+    assert failures == []
+    assert detector.predictor.scored == ["t2"]
+    assert batch_gets == []
+    assert published(detector) == ["t1", "t2"]
+
+
+def test_redelivery_outside_the_cache_reads_the_stored_decision(detector, monkeypatch):
+    item = stored_item()
+    put_transaction(detector, item.pop("transaction_id"), **item)
+    put_transaction(detector, "t2")
+    batch_gets = count_batch_gets(detector, monkeypatch)
+
+    failures = detector.process_records(
+        [sqs_record("t1", receive_count=2), sqs_record("t2")]
+    )
+
+    assert failures == []
+    assert detector.predictor.scored == ["t2"]
+    assert len(batch_gets) == 1
+    assert detector.decision_cache.get("t1", MODEL_VERSION)["risk_probability"] == 0.82
+
+
+def prediction(risk_probability):
+    return {
+        "transaction_id": "t1",
+        "risk_probability": risk_probability,
+        "risk_prediction": risk_probability > 0.5,
+        "shap_explanation": {},
+        "model_features": {"amount": 900.0},
+        "model_version": MODEL_VERSION,
+    }
+
+
+def test_commit_decision_keeps_the_stored_decision(detector):
+    put_transaction(detector, "t1", client_account_id="acc-1", amount=Decimal("900"))
+
+    assert detector.commit_decision(prediction(0.9)) == prediction(0.9)
+    # Otro intento con un score distinto no sobrescribe y publica lo guardado
+    stored = detector.commit_decision(prediction(0.1))
+
+    assert stored["risk_probability"] == 0.9
+    assert stored["client_account_id"] == "acc-1"
+    item = detector.transactions_table.get_item(Key={"transaction_id": "t1"})["Item"]
+    assert item["risk_score"] == Decimal("0.9")
+
+
+def test_commit_decision_rejects_unknown_transactions(detector):
+    with pytest.raises(ValueError, match="desconocida"):
+        detector.commit_decision(prediction(0.9))
+
+    assert "Item" not in detector.transactions_table.get_item(
+        Key={"transaction_id": "t1"}
+    )
@@ -0,0 +1,105 @@
+import glob
+import json
+import os
+
+import numpy as np
+import pytest
+
+from conftest import DETECTOR_DIR
+from feature_encoder import CompiledFeatureEncoder
+
+joblib = pytest.importorskip("joblib")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("sklearn")
+
+NUMERICAL = [
+    "amount",
+    "client_risk_level",
+    "mean_amount",
+    "std_amount",
+    "client_geo_risk",
+    "counterparty_geo_risk",
+    "tx_count_1h",
+    "unique_cp_1d",
+]
+
+
+@pytest.fixture(scope="module")
+def transformer():
+    paths = sorted(
+        glob.glob(os.path.join(DETECTOR_DIR, "feature_transformer_balanced_*.pkl"))
+    )
+    return joblib.load(paths[-1])
+
+
+@pytest.fixture(scope="module", params=["from_transformer", "from_spec"])
+def encoder(request, transformer):
+    encoder = CompiledFeatureEncoder.from_transformer(transformer)
+    if request.param == "from_spec":
+        # Mismo camino que model_artifacts: spec en JSON, sin sklearn
+        encoder = CompiledFeatureEncoder.from_spec(
+            json.loads(json.dumps(encoder.to_spec()))
+        )
+    return encoder
+
+
+def random_rows(transformer, size, seed=7):
+    rng = np.random.default_rng(seed)
+    categories = dict(
+        zip(
+            transformer.transformers_[0][1].feature_names_in_,
+            transformer.transformers_[0][1].categories_,
+        )
+    )
+    rows = []
+    for _ in range(size):
+        row = {column: rng.choice(values) for column, values in categories.items()}
+        row.update(
+            amount=float(rng.lognormal(7, 2)), tx_count_1h=int(rng.integers(0, 50))
+        )
+        for column in NUMERICAL[1:6] + ["unique_cp_1d"]:
+            row[column] = float(rng.normal(0, 1000))
+        rows.append(row)
+    return rows
+
+
+def sklearn_transform(transformer, rows):
+    return np.asarray(transformer.transform(pd.DataFrame(rows)), dtype=np.float32)
+
+
+def test_matches_sklearn_transform(transformer, encoder):
+    rows = random_rows(transformer, 500)
+
+    np.testing.assert_array_equal(
+        encoder.transform(rows), sklearn_transform(transformer, rows)
+    )
+    assert encoder.feature_names_out == list(transformer.get_feature_names_out())
+
+
+def test_null_numerical_inputs_match_sklearn(transformer, encoder):
+    rows = random_rows(transformer, 20)
+    for idx, row in enumerate(rows):
+        row[NUMERICAL[idx % len(NUMERICAL)]] = None
+    rows[-1].update({column: None for column in NUMERICAL})
+
+    actual = encoder.transform(rows)
+
+    # NaN en las mismas posiciones: assert_array_equal los considera iguales
+    np.testing.assert_array_equal(actual, sklearn_transform(transformer, rows))
+    assert np.isnan(actual[-1]).sum() == len(NUMERICAL)
+
+
+@pytest.mark.parametrize(
+    "column, value",
+    [("tx_type", "CASH"), ("day_part", "midnight"), ("movement_type", None)],
+)
+def test_unseen_category_raises_like_sklearn(transformer, encoder, column, value):
+    rows = random_rows(transformer, 3)
+    rows[1][column] = value
+
+    with pytest.raises(ValueError) as expected:
+        sklearn_transform(transformer, rows)
+    with pytest.raises(ValueError) as actual:
+        encoder.transform(rows)
+
+    assert str(actual.value) == str(expected.value)
@@ -0,0 +1,192 @@
+from decimal import Decimal
+
+import pytest
+
+pl = pytest.importorskip("polars")
+boto3 = pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+import main  # noqa: E402
+import stream_refresher  # noqa: E402
+from feature_store import FeatureStore  # noqa: E402
+from stream_refresher import FeatureRefresher  # noqa: E402
+
+BUCKET = "2025-06-15T17:20:00.000000"
+
+
+@pytest.fixture
+def dynamodb(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    # El cliente compartido se crea dentro del mock
+    monkeypatch.setattr(main, "_dynamodb_client", None)
+
+    with moto.mock_aws():
+        resource = boto3.resource("dynamodb")
+        for name, spec in main.FEATURE_TABLES.items():
+            monkeypatch.setenv(spec["env"], name)
+            resource.create_table(
+                TableName=name,
+                KeySchema=[{"AttributeName": spec["primary_key"], "KeyType": "HASH"}],
+                AttributeDefinitions=[
+                    {"AttributeName": spec["primary_key"], "AttributeType": "S"}
+                ],
+                BillingMode="PAY_PER_REQUEST",
+                StreamSpecification={
+                    "StreamEnabled": True,
+                    "StreamViewType": "NEW_AND_OLD_IMAGES",
+                },
+            )
+        yield resource
+
+
+def client(idx, risk_level):
+    return {
+        "client_id": f"client-{idx}",
+        "account_id": f"acc-{idx}",
+        "risk_level": risk_level,
+        "country": "Mexico",
+        "created_at": "2025-01-01 00:00:00",
+    }
+
+
+def tx_state(idx, avg):
+    return {
+        "client_tx_state_id": f"acc-{idx}",
+        "client_account_id": f"acc-{idx}",
+        "tx_count": 3,
+        "avg_tx_amount": str(avg),
+        "std_tx_amount": "12.5",
+        "last_tx_timestamp": "2025-06-15 17:00:00",
+        "applied_tx_ids": {f"t-{idx}-{n}": "2025-06-15 17:00:00" for n in range(3)},
+    }
+
+
+def activity(idx, account, tx_count, bucket=BUCKET):
+    return {
+        "client_recent_activity_id": f"acc-{account}#{idx}",
+        "client_account_id": f"acc-{account}",
+        "bucket_timestamp": bucket,
+        "tx_count": tx_count,
+        "unique_counterparties": "cp-1,cp-2",
+        "unique_counterparties_count": 2,
+        "applied_tx_ids": {"t-1", "t-2"},
+    }
+
+
+def put_items(dynamodb, name, items):
+    table = dynamodb.Table(name)
+    for item in items:
+        # Los floats de DynamoDB van como Decimal; los strings numéricos se convierten
+        table.put_item(
+            Item={
+                key: Decimal(value) if key.endswith("_amount") else value
+                for key, value in item.items()
+            }
+        )
+
+
+def full_load() -> dict:
+    return {
+        name: main.select_snapshot_columns(name, main.load_feature_table(name))
+        for name in main.FEATURE_TABLES
+    }
+
+
+def comparable(name, df):
+    primary_key = main.FEATURE_TABLES[name]["primary_key"]
+    return main.select_snapshot_columns(name, df).sort(primary_key)
+
+
+def store_for(frames):
+    return FeatureStore(
+        frames["clients"],
+        frames["counterparties"],
+        frames["client_tx_state"],
+        frames["client_recent_activity"],
+    )
+
+
+def test_snapshot_replays_only_changes_after_the_build(dynamodb, tmp_path, monkeypatch):
+    put_items(dynamodb, "clients", [client(idx, 2) for idx in range(5)])
+    put_items(
+        dynamodb,
+        "counterparties",
+        [
+            {
+                "counterparty_id": f"cp-{idx}",
+                "account_id": f"cp-{idx}",
+                "country": "Canada",
+            }
+            for idx in range(3)
+        ],
+    )
+    put_items(
+        dynamodb, "client_tx_state", [tx_state(idx, 100 + idx) for idx in range(5)]
+    )
+    put_items(
+        dynamodb,
+        "client_recent_activity",
+        [activity(idx, idx % 3, idx) for idx in range(6)],
+    )
+
+    manifest = main.build_feature_snapshot(str(tmp_path))
+    built = full_load()
+
+    # Cada stream quedó posicionado en su último registro
+    for name in main.FEATURE_TABLES:
+        shards = manifest["streams"][name]["shards"]
+        assert len(shards) == 1 and all(shards.values())
+
+    # Cambios posteriores al build
+    put_items(dynamodb, "clients", [client(1, 5), client(9, 4)])
+    dynamodb.Table("counterparties").delete_item(Key={"counterparty_id": "cp-0"})
+    put_items(dynamodb, "client_tx_state", [tx_state(2, 999)])
+    put_items(
+        dynamodb,
+        "client_recent_activity",
+        [activity(6, 1, 7, bucket="2025-06-15T17:25:00.000000")],
+    )
+
+    snapshot = main.load_feature_snapshot(str(tmp_path))
+    assert snapshot is not None
+    frames, loaded_manifest = snapshot
+    assert loaded_manifest == manifest
+    for name, df in frames.items():
+        assert comparable(name, df).equals(comparable(name, built[name]))
+
+    replayed = {}
+    coalesce_changes = stream_refresher.coalesce_changes
+
+    def counting_coalesce_changes(name, records):
+        replayed[name] = len(records)
+        return coalesce_changes(name, records)
+
+    monkeypatch.setattr(stream_refresher, "coalesce_changes", counting_coalesce_changes)
+    refresher = FeatureRefresher()
+    refresher.start(manifest["streams"])
+    store = store_for(frames)
+    frames = refresher.replay(frames, store)
+
+    assert replayed == {
+        "clients": 2,
+        "counterparties": 1,
+        "client_tx_state": 1,
+        "client_recent_activity": 1,
+    }
+    expected = full_load()
+    for name, df in frames.items():
+        assert comparable(name, df).equals(comparable(name, expected[name])), name
+
+    expected_store = store_for(expected)
+    for idx in range(10):
+        transaction = {
+            "client_account_id": f"acc-{idx}",
+            "counterparty_account_id": f"cp-{idx % 3}",
+            "amount": 250.0,
+            "timestamp": "2025-06-15 17:40:00",
+        }
+        assert store.get_dynamic_features(
+            transaction
+        ) == expected_store.get_dynamic_features(transaction)
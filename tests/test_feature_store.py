@@ -0,0 +1,212 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+pl = pytest.importorskip("polars")
+
+import main  # noqa: E402
+from feature_store import FeatureStore  # noqa: E402
+
+NOW = datetime(2025, 6, 15, 17, 22, 27)
+ACCOUNTS = [f"acc-{idx}" for idx in range(30)]
+COUNTERPARTY_ACCOUNTS = [f"cp-{idx}" for idx in range(15)]
+COUNTRIES = ["Mexico", "Canada", "Venezuela", "Brazil", "Atlantis", None]
+# Nulos, vacíos, espacios y comas sobrantes
+COUNTERPARTY_STRINGS = [None, "", ",", "a,b", " a , ,c", "b,,", "c", "d , e"]
+
+
+def build_frames(rng: random.Random) -> dict:
+    clients = [
+        {
+            "client_id": f"client-{idx}",
+            "account_id": account,
+            "risk_level": rng.choice([None, 1, 2, 3, 4, 5]),
+            "country": rng.choice(COUNTRIES),
+        }
+        for idx, account in enumerate(ACCOUNTS[:25])
+    ]
+    # Cuenta duplicada: ambos caminos caen en los valores por defecto
+    clients.append({**clients[3], "client_id": "client-dup"})
+
+    counterparties = [
+        {
+            "counterparty_id": f"counterparty-{idx}",
+            "account_id": account,
+            "country": rng.choice(COUNTRIES),
+        }
+        for idx, account in enumerate(COUNTERPARTY_ACCOUNTS[:12])
+    ]
+
+    tx_state = [
+        {
+            "client_tx_state_id": f"state-{idx}",
+            "client_account_id": account,
+            "avg_tx_amount": rng.choice([None, rng.uniform(10, 5000)]),
+            "std_tx_amount": rng.choice([None, rng.uniform(0, 800)]),
+        }
+        for idx, account in enumerate(ACCOUNTS[:20])
+    ]
+
+    activity = []
+    for account in ACCOUNTS[:25]:
+        for _ in range(rng.randint(0, 30)):
+            bucket = NOW + timedelta(minutes=5 * rng.randint(-600, 150))
+            activity.append(
+                {
+                    "client_recent_activity_id": f"{account}#{len(activity)}",
+                    "client_account_id": account,
+                    "bucket_timestamp": None if rng.random() < 0.05 else bucket,
+                    "tx_count": None if rng.random() < 0.1 else rng.randint(0, 9),
+                    "unique_counterparties": rng.choice(COUNTERPARTY_STRINGS),
+                }
+            )
+
+    return {
+        "clients": pl.DataFrame(
+            clients,
+            schema={**dict.fromkeys(clients[0], pl.Utf8), "risk_level": pl.Int64},
+        ),
+        "counterparties": pl.DataFrame(counterparties),
+        "client_tx_state": pl.DataFrame(
+            tx_state,
+            schema={
+                "client_tx_state_id": pl.Utf8,
+                "client_account_id": pl.Utf8,
+                "avg_tx_amount": pl.Float64,
+                "std_tx_amount": pl.Float64,
+            },
+        ),
+        "client_recent_activity": activity_frame(activity),
+    }
+
+
+def activity_frame(rows: list) -> pl.DataFrame:
+    return pl.DataFrame(
+        rows,
+        schema={
+            "client_recent_activity_id": pl.Utf8,
+            "client_account_id": pl.Utf8,
+            "bucket_timestamp": pl.Datetime("us"),
+            "tx_count": pl.Int64,
+            "unique_counterparties": pl.Utf8,
+        },
+    )
+
+
+def random_transaction(rng: random.Random) -> dict:
+    transaction = {
+        "client_account_id": rng.choice(ACCOUNTS + ["unknown"]),
+        "counterparty_account_id": rng.choice(COUNTERPARTY_ACCOUNTS),
+        # También en el futuro respecto a los buckets
+        "timestamp": (NOW + timedelta(minutes=rng.randint(-3000, 900))).strftime(
+            "%Y-%m-%d %H:%M:%S"
+        ),
+    }
+    if rng.random() < 0.8:
+        transaction["amount"] = round(rng.uniform(1, 10000), 2)
+    return transaction
+
+
+def dataframe_features(frames: dict, transaction: dict) -> dict:
+    return main.get_dynamic_features(
+        transaction,
+        frames["client_tx_state"],
+        frames["client_recent_activity"],
+        frames["clients"],
+        frames["counterparties"],
+    )
+
+
+def store_for(frames: dict) -> FeatureStore:
+    return FeatureStore(
+        frames["clients"],
+        frames["counterparties"],
+        frames["client_tx_state"],
+        frames["client_recent_activity"],
+    )
+
+
+def assert_same_features(store: FeatureStore, frames: dict, transactions: list):
+    for transaction in transactions:
+        assert store.get_dynamic_features(transaction) == dataframe_features(
+            frames, transaction
+        ), transaction
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_matches_dataframe_path(seed):
+    rng = random.Random(seed)
+    frames = build_frames(rng)
+    transactions = [random_transaction(rng) for _ in range(200)]
+    # Duplicado, sin contraparte y timestamp inválido: valores por defecto
+    transactions += [
+        {**transactions[0], "client_account_id": ACCOUNTS[3]},
+        {"client_account_id": ACCOUNTS[0], "timestamp": NOW.isoformat()},
+        {
+            "client_account_id": ACCOUNTS[0],
+            "counterparty_account_id": COUNTERPARTY_ACCOUNTS[0],
+            "timestamp": "mañana",
+        },
+    ]
+
+    assert_same_features(store_for(frames), frames, transactions)
+
+
+def test_missing_tables_use_defaults():
+    frames = build_frames(random.Random(3))
+    store = FeatureStore(frames["clients"], frames["counterparties"], None, None)
+    transaction = random_transaction(random.Random(4))
+
+    assert store.get_dynamic_features(transaction) == main.build_default_features(
+        transaction
+    )
+
+
+def test_upsert_and_remove_match_rebuilt_frames():
+    rng = random.Random(5)
+    frames = build_frames(rng)
+    store = store_for(frames)
+
+    activity = frames["client_recent_activity"]
+    changed = activity.sample(20, seed=5).with_columns(
+        pl.col("tx_count").fill_null(0) + 5,
+        pl.lit("z,y").alias("unique_counterparties"),
+    )
+    added = activity_frame(
+        [
+            {
+                "client_recent_activity_id": f"new-{idx}",
+                "client_account_id": rng.choice(ACCOUNTS),
+                "bucket_timestamp": NOW - timedelta(minutes=5 * idx),
+                "tx_count": idx,
+                "unique_counterparties": "n",
+            }
+            for idx in range(10)
+        ]
+    )
+    upserted = pl.concat([changed, added])
+    removed_activity = activity.head(15)["client_recent_activity_id"].to_list()
+    removed_clients = ["client-0", "client-4"]
+
+    store.upsert("client_recent_activity", upserted)
+    store.remove("client_recent_activity", removed_activity)
+    store.remove("clients", removed_clients)
+
+    upserted_ids = upserted["client_recent_activity_id"].to_list()
+    frames["client_recent_activity"] = pl.concat(
+        [
+            activity.filter(~pl.col("client_recent_activity_id").is_in(upserted_ids)),
+            upserted,
+        ]
+    ).filter(~pl.col("client_recent_activity_id").is_in(removed_activity))
+    frames["clients"] = frames["clients"].filter(
+        ~pl.col("client_id").is_in(removed_clients)
+    )
+
+    transactions = [random_transaction(rng) for _ in range(200)]
+    transactions += [
+        {**random_transaction(rng), "client_account_id": account}
+        for account in ACCOUNTS
+    ]
+    assert_same_features(store, frames, transactions)
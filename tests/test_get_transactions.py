@@ -0,0 +1,148 @@
+import importlib.util
+import json
+import os
+from decimal import Decimal
+
+import pytest
+
+from conftest import LAMBDAS_DIR
+
+boto3 = pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+from pagination import encode_next_token  # noqa: E402
+
+INDEX_NAME = "client_account_id-created_at-index"
+
+
+@pytest.fixture
+def endpoint(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("TRANSACTIONS_TABLE_NAME", "transactions")
+
+    with moto.mock_aws():
+        table = boto3.resource("dynamodb").create_table(
+            TableName="transactions",
+            KeySchema=[{"AttributeName": "transaction_id", "KeyType": "HASH"}],
+            AttributeDefinitions=[
+                {"AttributeName": "transaction_id", "AttributeType": "S"},
+                {"AttributeName": "client_account_id", "AttributeType": "S"},
+                {"AttributeName": "created_at", "AttributeType": "S"},
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    "IndexName": INDEX_NAME,
+                    "KeySchema": [
+                        {"AttributeName": "client_account_id", "KeyType": "HASH"},
+                        {"AttributeName": "created_at", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                }
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        for idx in range(12):
+            table.put_item(
+                Item={
+                    "transaction_id": f"t-{idx:02d}",
+                    "client_account_id": f"acc-{idx % 2}",
+                    "created_at": f"2025-06-15 17:{idx:02d}:00",
+                    "amount": Decimal("10.5"),
+                }
+            )
+
+        spec = importlib.util.spec_from_file_location(
+            "get_transactions_index",
+            os.path.join(LAMBDAS_DIR, "get_transactions", "index.py"),
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        yield module
+
+
+def get(endpoint, **query_params):
+    response = endpoint.handler({"queryStringParameters": query_params or None}, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def all_pages(endpoint, **query_params):
+    pages = []
+    next_token = None
+    while True:
+        params = (
+            dict(query_params, next_token=next_token) if next_token else query_params
+        )
+        status, body = get(endpoint, **params)
+        assert status == 200, body
+        pages.append(body["transactions"])
+        next_token = body["next_token"]
+        if next_token is None:
+            return pages
+
+
+def test_scan_pages_return_every_transaction_once(endpoint):
+    pages = all_pages(endpoint, limit="5")
+
+    ids = [item["transaction_id"] for page in pages for item in page]
+    assert sorted(ids) == [f"t-{idx:02d}" for idx in range(12)]
+    assert all(len(page) <= 5 for page in pages)
+    assert pages[0][0]["amount"] == 10.5
+
+
+def test_account_pages_follow_the_index_newest_first(endpoint):
+    pages = all_pages(endpoint, account_id="acc-1", limit="2")
+
+    ids = [item["transaction_id"] for page in pages for item in page]
+    assert ids == [f"t-{idx:02d}" for idx in (11, 9, 7, 5, 3, 1)]
+    assert all(len(page) <= 2 for page in pages)
+
+
+def test_token_from_another_account_is_rejected(endpoint):
+    status, body = get(endpoint, account_id="acc-0", limit="2")
+    assert status == 200
+
+    status, body = get(
+        endpoint, account_id="acc-1", limit="2", next_token=body["next_token"]
+    )
+
+    assert status == 400
+    assert body == {"error": "next_token no corresponde a account_id"}
+
+
+@pytest.mark.parametrize(
+    "next_token",
+    [
+        "no es base64!",
+        # Token del scan: le faltan los atributos del índice
+        encode_next_token({"transaction_id": "t-01"}),
+        encode_next_token(
+            {
+                "transaction_id": "t-01",
+                "client_account_id": "acc-1",
+                "created_at": {"S": "2025-06-15 17:01:00"},
+            }
+        ),
+    ],
+)
+def test_tampered_account_token_is_rejected(endpoint, next_token):
+    status, body = get(endpoint, account_id="acc-1", next_token=next_token)
+
+    assert status == 400
+    assert "next_token" in body["error"]
+
+
+@pytest.mark.parametrize("limit", ["0", "-1", "abc"])
+def test_invalid_limit_is_rejected(endpoint, limit):
+    status, body = get(endpoint, limit=limit)
+
+    assert status == 400
+    assert "limit" in body["error"]
+
+
+def test_limit_is_capped(endpoint):
+    status, body = get(endpoint, limit="5000")
+
+    assert status == 200
+    assert len(body["transactions"]) == 12 and body["next_token"] is None
@@ -0,0 +1,75 @@
+import json
+
+from instrumentation import COUNT, EMF_MAX_VALUES, MILLISECONDS, Metrics
+
+
+class FakeClock:
+    def __init__(self, *times):
+        self.times = list(times)
+
+    def __call__(self):
+        return self.times.pop(0)
+
+
+def emitted(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_flush_prints_emf_document(capsys):
+    metrics = Metrics(
+        "fraud-detector", namespace="FraudDetector", clock=FakeClock(0, 0.0123)
+    )
+    with metrics.span("predict"):
+        pass
+    metrics.count("records", 3)
+    metrics.put_property("model_version", "v1")
+
+    returned = metrics.flush()
+    documents = emitted(capsys)
+
+    assert documents == returned
+    assert len(documents) == 1
+    document = documents[0]
+    assert isinstance(document["_aws"]["Timestamp"], int)
+    assert document["_aws"]["CloudWatchMetrics"] == [
+        {
+            "Namespace": "FraudDetector",
+            "Dimensions": [["Service"]],
+            "Metrics": [
+                {"Name": "predict", "Unit": MILLISECONDS},
+                {"Name": "records", "Unit": COUNT},
+            ],
+        }
+    ]
+    assert document["Service"] == "fraud-detector"
+    assert document["model_version"] == "v1"
+    assert document["predict"] == {"Values": [12.0], "Counts": [1]}
+    assert document["records"] == {"Values": [3], "Counts": [1]}
+
+
+def test_flush_resets_between_invocations(capsys):
+    metrics = Metrics("fraud-detector")
+    metrics.count("records")
+    metrics.count("records")
+    metrics.flush()
+    assert emitted(capsys)[0]["records"] == {"Values": [1], "Counts": [2]}
+
+    assert metrics.flush() == []
+    assert capsys.readouterr().out == ""
+
+
+def test_flush_splits_metrics_with_too_many_values(capsys):
+    metrics = Metrics("fraud-detector")
+    for value in range(1, EMF_MAX_VALUES + 11):
+        metrics.count("batch_size", value)
+    metrics.flush()
+
+    documents = emitted(capsys)
+    assert [len(document["batch_size"]["Values"]) for document in documents] == [
+        EMF_MAX_VALUES,
+        10,
+    ]
+    for document in documents:
+        assert document["_aws"]["CloudWatchMetrics"][0]["Metrics"] == [
+            {"Name": "batch_size", "Unit": COUNT}
+        ]
@@ -0,0 +1,167 @@
+import importlib.util
+import json
+import os
+
+import pytest
+
+from conftest import LAMBDAS_DIR
+
+boto3 = pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+from list_endpoint import parse_fields, projection_kwargs  # noqa: E402
+from pagination import InvalidPageRequest, encode_next_token  # noqa: E402
+
+# lambda: (variable con la tabla, llave, clave de la respuesta)
+ENDPOINTS = {
+    "get_clients": ("CLIENTS_TABLE_NAME", "client_id", "clients"),
+    "get_counterparties": (
+        "COUNTERPARTIES_TABLE_NAME",
+        "counterparty_id",
+        "counterparties",
+    ),
+    "get_clients_tx_state": ("TABLE_NAME", "client_tx_state_id", "clients_tx_state"),
+    "get_client_recent_activity": (
+        "TABLE_NAME",
+        "client_recent_activity_id",
+        "client_recent_activity",
+    ),
+}
+
+
+class Endpoint:
+    def __init__(self, module, key, response_key):
+        self.module = module
+        self.key = key
+        self.response_key = response_key
+
+    def get(self, **query_params):
+        response = self.module.handler(
+            {"queryStringParameters": query_params or None}, None
+        )
+        return response["statusCode"], json.loads(response["body"])
+
+
+@pytest.fixture(params=sorted(ENDPOINTS))
+def endpoint(request, monkeypatch):
+    env, key, response_key = ENDPOINTS[request.param]
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv(env, "items")
+
+    with moto.mock_aws():
+        client = boto3.client("dynamodb")
+        client.create_table(
+            TableName="items",
+            KeySchema=[{"AttributeName": key, "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": key, "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        for idx in range(10):
+            client.put_item(
+                TableName="items",
+                Item={
+                    key: {"S": f"id-{idx}"},
+                    "name": {"S": f"name-{idx}"},
+                    "status": {"S": "ACTIVE"},
+                    "score": {"N": f"{idx}.5"},
+                    "tx_count": {"N": str(idx)},
+                },
+            )
+
+        spec = importlib.util.spec_from_file_location(
+            f"{request.param}_index",
+            os.path.join(LAMBDAS_DIR, request.param, "index.py"),
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        yield Endpoint(module, key, response_key)
+
+
+def test_pages_return_every_item_once(endpoint):
+    ids = []
+    params = {"limit": "3"}
+    while True:
+        status, body = endpoint.get(**params)
+        assert status == 200, body
+        assert len(body[endpoint.response_key]) <= 3
+        ids.extend(item[endpoint.key] for item in body[endpoint.response_key])
+        if body["next_token"] is None:
+            break
+        params["next_token"] = body["next_token"]
+
+    assert sorted(ids) == [f"id-{idx}" for idx in range(10)]
+
+
+def test_items_are_plain_json(endpoint):
+    status, body = endpoint.get(limit="1")
+
+    (item,) = body[endpoint.response_key]
+    idx = int(item[endpoint.key].split("-")[1])
+    assert item == {
+        endpoint.key: f"id-{idx}",
+        "name": f"name-{idx}",
+        "status": "ACTIVE",
+        "score": idx + 0.5,
+        "tx_count": idx,
+    }
+
+
+def test_fields_project_only_the_requested_attributes(endpoint):
+    # name y status son palabras reservadas de DynamoDB
+    status, body = endpoint.get(fields=f"{endpoint.key},name,status")
+
+    assert status == 200
+    items = body[endpoint.response_key]
+    assert len(items) == 10
+    for item in items:
+        assert set(item) == {endpoint.key, "name", "status"}
+
+
+@pytest.mark.parametrize(
+    "query_params, message",
+    [
+        ({"limit": "0"}, "limit"),
+        ({"limit": "abc"}, "limit"),
+        ({"fields": "name,a.b"}, "fields"),
+        ({"next_token": "no es base64!"}, "next_token"),
+        ({"next_token": encode_next_token({"other_id": {"S": "id-1"}})}, "next_token"),
+    ],
+)
+def test_invalid_requests_are_rejected(endpoint, query_params, message):
+    status, body = endpoint.get(**query_params)
+
+    assert status == 400
+    assert message in body["error"]
+
+
+def test_token_with_a_plain_value_is_rejected(endpoint):
+    # Los tokens de estos endpoints llevan el formato de DynamoDB ({"S": ...})
+    next_token = encode_next_token({endpoint.key: "id-1"})
+
+    status, body = endpoint.get(next_token=next_token)
+
+    assert status == 400
+    assert "next_token" in body["error"]
+
+
+def test_fields_are_deduplicated_and_projected_with_placeholders():
+    fields = parse_fields(" client_id,name, ,client_id,status")
+
+    assert fields == ["client_id", "name", "status"]
+    assert projection_kwargs(fields) == {
+        "ProjectionExpression": "#f0, #f1, #f2",
+        "ExpressionAttributeNames": {
+            "#f0": "client_id",
+            "#f1": "name",
+            "#f2": "status",
+        },
+    }
+    assert parse_fields(None) == [] and projection_kwargs([]) == {}
+
+
+@pytest.mark.parametrize("value", ["client-id", "a.b", "#f0", "1abc"])
+def test_invalid_fields_are_rejected(value):
+    with pytest.raises(InvalidPageRequest, match="fields"):
+        parse_fields(value)
@@ -0,0 +1,141 @@
+import base64
+import json
+from decimal import Decimal
+
+import pytest
+
+from pagination import (
+    MAX_PAGE_LIMIT,
+    InvalidPageRequest,
+    decode_next_token,
+    encode_next_token,
+    page_kwargs,
+    parse_limit,
+)
+
+INDEX_KEY = ("transaction_id", "client_account_id", "created_at")
+
+
+def token_for(value) -> str:
+    raw = value if isinstance(value, bytes) else json.dumps(value).encode()
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+@pytest.mark.parametrize(
+    "start_key, key_attributes, wire_format",
+    [
+        (
+            {
+                "transaction_id": "t-1",
+                "client_account_id": "acc-1",
+                "created_at": "2025-06-15 17:22:27",
+            },
+            INDEX_KEY,
+            False,
+        ),
+        ({"client_id": {"S": "client-é/+="}}, ("client_id",), True),
+        ({"bucket": Decimal("42")}, ("bucket",), False),
+        ({"bucket": {"N": "42.5"}}, ("bucket",), True),
+    ],
+)
+def test_next_token_round_trip(start_key, key_attributes, wire_format):
+    token = encode_next_token(start_key)
+
+    # Va en la URL sin escapar
+    assert set(token) <= set(
+        "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_="
+    )
+    assert decode_next_token(token, key_attributes, wire_format) == start_key
+
+
+def test_missing_token_means_first_page():
+    assert encode_next_token(None) is None
+    assert encode_next_token({}) is None
+    assert decode_next_token(None, INDEX_KEY) is None
+    assert decode_next_token("", INDEX_KEY) is None
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        "no es base64!",
+        token_for(b"\xff\xfe"),
+        token_for(b"{no es json"),
+        token_for(["transaction_id"]),
+        token_for({"transaction_id": "t-1"}),
+        token_for(
+            {
+                "transaction_id": "t-1",
+                "client_account_id": "acc-1",
+                "created_at": "x",
+                "extra": "y",
+            }
+        ),
+        token_for({"transaction_id": "", "client_account_id": "a", "created_at": "x"}),
+        token_for(
+            {"transaction_id": True, "client_account_id": "a", "created_at": "x"}
+        ),
+        token_for(
+            {"transaction_id": None, "client_account_id": "a", "created_at": "x"}
+        ),
+        token_for(
+            {
+                "transaction_id": {"S": "t-1"},
+                "client_account_id": "a",
+                "created_at": "x",
+            }
+        ),
+    ],
+)
+def test_tampered_tokens_are_rejected(token):
+    with pytest.raises(InvalidPageRequest, match="next_token"):
+        decode_next_token(token, INDEX_KEY)
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        {"S": "c-1", "N": "1"},
+        {"B": "YWJj"},
+        {"S": ""},
+        {"S": 5},
+        {"N": "abc"},
+        {"N": "Infinity"},
+        "c-1",
+    ],
+)
+def test_wire_format_tokens_must_hold_a_key_value(value):
+    with pytest.raises(InvalidPageRequest):
+        decode_next_token(token_for({"client_id": value}), ("client_id",), True)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (None, None),
+        ("", None),
+        ("1", 1),
+        ("25", 25),
+        (str(MAX_PAGE_LIMIT), MAX_PAGE_LIMIT),
+        (str(MAX_PAGE_LIMIT + 1), MAX_PAGE_LIMIT),
+    ],
+)
+def test_limit_bounds(value, expected):
+    assert parse_limit(value) == expected
+
+
+@pytest.mark.parametrize("value", ["0", "-3", "abc", "2.5"])
+def test_invalid_limits_are_rejected(value):
+    with pytest.raises(InvalidPageRequest, match="limit"):
+        parse_limit(value)
+
+
+def test_page_kwargs_combines_limit_and_start_key():
+    start_key = {"client_id": {"S": "client-3"}}
+
+    assert page_kwargs({}, ("client_id",), wire_format=True) == {}
+    assert page_kwargs(
+        {"limit": "10", "next_token": encode_next_token(start_key)},
+        ("client_id",),
+        wire_format=True,
+    ) == {"Limit": 10, "ExclusiveStartKey": start_key}
@@ -0,0 +1,192 @@
+import importlib.util
+import json
+import os
+from decimal import Decimal
+
+import pytest
+
+from conftest import LAMBDAS_DIR
+
+boto3 = pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+from botocore.exceptions import ClientError  # noqa: E402
+
+
+@pytest.fixture
+def batch_endpoint(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("TRANSACTIONS_TABLE_NAME", "transactions")
+
+    with moto.mock_aws():
+        boto3.resource("dynamodb").create_table(
+            TableName="transactions",
+            KeySchema=[{"AttributeName": "transaction_id", "KeyType": "HASH"}],
+            AttributeDefinitions=[
+                {"AttributeName": "transaction_id", "AttributeType": "S"}
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+
+        spec = importlib.util.spec_from_file_location(
+            "post_transactions_batch_index",
+            os.path.join(LAMBDAS_DIR, "post_transactions_batch", "index.py"),
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        monkeypatch.setattr(module.time, "sleep", lambda seconds: None)
+        yield module
+
+
+def row(transaction_id, amount="150.50"):
+    return {
+        "transaction_id": transaction_id,
+        "client_account_id": "acc-1",
+        "counterparty_account_id": "cp-1",
+        "amount": amount,
+    }
+
+
+def post(batch_endpoint, rows):
+    response = batch_endpoint.handler({"body": json.dumps(rows)}, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def stored_ids(batch_endpoint):
+    items = batch_endpoint.dynamodb.Table("transactions").scan()["Items"]
+    return sorted(item["transaction_id"] for item in items)
+
+
+def patch_batch_write(batch_endpoint, monkeypatch, reject):
+    """batch_write_item donde reject(ids, llamada) lanza un error o devuelve los
+    ids que quedan en UnprocessedItems"""
+    client = batch_endpoint.dynamodb.meta.client
+    batch_write_item = client.batch_write_item
+    calls = []
+
+    def patched(RequestItems):
+        requests = RequestItems["transactions"]
+        ids = [request["PutRequest"]["Item"]["transaction_id"] for request in requests]
+        calls.append(ids)
+        unprocessed = reject(ids, len(calls)) or set()
+        written = [r for r, i in zip(requests, ids) if i not in unprocessed]
+        dropped = [r for r, i in zip(requests, ids) if i in unprocessed]
+        if written:
+            batch_write_item(RequestItems={"transactions": written})
+        return {"UnprocessedItems": {"transactions": dropped} if dropped else {}}
+
+    monkeypatch.setattr(client, "batch_write_item", patched)
+    return calls
+
+
+def client_error(code):
+    return ClientError({"Error": {"Code": code, "Message": code}}, "BatchWriteItem")
+
+
+def test_invalid_and_duplicate_rows_are_reported_per_index(batch_endpoint):
+    rows = [
+        row("t-1"),
+        "no soy un objeto",
+        {"client_account_id": "acc-1", "amount": 10},
+        row("t-2", amount="diez"),
+        row(["t-3"]),
+        row({"id": "t-4"}),
+        row(12345),
+        row("  "),
+        row("t-1", amount=99),
+        {**row(None), "amount": 7},
+    ]
+
+    status, body = post(batch_endpoint, rows)
+
+    assert status == 200
+    assert (body["created"], body["invalid"], body["failed"]) == (2, 8, 0)
+    results = body["results"]
+    assert [result["index"] for result in results] == list(range(len(rows)))
+    assert results[0] == {"index": 0, "transaction_id": "t-1", "status": "CREATED"}
+    assert results[1]["error"] == "La transacción debe ser un objeto"
+    assert results[2]["error"] == "Faltan campos: counterparty_account_id"
+    assert results[3]["error"] == "amount no es numérico"
+    for result in results[4:8]:
+        assert result == {
+            "index": result["index"],
+            "transaction_id": None,
+            "status": "INVALID",
+            "error": "transaction_id debe ser un string no vacío",
+        }
+    assert results[8] == {
+        "index": 8,
+        "transaction_id": "t-1",
+        "status": "INVALID",
+        "error": "transaction_id duplicado con el índice 0",
+    }
+    # Sin transaction_id se genera uno
+    assert results[9]["status"] == "CREATED" and results[9]["transaction_id"]
+
+    assert stored_ids(batch_endpoint) == sorted(["t-1", results[9]["transaction_id"]])
+    item = batch_endpoint.dynamodb.Table("transactions").get_item(
+        Key={"transaction_id": "t-1"}
+    )["Item"]
+    assert item["amount"] == Decimal("150.50")
+
+
+def test_unprocessed_items_fail_only_their_rows(batch_endpoint, monkeypatch):
+    calls = patch_batch_write(batch_endpoint, monkeypatch, lambda ids, call: {"t-7"})
+
+    status, body = post(batch_endpoint, [row(f"t-{idx}") for idx in range(30)])
+
+    assert status == 200
+    assert (body["created"], body["invalid"], body["failed"]) == (29, 0, 1)
+    assert body["results"][7] == {
+        "index": 7,
+        "transaction_id": "t-7",
+        "status": "FAILED",
+        "error": "Sin procesar tras los reintentos",
+    }
+    # Sólo el item sin procesar se reintenta, hasta agotar los intentos
+    assert calls.count(["t-7"]) == batch_endpoint.BATCH_WRITE_MAX_ATTEMPTS - 1
+    assert len(stored_ids(batch_endpoint)) == 29
+
+
+@pytest.mark.parametrize(
+    "code",
+    ["ProvisionedThroughputExceededException", "ThrottlingException"],
+)
+def test_throttled_chunks_are_retried(batch_endpoint, monkeypatch, code):
+    def throttle_first_call(ids, call):
+        if call == 1:
+            raise client_error(code)
+
+    calls = patch_batch_write(batch_endpoint, monkeypatch, throttle_first_call)
+
+    status, body = post(batch_endpoint, [row(f"t-{idx}") for idx in range(5)])
+
+    assert status == 200
+    assert (body["created"], body["failed"]) == (5, 0)
+    assert len(calls) == 2
+    assert len(stored_ids(batch_endpoint)) == 5
+
+
+def test_other_client_errors_fail_the_whole_chunk(batch_endpoint, monkeypatch):
+    def reject_chunk_with_t0(ids, call):
+        if "t-0" in ids:
+            raise client_error("ValidationException")
+
+    patch_batch_write(batch_endpoint, monkeypatch, reject_chunk_with_t0)
+
+    status, body = post(batch_endpoint, [row(f"t-{idx}") for idx in range(30)])
+
+    assert status == 200
+    assert (body["created"], body["failed"]) == (5, 25)
+    assert {result["status"] for result in body["results"][:25]} == {"FAILED"}
+    assert "ValidationException" in body["results"][0]["error"]
+    assert stored_ids(batch_endpoint) == sorted(f"t-{idx}" for idx in range(25, 30))
+
+
+def test_unparseable_body_is_rejected(batch_endpoint):
+    response = batch_endpoint.handler({"body": '{"amount": 1}\n{oops'}, None)
+
+    assert response["statusCode"] == 400
+    assert "JSON inválido" in json.loads(response["body"])["error"]
@@ -0,0 +1,541 @@
+import itertools
+from datetime import datetime
+
+import pytest
+
+pl = pytest.importorskip("polars")
+pytest.importorskip("boto3")
+
+from botocore.exceptions import ClientError  # noqa: E402
+
+import main  # noqa: E402
+import stream_refresher  # noqa: E402
+from feature_store import FeatureStore  # noqa: E402
+from stream_refresher import (  # noqa: E402
+    FeatureRefresher,
+    StreamRefreshError,
+    TableStreamReader,
+    apply_changes,
+    coalesce_changes,
+)
+
+STREAM_ARN = "arn:aws:dynamodb:us-east-1:123456789012:table/clients/stream/1"
+
+
+def client_error(code):
+    return ClientError({"Error": {"Code": code, "Message": code}}, "GetRecords")
+
+
+class ExpiredIteratorException(ClientError):
+    pass
+
+
+class TrimmedDataAccessException(ClientError):
+    pass
+
+
+class FakeStreams:
+    """DynamoDB Streams en memoria: shards con padre, páginas chicas y fallas inyectables"""
+
+    class exceptions:
+        ExpiredIteratorException = ExpiredIteratorException
+        TrimmedDataAccessException = TrimmedDataAccessException
+
+    def __init__(self, page_size=2):
+        self.page_size = page_size
+        self.shards = {}
+        self.iterators = {}
+        self.sequence = itertools.count(100)
+        self.trimmed_before = 0
+        # Excepciones que lanzarán las siguientes llamadas a get_records; None pasa
+        self.failures = []
+        # shard_id -> páginas vacías a devolver antes de la siguiente con registros
+        self.empty_pages = {}
+
+    def add_shard(self, shard_id, parent=None):
+        self.shards[shard_id] = {"parent": parent, "records": [], "closed": False}
+
+    def put(self, shard_id, key, event="INSERT", **image):
+        sequence_number = f"{next(self.sequence):021d}"
+        record = {
+            "eventName": event,
+            "dynamodb": {
+                "SequenceNumber": sequence_number,
+                "Keys": {"client_id": {"S": key}},
+            },
+        }
+        if event != "REMOVE":
+            record["dynamodb"]["NewImage"] = {
+                "client_id": {"S": key},
+                **{name: {"S": value} for name, value in image.items()},
+            }
+        self.shards[shard_id]["records"].append(record)
+        return sequence_number
+
+    def split(self, parent, child):
+        self.shards[parent]["closed"] = True
+        self.add_shard(child, parent=parent)
+
+    def expire_all(self):
+        self.iterators = {token: None for token in self.iterators}
+
+    def describe_stream(self, StreamArn, ExclusiveStartShardId=None):
+        assert StreamArn == STREAM_ARN
+        ids = list(self.shards)
+        start = ids.index(ExclusiveStartShardId) + 1 if ExclusiveStartShardId else 0
+        page = ids[start : start + 1]
+        shards = []
+        for shard_id in page:
+            shard = self.shards[shard_id]
+            sequence_range = {"StartingSequenceNumber": "0"}
+            if shard["closed"]:
+                sequence_range["EndingSequenceNumber"] = "9" * 21
+            description = {"ShardId": shard_id, "SequenceNumberRange": sequence_range}
+            if shard["parent"]:
+                description["ParentShardId"] = shard["parent"]
+            shards.append(description)
+        description = {"Shards": shards}
+        if start + 1 < len(ids):
+            description["LastEvaluatedShardId"] = page[-1]
+        return {"StreamDescription": description}
+
+    def get_shard_iterator(
+        self, StreamArn, ShardId, ShardIteratorType, SequenceNumber=None
+    ):
+        records = self.shards[ShardId]["records"]
+        sequence_numbers = [r["dynamodb"]["SequenceNumber"] for r in records]
+        if ShardIteratorType == "LATEST":
+            position = len(records)
+        elif ShardIteratorType == "TRIM_HORIZON":
+            position = 0
+        else:
+            assert ShardIteratorType == "AFTER_SEQUENCE_NUMBER"
+            position = sequence_numbers.index(SequenceNumber) + 1
+        return {"ShardIterator": self._token(ShardId, position)}
+
+    def get_records(self, ShardIterator, Limit):
+        failure = self.failures.pop(0) if self.failures else None
+        if failure is not None:
+            raise failure
+        if self.iterators[ShardIterator] is None:
+            raise ExpiredIteratorException(
+                {"Error": {"Code": "ExpiredIteratorException"}}, "GetRecords"
+            )
+        shard_id, position = self.iterators[ShardIterator]
+        shard = self.shards[shard_id]
+        sequence_numbers = [r["dynamodb"]["SequenceNumber"] for r in shard["records"]]
+        if position < len(shard["records"]) and (
+            int(sequence_numbers[position]) < self.trimmed_before
+        ):
+            raise TrimmedDataAccessException(
+                {"Error": {"Code": "TrimmedDataAccessException"}}, "GetRecords"
+            )
+
+        if self.empty_pages.get(shard_id):
+            self.empty_pages[shard_id] -= 1
+            page = []
+        else:
+            page = shard["records"][position : position + self.page_size]
+        position += len(page)
+        response = {"Records": page}
+        if not (shard["closed"] and position >= len(shard["records"])):
+            response["NextShardIterator"] = self._token(shard_id, position)
+        return response
+
+    def _token(self, shard_id, position):
+        token = f"{shard_id}:{position}:{len(self.iterators)}"
+        self.iterators[token] = (shard_id, position)
+        return token
+
+
+class FakeDynamoDB:
+    def __init__(self, stream_arn=STREAM_ARN):
+        self.stream_arn = stream_arn
+
+    def describe_table(self, TableName):
+        return {"Table": {"TableName": TableName, "LatestStreamArn": self.stream_arn}}
+
+
+@pytest.fixture
+def streams(monkeypatch):
+    monkeypatch.setattr(stream_refresher, "get_dynamodb_client", FakeDynamoDB)
+    streams = FakeStreams()
+    streams.add_shard("shard-a")
+    return streams
+
+
+def keys(records):
+    return [record["dynamodb"]["Keys"]["client_id"]["S"] for record in records]
+
+
+def reader_for(streams, positions=None):
+    reader = TableStreamReader("clients", streams)
+    reader.start(positions)
+    return reader
+
+
+def test_start_without_positions_reads_only_new_changes(streams):
+    streams.put("shard-a", "old")
+    streams.add_shard("shard-closed")
+    streams.shards["shard-closed"]["closed"] = True
+    reader = reader_for(streams)
+    streams.put("shard-a", "new-1")
+    streams.put("shard-a", "new-2")
+    streams.put("shard-a", "new-3")
+
+    assert keys(reader.read_changes()) == ["new-1", "new-2", "new-3"]
+    assert reader.caught_up
+    assert reader.finished_shards == {"shard-closed"}
+
+
+def test_start_with_positions_resumes_after_last_read(streams):
+    streams.put("shard-a", "a-1")
+    reader = reader_for(streams, {})
+    assert keys(reader.catch_up()) == ["a-1"]
+    positions = reader.positions()
+
+    streams.put("shard-a", "a-2")
+    # Shard raíz nuevo desde TRIM_HORIZON; el hijo de un shard abierto espera
+    streams.add_shard("shard-b")
+    streams.put("shard-b", "b-1")
+    streams.add_shard("shard-c", parent="shard-a")
+    streams.put("shard-c", "c-1")
+
+    resumed = reader_for(streams, positions)
+    assert set(resumed.shards) == {"shard-a", "shard-b"}
+    assert keys(resumed.read_changes()) == ["a-2", "b-1"]
+
+
+def test_start_with_positions_of_another_stream_fails(streams, monkeypatch):
+    positions = reader_for(streams, {}).positions()
+    monkeypatch.setattr(
+        stream_refresher,
+        "get_dynamodb_client",
+        lambda: FakeDynamoDB(STREAM_ARN.replace("/1", "/2")),
+    )
+
+    with pytest.raises(StreamRefreshError, match="cambió"):
+        reader_for(streams, positions)
+
+
+def test_split_shard_children_are_read_after_the_parent(streams):
+    reader = reader_for(streams)
+    for idx in range(3):
+        streams.put("shard-a", f"a-{idx}")
+    streams.split("shard-a", "shard-b")
+    streams.put("shard-b", "b-0")
+    streams.split("shard-b", "shard-c")
+    streams.put("shard-c", "c-0")
+
+    assert keys(reader.catch_up()) == ["a-0", "a-1", "a-2", "b-0", "c-0"]
+    assert reader.finished_shards == {"shard-a", "shard-b"}
+    assert set(reader.positions()["shards"]) == {"shard-c"}
+
+
+def test_start_at_tip_skips_closed_shards_and_keeps_only_positions(streams):
+    streams.put("shard-a", "a-0")
+    streams.split("shard-a", "shard-b")
+    for idx in range(5):
+        last = streams.put("shard-b", f"b-{idx}")
+    streams.add_shard("shard-empty")
+    get_records = streams.get_records
+    read_shards = []
+
+    def tracking_get_records(ShardIterator, Limit):
+        read_shards.append(streams.iterators[ShardIterator][0])
+        return get_records(ShardIterator=ShardIterator, Limit=Limit)
+
+    streams.get_records = tracking_get_records
+    reader = TableStreamReader("clients", streams)
+    reader.start_at_tip()
+
+    assert "shard-a" not in read_shards
+    assert reader.positions()["shards"] == {"shard-b": last, "shard-empty": None}
+    assert reader.positions()["finished"] == ["shard-a"]
+
+    # Otro proceso continúa justo después, sin releer lo anterior
+    streams.put("shard-b", "b-5")
+    streams.put("shard-empty", "e-0")
+    assert keys(reader_for(streams, reader.positions()).catch_up()) == ["b-5", "e-0"]
+
+
+def test_expired_iterator_resumes_after_last_sequence_number(streams):
+    reader = reader_for(streams)
+    streams.put("shard-a", "a-1")
+    reader.read_changes()
+    streams.put("shard-a", "a-2")
+    streams.expire_all()
+
+    assert keys(reader.read_changes()) == ["a-2"]
+    assert reader.caught_up
+
+
+def test_expired_iterator_without_position_requires_reload(streams):
+    reader = reader_for(streams)
+    streams.expire_all()
+
+    with pytest.raises(StreamRefreshError, match="expirado"):
+        reader.read_changes()
+
+
+def test_trimmed_data_requires_reload(streams):
+    reader = reader_for(streams, {})
+    streams.put("shard-a", "a-1")
+    streams.trimmed_before = 10**6
+
+    with pytest.raises(StreamRefreshError, match="recortados"):
+        reader.read_changes()
+
+
+def test_transient_error_keeps_what_was_read(streams):
+    reader = reader_for(streams)
+    for idx in range(5):
+        streams.put("shard-a", f"a-{idx}")
+    # La primera página pasa, la segunda se throttlea
+    streams.failures = [None, client_error("LimitExceededException")]
+
+    assert keys(reader.read_changes()) == ["a-0", "a-1"]
+    assert not reader.caught_up
+    assert reader.error.response["Error"]["Code"] == "LimitExceededException"
+
+    assert keys(reader.read_changes()) == ["a-2", "a-3", "a-4"]
+    assert reader.caught_up and reader.error is None
+
+
+def test_catch_up_does_not_retry_transient_errors_forever(streams):
+    reader = reader_for(streams)
+    streams.failures = [client_error("InternalServerError")]
+
+    with pytest.raises(StreamRefreshError, match="InternalServerError"):
+        reader.catch_up()
+
+
+def test_past_deadline_reads_nothing(streams):
+    reader = reader_for(streams)
+    streams.put("shard-a", "a-1")
+    positions = reader.positions()
+
+    assert reader.read_changes(deadline=0) == []
+    assert not reader.caught_up
+    assert reader.positions() == positions
+    assert keys(reader.read_changes()) == ["a-1"]
+
+
+def test_empty_pages_before_the_tip_do_not_end_the_read(streams):
+    reader = reader_for(streams)
+    streams.put("shard-a", "a-1")
+    streams.empty_pages["shard-a"] = stream_refresher.STREAM_EMPTY_PAGES_AT_TIP - 1
+
+    assert keys(reader.read_changes()) == ["a-1"]
+
+
+def test_page_cap_leaves_the_rest_for_the_next_read(streams, monkeypatch):
+    # Caben las páginas vacías que marcan el final, pero no 10 registros
+    pages = stream_refresher.STREAM_EMPTY_PAGES_AT_TIP + 1
+    monkeypatch.setattr(stream_refresher, "STREAM_MAX_PAGES_PER_SHARD", pages)
+    reader = reader_for(streams)
+    for idx in range(10):
+        streams.put("shard-a", f"a-{idx}")
+
+    assert keys(reader.read_changes()) == [f"a-{idx}" for idx in range(8)]
+    assert not reader.caught_up
+    assert keys(reader.read_changes()) == ["a-8", "a-9"]
+    assert reader.caught_up
+
+
+def stream_record(event, key, **image):
+    record = {
+        "eventName": event,
+        "dynamodb": {"Keys": {"client_recent_activity_id": {"S": key}}},
+    }
+    if event != "REMOVE":
+        record["dynamodb"]["NewImage"] = {
+            "client_recent_activity_id": {"S": key},
+            **image,
+        }
+    return record
+
+
+def activity_image(account, bucket, tx_count, counterparties):
+    return {
+        "client_account_id": {"S": account},
+        "bucket_timestamp": {"S": bucket},
+        "tx_count": {"N": str(tx_count)},
+        "unique_counterparties": {"S": counterparties},
+        "unique_counterparties_count": {"N": str(len(counterparties.split(",")))},
+        "applied_tx_ids": {"SS": ["t-1", "t-2"]},
+    }
+
+
+def test_coalesce_changes_keeps_the_last_version_of_each_key():
+    records = [
+        stream_record("INSERT", "b1", **activity_image("acc-1", "x", 1, "cp-1")),
+        stream_record("MODIFY", "b1", **activity_image("acc-1", "x", 2, "cp-1,cp-2")),
+        stream_record("INSERT", "b2", **activity_image("acc-2", "y", 1, "cp-3")),
+        stream_record("REMOVE", "b2"),
+        stream_record("REMOVE", "b3"),
+        stream_record("MODIFY", "b3", **activity_image("acc-3", "z", 4, "cp-4")),
+    ]
+
+    upserts, removed = coalesce_changes("client_recent_activity", records)
+
+    assert upserts == {
+        "b1": {
+            "client_recent_activity_id": "b1",
+            "client_account_id": "acc-1",
+            "bucket_timestamp": "x",
+            "tx_count": 2,
+            "unique_counterparties": "cp-1,cp-2",
+            "unique_counterparties_count": 2,
+        },
+        "b3": {
+            "client_recent_activity_id": "b3",
+            "client_account_id": "acc-3",
+            "bucket_timestamp": "z",
+            "tx_count": 4,
+            "unique_counterparties": "cp-4",
+            "unique_counterparties_count": 1,
+        },
+    }
+    assert removed == ["b2"]
+
+
+def activity_frames():
+    bucket = "2025-06-15T17:20:00.000000"
+    activity = main.build_client_recent_activity_df(
+        {
+            "client_recent_activity_id": ["b1", "b2"],
+            "client_account_id": ["acc-1", "acc-2"],
+            "bucket_timestamp": [bucket, bucket],
+            "tx_count": [1, 3],
+            "unique_counterparties": ["cp-1", "cp-2,cp-3"],
+        }
+    )
+    return {
+        "clients": pl.DataFrame(
+            {
+                "client_id": ["c1"],
+                "account_id": ["acc-1"],
+                "risk_level": [3],
+                "country": ["Canada"],
+            }
+        ),
+        "counterparties": pl.DataFrame(
+            {"counterparty_id": ["p1"], "account_id": ["cp-1"], "country": ["Mexico"]}
+        ),
+        "client_tx_state": pl.DataFrame(
+            {
+                "client_tx_state_id": ["acc-1"],
+                "client_account_id": ["acc-1"],
+                "avg_tx_amount": [100.0],
+                "std_tx_amount": [10.0],
+            }
+        ),
+        "client_recent_activity": activity,
+    }
+
+
+def store_for(frames):
+    return FeatureStore(
+        frames["clients"],
+        frames["counterparties"],
+        frames["client_tx_state"],
+        frames["client_recent_activity"],
+    )
+
+
+def test_apply_changes_updates_frame_and_store():
+    frames = activity_frames()
+    store = store_for(frames)
+    bucket = "2025-06-15T17:25:00.000000"
+    upserts, removed = coalesce_changes(
+        "client_recent_activity",
+        [
+            stream_record("MODIFY", "b1", **activity_image("acc-1", bucket, 5, "a,b")),
+            stream_record("INSERT", "b3", **activity_image("acc-2", bucket, 2, "c")),
+            stream_record("REMOVE", "b2"),
+        ],
+    )
+
+    frames["client_recent_activity"] = apply_changes(
+        "client_recent_activity",
+        frames["client_recent_activity"],
+        store,
+        upserts,
+        removed,
+    )
+
+    activity = frames["client_recent_activity"].sort("client_recent_activity_id")
+    assert activity["client_recent_activity_id"].to_list() == ["b1", "b3"]
+    assert activity["tx_count"].to_list() == [5, 2]
+    assert activity["bucket_timestamp"].to_list() == [datetime(2025, 6, 15, 17, 25)] * 2
+    for account in ["acc-1", "acc-2"]:
+        transaction = {
+            "client_account_id": account,
+            "counterparty_account_id": "cp-1",
+            "amount": 150.0,
+            "timestamp": "2025-06-15 17:40:00",
+        }
+        assert store.get_dynamic_features(transaction) == main.get_dynamic_features(
+            transaction,
+            frames["client_tx_state"],
+            frames["client_recent_activity"],
+            frames["clients"],
+            frames["counterparties"],
+        )
+
+
+def test_upsert_without_primary_key_is_rejected():
+    frames = activity_frames()
+    store = store_for(frames)
+
+    with pytest.raises(ValueError, match="client_recent_activity_id"):
+        store.upsert(
+            "client_recent_activity",
+            frames["client_recent_activity"].drop("client_recent_activity_id"),
+        )
+
+
+def refresher_for(streams, **kwargs):
+    refresher = FeatureRefresher(max_staleness_seconds=0, **kwargs)
+    reader = reader_for(streams)
+    reader.table_name = "client_recent_activity"
+    refresher.readers = {"client_recent_activity": reader}
+    refresher.ready = True
+    refresher.last_refresh = 0.0
+    return refresher
+
+
+def put_activity(streams, key, tx_count, bucket="2025-06-15T17:30:00.000000"):
+    record = stream_record(
+        "INSERT", key, **activity_image("acc-1", bucket, tx_count, "cp-1")
+    )
+    record["dynamodb"]["SequenceNumber"] = f"{next(streams.sequence):021d}"
+    streams.shards["shard-a"]["records"].append(record)
+
+
+def test_incomplete_refresh_is_continued_on_the_next_call(streams, monkeypatch):
+    pages = stream_refresher.STREAM_EMPTY_PAGES_AT_TIP + 1
+    monkeypatch.setattr(stream_refresher, "STREAM_MAX_PAGES_PER_SHARD", pages)
+    frames = activity_frames()
+    store = store_for(frames)
+    refresher = refresher_for(streams)
+    for idx in range(9):
+        put_activity(streams, f"n{idx}", idx)
+
+    frames = refresher.refresh(frames, store)
+    assert refresher.last_refresh == 0.0 and refresher.is_stale()
+    assert frames["client_recent_activity"].shape[0] == 10
+
+    frames = refresher.refresh(frames, store)
+    assert refresher.last_refresh > 0.0
+    assert frames["client_recent_activity"].shape[0] == 11
+
+
+def test_changes_that_cannot_be_applied_require_reload(streams):
+    frames = activity_frames()
+    refresher = refresher_for(streams)
+    put_activity(streams, "n0", 1, bucket="mañana")
+
+    with pytest.raises(StreamRefreshError, match="client_recent_activity"):
+        refresher.refresh(frames, store_for(frames))